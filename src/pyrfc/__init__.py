@@ -38,11 +38,14 @@ try:
         RfcFieldType,
         RfcParameterDirection,
         Server,
+        TableCursor,
+        TableStream,
         Throughput,
         TypeDescription,
         UnitCallType,
         UnitState,
         cancel_connection,
+        get_metadata_cache,
         get_nwrfclib_version,
         language_iso_to_sap,
         language_sap_to_iso,
@@ -50,7 +53,12 @@ try:
         set_cryptolib_path,
         set_ini_file_directory,
         set_locale_radix,
+        set_metadata_cache,
     )
+    from pyrfc._async import AsyncConnection
+    from pyrfc._cache import MetadataCache
+    from pyrfc._pool import ConnectionPool
+    from pyrfc._table_reader import TableReader
 except Exception as ex:
     # PyRFC module could not be loaded
     print(ex)
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+""":mod:`pyrfc` asyncio client."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+
+from pyrfc._cyrfc import cancel_connection
+from pyrfc._exception import RFCError
+from pyrfc._pool import ConnectionPool
+
+
+class AsyncConnection:
+    """asyncio client for SAP backend system
+
+    RFC calls are executed on connections from a :class:`ConnectionPool`,
+    in a thread pool with one thread per pool connection, not blocking the
+    event loop. Up to ``max_size`` RFC calls run concurrently, further calls
+    wait for a free connection.
+
+    >>> async with AsyncConnection(max_size=5, dest="MME") as client:
+    ...     result = await client.call("STFC_CONNECTION", REQUTEXT="Hello SAP!")
+
+    When the awaiting task is cancelled, the ongoing RFC call is cancelled
+    by :func:`~pyrfc.cancel_connection` and the connection re-opened.
+
+    :param pool: Connection pool to use. When not given, a new pool is created
+           from ``max_size``, ``config`` and ``params``, closed with the client.
+    :type pool: ConnectionPool or None (default)
+
+    :param max_size: Maximum number of concurrent RFC calls and connections
+           of the new pool (default is 10)
+    :type max_size: int
+
+    :param config: Client connection configuration, cf. :class:`Connection`
+    :type config: dict or None (default)
+
+    :param params: SAP connection parameters, cf. :class:`Connection`
+    :type params: Keyword parameters
+    """
+
+    def __init__(self, pool=None, max_size=10, config=None, **params):
+        """Init AsyncConnection class."""
+        self._own_pool = pool is None
+        self._pool = (
+            ConnectionPool(max_size=max_size, config=config, **params)
+            if pool is None
+            else pool
+        )
+        self._max_size = self._pool.max_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_size, thread_name_prefix="pyrfc"
+        )
+        # created in the event loop, on first call
+        self._semaphore = None
+        self._closed = False
+
+    @property
+    def pool(self):
+        """Connection pool
+
+        :getter: Connection pool used by the client
+        :type: ConnectionPool
+        """
+        return self._pool
+
+    async def call(self, func_name, options=None, **params):
+        """Invokes a remote-enabled function module via RFC.
+
+        Parameters and result are the same as for :meth:`Connection.call`.
+
+        :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if the RFC call fails.
+        """
+        if self._closed:
+            raise RFCError("Async connection is closed")
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_size)
+        async with self._semaphore:
+            acquire = loop.run_in_executor(self._executor, self._pool.acquire)
+            try:
+                conn = await asyncio.shield(acquire)
+            except asyncio.CancelledError:
+                acquire.add_done_callback(self._release_acquired)
+                raise
+            try:
+                future = loop.run_in_executor(
+                    self._executor, partial(conn.call, func_name, options, **params)
+                )
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    cancel_connection(conn)
+                    # connection released when the cancelled call returned
+                    with suppress(Exception):
+                        await future
+                    raise
+            finally:
+                self._pool.release(conn)
+
+    def _release_acquired(self, future):
+        # connection acquired after the call was cancelled
+        if not future.cancelled() and future.exception() is None:
+            self._pool.release(future.result())
+
+    async def gather(self, *calls, return_exceptions=False):
+        """Invokes remote-enabled function modules concurrently
+
+        >>> results = await client.gather(
+        ...     ("STFC_CONNECTION", {"REQUTEXT": "1"}),
+        ...     ("STFC_CONNECTION", {"REQUTEXT": "2"}, {"timeout": 10}),
+        ... )
+
+        :param calls: RFC calls as tuples of function module name, parameters
+               dictionary and optional call options dictionary
+        :type calls: tuple
+
+        :param return_exceptions: cf. :func:`asyncio.gather`
+        :type return_exceptions: boolean
+
+        :returns: List of results, in order of calls
+        """
+        return await asyncio.gather(
+            *(
+                self.call(func_name, options[0] if options else None, **params)
+                for func_name, params, *options in calls
+            ),
+            return_exceptions=return_exceptions,
+        )
+
+    async def close(self):
+        """Close the client, waiting for ongoing RFC calls
+
+        The connection pool is closed when created by the client.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self._executor.shutdown, wait=True))
+        if self._own_pool:
+            self._pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
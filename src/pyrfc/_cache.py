@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+""":mod:`pyrfc` function metadata cache."""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from pyrfc._exception import RFCError
+
+
+class MetadataCache:
+    """Thread-safe cache of function module metadata, per backend system id.
+
+    Client connections cache the compiled metadata of called function modules,
+    shared by connections to the same backend system. Least recently used
+    entries are evicted when ``max_size`` entries cached.
+
+    Expired and invalidated metadata are compiled again on next call, with
+    function descriptions removed from SAP NW RFC Lib cache and read again from
+    the backend system. Invalidating all entries of a system id, for example
+    after a transport import, reads type descriptions again as well. Descriptions
+    still in use by running calls, :class:`~pyrfc.TableCursor` or
+    :class:`~pyrfc.TableStream` objects are removed on a later compilation,
+    metadata compiled in the meantime are not cached.
+
+    >>> cache = get_metadata_cache()
+    >>> cache.stats["hits"]
+    1034
+    >>> cache.invalidate("MME")
+
+    :param max_size: Maximum number of cached function modules (default is 1000)
+    :type max_size: int
+
+    :param ttl: Seconds after which cached metadata expire (default is None,
+           metadata don't expire)
+    :type ttl: float or None
+
+    :raises: :exc:`~pyrfc.RFCError` if the cache configuration is not valid.
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        """Init MetadataCache class."""
+        if max_size < 1 or (ttl is not None and ttl <= 0):
+            raise RFCError(
+                f"Metadata cache configuration not valid: max_size={max_size}, ttl={ttl}"  # noqa: E501
+            )
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = Lock()
+        # (sysid, function name): (call plan, expiry time), most recently used last
+        self._entries = OrderedDict()
+        # descriptions to read again from the backend system, by system id:
+        # (set of function names, True if type descriptions as well)
+        self._stale = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def stats(self):
+        """Metadata cache statistics
+
+        :getter: Cache ``size`` and ``max_size``, number of ``hits``, ``misses``,
+                 LRU ``evictions`` and TTL ``expirations``
+        :type: dict
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    @property
+    def ttl(self):
+        """Metadata time to live
+
+        :getter: Seconds after which cached metadata expire, or None
+        :type: float or None
+        """
+        return self._ttl
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def keys(self, sysid=None):
+        """Cached function modules
+
+        :param sysid: System id, None (default) for all systems
+        :type sysid: string or None
+
+        :returns: List of ``(sysid, function name)`` tuples, least recently used first
+        """
+        with self._lock:
+            return [key for key in self._entries if sysid is None or key[0] == sysid]
+
+    def get(self, sysid, func_name):
+        """Cached metadata of a function module
+
+        :returns: Call plan or None if not cached or expired
+        """
+        key = (sysid, func_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._mark_stale(sysid, [func_name])
+                entry = None
+            if entry is None:
+                self._misses += 1
+                plan = None
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                plan = entry[0]
+        return plan
+
+    def put(self, sysid, func_name, plan):
+        """Add metadata of a function module to the cache"""
+        expires = None if self._ttl is None else monotonic() + self._ttl
+        with self._lock:
+            self._entries[sysid, func_name] = (plan, expires)
+            self._entries.move_to_end((sysid, func_name))
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, sysid=None, func_name=None):
+        """Remove cached metadata, read again from the backend system on next call
+
+        :param sysid: System id, None (default) for all systems
+        :type sysid: string or None
+
+        :param func_name: Function module name, None (default) for all function
+               modules of the system id, including their type descriptions
+        :type func_name: string or None
+
+        :returns: Number of removed function modules
+        """
+        removed = self._discard(sysid, func_name)
+        by_sysid = {}
+        for plan_sysid, plan_func_name in removed:
+            by_sysid.setdefault(plan_sysid, []).append(plan_func_name)
+        if sysid is not None:
+            # descriptions read before, also if not cached by this cache
+            by_sysid.setdefault(sysid, [] if func_name is None else [func_name])
+        with self._lock:
+            for plan_sysid, func_names in by_sysid.items():
+                self._mark_stale(plan_sysid, func_names, types=func_name is None)
+        return len(removed)
+
+    def _mark_stale(self, sysid, func_names, types=False):
+        # lock held by caller
+        names, stale_types = self._stale.get(sysid, (set(), False))
+        self._stale[sysid] = (names | set(func_names), stale_types or types)
+
+    def _stale_descriptions(self, sysid):
+        """Function names and type flag of descriptions to read again"""
+        with self._lock:
+            names, types = self._stale.get(sysid, (set(), False))
+            return set(names), types
+
+    def _refreshed(self, sysid, func_names, types=False):
+        """Descriptions removed from SAP NW RFC Lib cache, read again on compilation"""
+        with self._lock:
+            names, stale_types = self._stale.get(sysid, (set(), False))
+            names = names - set(func_names)
+            stale_types = stale_types and not types
+            if names or stale_types:
+                self._stale[sysid] = (names, stale_types)
+            else:
+                self._stale.pop(sysid, None)
+
+    def _discard(self, sysid=None, func_name=None):
+        """Remove cached metadata from this cache only"""
+        with self._lock:
+            removed = {
+                key: entry[0]
+                for key, entry in self._entries.items()
+                if (sysid is None or key[0] == sysid)
+                and (func_name is None or key[1] == func_name)
+            }
+            for key in removed:
+                del self._entries[key]
+        return removed
@@ -4,22 +4,40 @@
 
 """The _pyrfc C-extension module"""
 
-from libc.stdint cimport uintptr_t
-from libc.stdlib cimport free, malloc
-
+from libc.stdint cimport INT32_MAX, INT32_MIN, int32_t, int64_t, uint32_t, uint64_t, uintptr_t
+from libc.stdlib cimport free, malloc, realloc
+from libc.string cimport memcpy, memset
+from cpython.unicode cimport (
+    Py_UCS1, Py_UCS2, PyUnicode_1BYTE_DATA, PyUnicode_1BYTE_KIND,
+    PyUnicode_2BYTE_DATA, PyUnicode_2BYTE_KIND, PyUnicode_4BYTE_DATA, PyUnicode_DecodeUTF16,
+    PyUnicode_GET_LENGTH, PyUnicode_KIND, PyUnicode_New
+)
+
+import json
+from asyncio import AbstractEventLoop, run_coroutine_threadsafe
 from socket import gethostname
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import date, datetime, time
 from decimal import Decimal
 from enum import Enum, auto
 from locale import localeconv
+from multiprocessing import get_context
+from os import getpid, replace
 from os.path import isfile, join
-from sys import exc_info, platform, version_info
-from threading import Thread, Timer
+from pickle import dumps
+from sys import byteorder, exc_info, platform, version_info
+from heapq import heapify, heappop, heappush
+from inspect import iscoroutinefunction
+from itertools import count
+from threading import Condition, RLock, Thread
+from time import monotonic, time_ns
+from weakref import WeakSet
 
 from pyrfc.csapnwrfc cimport *
 from pyrfc._exception import *
-from pyrfc._utils import enum_names, enum_values
+from pyrfc._cache import MetadataCache
+from pyrfc._utils import enum_names, enum_values, import_optional
 
 ################################################################################
 # Configuration options
@@ -31,6 +49,27 @@ _MASK_RETURN_IMPORT_PARAMS = 0x02
 _MASK_RSTRIP = 0x04
 _MASK_CHECK_DATE = 0x08
 _MASK_CHECK_TIME = 0x10
+_MASK_TABLE_COLUMNS = 0x20
+_MASK_TABLE_NUMPY = 0x40
+_MASK_TABLE_ARROW = 0x80
+_MASK_TABLE_FORMAT = _MASK_TABLE_COLUMNS | _MASK_TABLE_NUMPY | _MASK_TABLE_ARROW
+_MASK_INTERN_FIELDS = 0x100
+_MASK_BCD_FLOAT = 0x200
+
+# table_format option values
+_TABLE_FORMATS = {
+    'rows': 0,
+    'columns': _MASK_TABLE_COLUMNS,
+    'numpy': _MASK_TABLE_NUMPY,
+    'arrow': _MASK_TABLE_ARROW,
+}
+
+
+def _table_format_mask(table_format):
+    try:
+        return _TABLE_FORMATS[table_format]
+    except (KeyError, TypeError):
+        raise RFCError(f"Table format '{table_format}' is not supported, expected one of: {', '.join(_TABLE_FORMATS)}") from None
 
 
 _LOCALE_RADIX = localeconv()["decimal_point"]
@@ -269,6 +308,69 @@ def cancel_connection(client_connection):
     Thread(target=_cancel_connection, args=(client_connection,)).start()
 
 
+class _TimeoutScheduler(object):
+    """Cancels RFC calls not completed within timeout
+
+    Process-wide, single daemon thread waiting for the earliest deadline
+    in a heap of scheduled timeouts, instead of one timer thread per RFC call.
+    """
+    def __init__(self):
+        self._cond = Condition()
+        # heap of [deadline, sequence, connection], connection None when cancelled
+        self._heap = []
+        self._cancelled = 0
+        self._sequence = count()
+        self._thread = None
+
+    def schedule(self, timeout, client_connection):
+        """Cancel the connection after timeout seconds, unless unscheduled before
+
+        :return: timeout entry, to be passed to unschedule()
+        """
+        entry = [monotonic() + timeout, next(self._sequence), client_connection]
+        with self._cond:
+            heappush(self._heap, entry)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="pyrfc-timeout", daemon=True)
+                self._thread.start()
+            elif self._heap[0] is entry:
+                self._cond.notify()
+        return entry
+
+    def unschedule(self, entry):
+        with self._cond:
+            if entry[2] is None:
+                return
+            entry[2] = None
+            self._cancelled += 1
+            # compact when mostly cancelled entries
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapify(self._heap)
+                self._cancelled = 0
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2] is None:
+                    heappop(self._heap)
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                entry = heappop(self._heap)
+                client_connection = entry[2]
+                entry[2] = None
+                cancel_connection(client_connection)
+
+
+_timeout_scheduler = _TimeoutScheduler()
+
+
 ################################################################################
 # CONNECTION PARAMETERS
 ################################################################################
@@ -482,6 +584,402 @@ class FunctionDescription(object):
     def __repr__(self):
         return f"<FunctionDescription '{self.name}' with {len(self.parameters)} params>"
 
+
+################################################################################
+# Metadata Snapshot
+################################################################################
+
+# version of metadata snapshot file format
+_METADATA_SNAPSHOT_VERSION = 1
+
+
+def _type_desc_to_dict(type_desc):
+    return {
+        'name': type_desc.name,
+        'nuc_length': type_desc.nuc_length,
+        'uc_length': type_desc.uc_length,
+        'fields': [
+            dict(field, type_description=_type_desc_to_dict(field['type_description'])
+                 if field['type_description'] is not None else None)
+            for field in type_desc.fields
+        ]
+    }
+
+
+def _type_desc_from_dict(type_dict):
+    type_desc = TypeDescription(type_dict['name'], type_dict['nuc_length'], type_dict['uc_length'])
+    for field in type_dict['fields']:
+        if field['type_description'] is not None:
+            field = dict(field, type_description=_type_desc_from_dict(field['type_description']))
+        type_desc.add_field(**field)
+    return type_desc
+
+
+def _func_desc_to_dict(func_desc):
+    return {
+        'name': func_desc.name,
+        'parameters': [
+            dict(parameter, type_description=_type_desc_to_dict(parameter['type_description'])
+                 if parameter['type_description'] is not None else None)
+            for parameter in func_desc.parameters
+        ]
+    }
+
+
+def _func_desc_from_dict(func_dict):
+    func_desc = FunctionDescription(func_dict['name'])
+    for parameter in func_dict['parameters']:
+        if parameter['type_description'] is not None:
+            parameter = dict(parameter, type_description=_type_desc_from_dict(parameter['type_description']))
+        func_desc.add_parameter(**parameter)
+    return func_desc
+
+
+def _read_metadata_snapshot(path, max_age=None):
+    """Metadata snapshot saved by Connection.save_metadata(), checked for version and age"""
+    with open(path, encoding='utf-8') as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    if snapshot.get('version') != _METADATA_SNAPSHOT_VERSION:
+        raise RFCError(f"Metadata snapshot version '{snapshot.get('version')}' is not supported, expected {_METADATA_SNAPSHOT_VERSION}")
+    age = time_ns() // 1000000000 - snapshot['timestamp']
+    if max_age is not None and age > max_age:
+        raise RFCError(f"Metadata snapshot age {age} seconds exceeds max_age {max_age}")
+    return snapshot
+
+
+cdef checkSnapshotSystem(snapshot, sysid, release):
+    """Checks the snapshot is of the backend system id and release, not checked if None"""
+    if snapshot['sysid'] != sysid or (release is not None and snapshot['release'] != release):
+        raise RFCError(
+            f"Metadata snapshot of system '{snapshot['sysid']}' release '{snapshot['release']}' "
+            f"does not match the backend system '{sysid}' release '{release}'"
+        )
+
+################################################################################
+# Call Plan
+################################################################################
+
+# compiled call plans of client connections, keyed by system id and function name,
+# replaced by set_metadata_cache()
+_metadata_cache = MetadataCache()
+
+
+def get_metadata_cache():
+    """Returns the metadata cache of client connections
+
+    :returns: Metadata cache
+    :rtype: MetadataCache
+    """
+    return _metadata_cache
+
+
+def set_metadata_cache(cache):
+    """Replaces the metadata cache of client connections
+
+    Metadata cached by SAP NW RFC Lib are not removed and re-used by
+    the new cache. Call plans of the replaced cache are released.
+
+    :param cache: Metadata cache, e.g. ``MetadataCache(max_size=200, ttl=3600)``
+    :type cache: MetadataCache
+
+    :return: nothing, raises an error
+    """
+    global _metadata_cache
+    if not isinstance(cache, MetadataCache):
+        raise TypeError("MetadataCache object required, received", cache, type(cache))
+    if cache is not _metadata_cache:
+        # released call plans don't keep descriptions in use, cf. refreshDescriptions()
+        _metadata_cache._discard()
+    _metadata_cache = cache
+
+
+cdef class _CallPlan:
+    """Compiled metadata of a remote function module
+
+    Holds the function description handle and a copy of all parameter
+    descriptions, with parameter names already in SAP unicode format,
+    so that repeated calls of the same function module do not need
+    any name based metadata lookups. Layouts of STRUCTURE and TABLE
+    parameters are owned by the plan, released with it.
+    """
+    cdef RFC_FUNCTION_DESC_HANDLE funcDesc
+    cdef unsigned paramCount
+    cdef RFC_PARAMETER_DESC *paramDesc
+    # parameter name: index in paramDesc
+    cdef dict index
+    # parameter names, in paramDesc order
+    cdef list names
+    # _TypeLayout of STRUCTURE and TABLE parameters, in paramDesc order, None if not created yet
+    cdef list layouts
+    # plans in use tracked by _described
+    cdef object __weakref__
+
+    def __cinit__(self):
+        self.funcDesc = NULL
+        self.paramCount = 0
+        self.paramDesc = NULL
+
+    def __dealloc__(self):
+        free(self.paramDesc)
+
+
+cdef _CallPlan compileCallPlan(RFC_FUNCTION_DESC_HANDLE funcDesc):
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned i
+    cdef _CallPlan plan = _CallPlan()
+    plan.funcDesc = funcDesc
+    rc = RfcGetParameterCount(funcDesc, &plan.paramCount, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    plan.paramDesc = <RFC_PARAMETER_DESC*> malloc(plan.paramCount * sizeof(RFC_PARAMETER_DESC))
+    plan.index = {}
+    plan.names = []
+    plan.layouts = [None] * plan.paramCount
+    for i in range(plan.paramCount):
+        rc = RfcGetParameterDescByIndex(funcDesc, i, &plan.paramDesc[i], &errorInfo)
+        if rc != RFC_OK:
+            raise wrapError(&errorInfo)
+        name = wrapString(plan.paramDesc[i].name)
+        plan.index[name] = i
+        plan.names.append(name)
+    return plan
+
+
+cdef RFC_FUNCTION_DESC_HANDLE getCachedFunctionDesc(repository_id, func_name):
+    """
+    Returns the function description from SAP NW RFC Lib cache, without backend connection.
+
+    :param repository_id: Repository id (system id) of the backend system
+    :param func_name: Name of the function module
+    :return: Handle of RFC_FUNCTION_DESC_HANDLE or NULL if not cached
+    """
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC *repositoryId = fillString(repository_id)
+    cdef SAP_UC *funcName = fillString(func_name)
+    cdef RFC_FUNCTION_DESC_HANDLE funcDesc = RfcGetCachedFunctionDesc(repositoryId, funcName, &errorInfo)
+    free(repositoryId)
+    free(funcName)
+    return funcDesc
+
+
+cdef RFC_TYPE_DESC_HANDLE getCachedTypeDesc(repository_id, type_name):
+    """
+    Returns the type description from SAP NW RFC Lib cache, without backend connection.
+
+    :param repository_id: Repository id (system id) of the backend system
+    :param type_name: Name of the structure or table type
+    :return: Handle of RFC_TYPE_DESC_HANDLE or NULL if not cached
+    """
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC *repositoryId = fillString(repository_id)
+    cdef SAP_UC *typeName = fillString(type_name)
+    cdef RFC_TYPE_DESC_HANDLE typeDesc = RfcGetCachedTypeDesc(repositoryId, typeName, &errorInfo)
+    free(repositoryId)
+    free(typeName)
+    return typeDesc
+
+
+cdef _remove_call_plans(sysid, func_name=None):
+    _metadata_cache._discard(sysid, func_name)
+
+
+# function modules described by client connections, with call plans in use:
+# {sysid: {func_name: WeakSet of _CallPlan}}
+_described = {}
+# descriptions read and removed under the lock, not while compiled by other threads
+_describe_lock = RLock()
+
+
+cdef collectTypeNames(RFC_TYPE_DESC_HANDLE typeDesc, set type_names):
+    cdef RFC_ERROR_INFO errorInfo
+    cdef RFC_ABAP_NAME typeName
+    cdef RFC_FIELD_DESC fieldDesc
+    cdef unsigned i, fieldCount
+    if RfcGetTypeName(typeDesc, typeName, &errorInfo) != RFC_OK:
+        return
+    type_names.add(wrapString(typeName))
+    if RfcGetFieldCount(typeDesc, &fieldCount, &errorInfo) != RFC_OK:
+        return
+    for i in range(fieldCount):
+        if RfcGetFieldDescByIndex(typeDesc, i, &fieldDesc, &errorInfo) == RFC_OK and fieldDesc.typeDescHandle != NULL:
+            collectTypeNames(fieldDesc.typeDescHandle, type_names)
+
+
+cdef bint refreshDescriptions(sysid, func_name) except -1:
+    """
+    Removes expired and invalidated descriptions from SAP NW RFC Lib cache, read
+    again from the backend system when the function module is compiled.
+
+    Descriptions are removed when no call plan using them is referenced, by
+    running calls, TableCursor or TableStream objects. Descriptions of server
+    functions are not removed, neither type descriptions used by them.
+
+    :param sysid: System id
+    :param func_name: Function module compiled
+    :return: False if descriptions of the function module are still in use and
+             removed on a later compilation, True otherwise
+    """
+    cdef RFC_ERROR_INFO errorInfo
+    cdef RFC_PARAMETER_DESC paramDesc
+    cdef RFC_FUNCTION_DESC_HANDLE funcDesc
+    cdef unsigned i, paramCount
+    cdef Server server
+    cdef SAP_UC *sysId
+    cdef SAP_UC *sapuc
+    func_names, stale_types = _metadata_cache._stale_descriptions(sysid)
+    if not stale_types:
+        if func_name not in func_names:
+            return True
+        func_names = {func_name}
+    described = _described.get(sysid, {})
+    types = stale_types and not any(server._repository_id == sysid and server._functions for server in _servers)
+    if types:
+        # type descriptions shared by all described function modules
+        func_names |= set(described)
+    if any(len(described.get(name, ())) > 0 for name in func_names):
+        return False
+    # type names read before function descriptions removed
+    type_names = set()
+    if types:
+        for name in func_names:
+            funcDesc = getCachedFunctionDesc(sysid, name)
+            if funcDesc == NULL or RfcGetParameterCount(funcDesc, &paramCount, &errorInfo) != RFC_OK:
+                continue
+            for i in range(paramCount):
+                if RfcGetParameterDescByIndex(funcDesc, i, &paramDesc, &errorInfo) == RFC_OK and paramDesc.typeDescHandle != NULL:
+                    collectTypeNames(paramDesc.typeDescHandle, type_names)
+    sysId = fillString(sysid)
+    try:
+        # not found errors ignored, descriptions removed by other means
+        for name in func_names:
+            if lookupServerFunction(sysid, name) is None:
+                sapuc = fillString(name)
+                RfcRemoveFunctionDesc(sysId, sapuc, &errorInfo)
+                free(sapuc)
+            described.pop(name, None)
+        for name in type_names:
+            sapuc = fillString(name)
+            RfcRemoveTypeDesc(sysId, sapuc, &errorInfo)
+            free(sapuc)
+    finally:
+        free(sysId)
+    _metadata_cache._refreshed(sysid, func_names, stale_types)
+    return True
+
+
+################################################################################
+# Type Layout
+################################################################################
+
+cdef class _TypeLayout:
+    """Field layout of a structure or table line type
+
+    Holds a copy of all field descriptions of the type description handle,
+    with field names already in SAP unicode format, so that filling and
+    wrapping structures and table rows do not need name based field lookups.
+    Layouts of STRUCTURE and TABLE fields are owned by the parent layout.
+    """
+    cdef RFC_TYPE_DESC_HANDLE typeDesc
+    cdef unsigned fieldCount
+    cdef RFC_FIELD_DESC *fieldDesc
+    # field name: index in fieldDesc
+    cdef dict index
+    # field names, in fieldDesc order
+    cdef list names
+    # _TypeLayout of STRUCTURE and TABLE fields, in fieldDesc order, None if not created yet
+    cdef list children
+
+    def __cinit__(self):
+        self.typeDesc = NULL
+        self.fieldCount = 0
+        self.fieldDesc = NULL
+
+    def __dealloc__(self):
+        free(self.fieldDesc)
+
+
+cdef _TypeLayout newTypeLayout(RFC_TYPE_DESC_HANDLE typeDesc):
+    """
+    Layout of a structure or table line type, not cached. Layouts re-used
+    by calls are owned by the call plan, cf. paramLayout() and fieldLayout().
+
+    :param typeDesc: Type description handle
+    :return: _TypeLayout object
+    """
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned i
+    cdef _TypeLayout layout = _TypeLayout()
+    layout.typeDesc = typeDesc
+    rc = RfcGetFieldCount(typeDesc, &layout.fieldCount, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    layout.fieldDesc = <RFC_FIELD_DESC*> malloc(layout.fieldCount * sizeof(RFC_FIELD_DESC))
+    layout.index = {}
+    layout.names = []
+    layout.children = [None] * layout.fieldCount
+    for i in range(layout.fieldCount):
+        rc = RfcGetFieldDescByIndex(typeDesc, i, &layout.fieldDesc[i], &errorInfo)
+        if rc != RFC_OK:
+            raise wrapError(&errorInfo)
+        name = wrapString(layout.fieldDesc[i].name)
+        layout.index[name] = i
+        layout.names.append(name)
+    return layout
+
+cdef _TypeLayout paramLayout(_CallPlan plan, unsigned i):
+    """Layout of STRUCTURE or TABLE parameter, owned by the plan, None for other types"""
+    cdef RFC_PARAMETER_DESC *paramDesc = &plan.paramDesc[i]
+    if paramDesc.type != RFCTYPE_STRUCTURE and paramDesc.type != RFCTYPE_TABLE:
+        return None
+    cdef _TypeLayout layout = plan.layouts[i]
+    if layout is None:
+        layout = newTypeLayout(paramDesc.typeDescHandle)
+        plan.layouts[i] = layout
+    return layout
+
+cdef _TypeLayout fieldLayout(_TypeLayout parent, unsigned i):
+    """Layout of STRUCTURE or TABLE field, owned by the parent layout, None for other types"""
+    cdef RFC_FIELD_DESC *fieldDesc = &parent.fieldDesc[i]
+    if fieldDesc.type != RFCTYPE_STRUCTURE and fieldDesc.type != RFCTYPE_TABLE:
+        return None
+    cdef _TypeLayout layout = parent.children[i]
+    if layout is None:
+        layout = newTypeLayout(fieldDesc.typeDescHandle)
+        parent.children[i] = layout
+    return layout
+
+cdef _TypeLayout getFieldsLayout(_TypeLayout typeLayout, fields):
+    """
+    Layout of selected fields of a structure or table line type, in given order,
+    created per call. Layouts of STRUCTURE and TABLE fields are shared with
+    the layout of the type.
+
+    :param typeLayout: Layout of the type
+    :param fields: Field names
+    :return: _TypeLayout object
+    """
+    cdef unsigned i, k
+    field_names = tuple(fields)
+    for name in field_names:
+        if name not in typeLayout.index:
+            raise RFCError(f"Field '{name}' not found, expected one of: {', '.join(typeLayout.names)}")
+    cdef _TypeLayout layout = _TypeLayout()
+    layout.typeDesc = typeLayout.typeDesc
+    layout.fieldCount = len(field_names)
+    layout.fieldDesc = <RFC_FIELD_DESC*> malloc(layout.fieldCount * sizeof(RFC_FIELD_DESC))
+    layout.index = {}
+    layout.names = []
+    layout.children = []
+    for i, name in enumerate(field_names):
+        k = typeLayout.index[name]
+        layout.fieldDesc[i] = typeLayout.fieldDesc[k]
+        layout.index[name] = i
+        layout.names.append(name)
+        layout.children.append(fieldLayout(typeLayout, k))
+    return layout
+
 # NOTES ON ERROR HANDLING
 # If an error occurs within a connection object, the error may - depending
 # on the error code - affect the status of the connection object.
@@ -537,6 +1035,18 @@ cdef class Connection:
 
              Examples: https://github.com/SAP/PyRFC/tree/main/examples/timeout
 
+           * ``table_format``
+             Python representation of ABAP tables returned by RFC calls (default is ``rows``):
+
+             - ``rows`` list of rows, each row a dictionary with field names as keys
+             - ``columns`` dictionary with field names as keys and lists of field values as values
+             - ``numpy`` NumPy structured array, for tables with fixed length fields only.
+               Requires ``numpy`` package.
+             - ``arrow`` Apache Arrow ``pyarrow.Table``, for tables with elementary fields only.
+               Requires ``pyarrow`` package.
+
+             Table format can be also set as option for particular RFC call, overriding table format set at connection level.
+
 
     :type config: dict or None (default)
 
@@ -567,6 +1077,7 @@ cdef class Connection:
     cdef RFC_TRANSACTION_HANDLE _tHandle
     cdef RFC_UNIT_HANDLE _uHandle
     cdef ConnectionParameters _connection
+    cdef object _repository_id
 
     @property
     def version(self):
@@ -611,7 +1122,7 @@ cdef class Connection:
         # check and set connection configuration
         config = config or {}
         for k in config:
-            if k not in['dtime', 'return_import_params', 'rstrip', 'check_date', 'check_time', 'timeout']:
+            if k not in['dtime', 'return_import_params', 'rstrip', 'check_date', 'check_time', 'timeout', 'table_format']:
                 raise RFCError(f"Connection configuration option '{k}' is not supported")
         self.__config = {}
         self.__config['rstrip'] = config.get('rstrip', True)
@@ -620,9 +1131,10 @@ cdef class Connection:
         self.__config['check_date'] = config.get('check_date', True)
         self.__config['check_time'] = config.get('check_time', True)
         self.__config['timeout'] = config.get('timeout', None)
+        self.__config['table_format'] = config.get('table_format', 'rows')
 
         # set internal configuration
-        self.bconfig = 0
+        self.bconfig = _table_format_mask(self.__config['table_format'])
         if self.__config['dtime']:
             self.bconfig |= _MASK_DTIME
         if self.__config['return_import_params']:
@@ -635,6 +1147,7 @@ cdef class Connection:
             self.bconfig |= _MASK_CHECK_TIME
         self._connection = ConnectionParameters(**params)
         self._handle = NULL
+        self._repository_id = None
         self.active_transaction = False
         self.active_unit = False
         self._open()
@@ -713,6 +1226,7 @@ cdef class Connection:
             RfcCloseConnection(self._handle, &errorInfo)
             # no error code check, assume closed
             self._handle = NULL
+            self._repository_id = None
 
     cdef _error(self, RFC_ERROR_INFO* errorInfo):
         """
@@ -731,6 +1245,62 @@ cdef class Connection:
 
         raise wrapError(errorInfo)
 
+    cdef _get_repository_id(self):
+        """
+        System id of the connected backend, identifying its metadata repository.
+        """
+        cdef RFC_RC rc
+        cdef RFC_ERROR_INFO errorInfo
+        cdef RFC_ATTRIBUTES attributes
+        if self._repository_id is None:
+            rc = RfcGetConnectionAttributes(self._handle, &attributes, &errorInfo)
+            if rc != RFC_OK:
+                self._error(&errorInfo)
+            self._repository_id = wrapString(attributes.sysId, 8).rstrip('\0')
+        return self._repository_id
+
+    cdef _CallPlan _get_call_plan(self, func_name):
+        """
+        Returns the call plan of a remote function module, compiled on first use.
+
+        :param func_name: Name of the function module
+        :return: _CallPlan object
+        """
+        sysid = self._get_repository_id()
+        plan = _metadata_cache.get(sysid, func_name)
+        if plan is None:
+            with _describe_lock:
+                # expired and invalidated descriptions read again
+                cached = refreshDescriptions(sysid, func_name)
+                plan = compileCallPlan(self._get_function_desc(func_name))
+                _described[sysid][func_name].add(plan)
+                if cached:
+                    # not cached while old descriptions in use
+                    _metadata_cache.put(sysid, func_name, plan)
+        return plan
+
+    cdef RFC_FUNCTION_DESC_HANDLE _get_function_desc(self, func_name) except NULL:
+        """
+        Returns the function description from SAP NW RFC Lib cache of the
+        connected backend repository, read over the connection if not cached.
+
+        :param func_name: Name of the function module
+        :return: Handle of RFC_FUNCTION_DESC_HANDLE
+        """
+        cdef RFC_ERROR_INFO errorInfo
+        cdef RFC_FUNCTION_DESC_HANDLE funcDesc
+        sysid = self._get_repository_id()
+        # SAP NW RFC Lib cache looked up first
+        cdef SAP_UC *funcName = fillString(func_name)
+        with _describe_lock:
+            funcDesc = RfcGetFunctionDesc(self._handle, funcName, &errorInfo)
+        free(funcName)
+        if not funcDesc:
+            self._error(&errorInfo)
+        # type descriptions of described functions removed together, cf. refreshDescriptions()
+        _described.setdefault(sysid, {}).setdefault(func_name, WeakSet())
+        return funcDesc
+
     def ping(self):
         """Send a RFC Ping through the current connection
 
@@ -853,13 +1423,171 @@ cdef class Connection:
 
         :return: A :class:`FunctionDescription` object.
         """
+        with _describe_lock:
+            # not removed while wrapped, cf. refreshDescriptions()
+            return wrapFunctionDescription(self._get_function_desc(func_name.upper()))
+
+    def prefetch_metadata(self, functions=None, types=None, classes=None):
+        """Reads metadata of multiple objects into SAP NW RFC Lib cache,
+        in one round trip to the backend system.
+
+        Objects already cached are not read again. Function descriptions
+        read from the cache are used by subsequent :meth:`call` invocations.
+
+        :param functions: Names of function modules
+        :type functions: list of strings or None (default)
+
+        :param types: Names of structures and table types
+        :type types: list of strings or None (default)
+
+        :param classes: Names of ABAP classes
+        :type classes: list of strings or None (default)
+
+        :returns: Dictionary with ``functions``, ``types`` and ``classes``,
+                  each a dictionary of ``succeeded`` object names list and
+                  ``failed`` dictionary of object names and error messages
+
+        :raises: :exc:`~pyrfc.RFCError` or a subclass
+                 thereof if the metadata query fails.
+        """
         cdef RFC_ERROR_INFO errorInfo
-        funcName = fillString(func_name.upper())
-        cdef RFC_FUNCTION_DESC_HANDLE funcDesc = RfcGetFunctionDesc(self._handle, funcName, &errorInfo)
-        free(funcName)
-        if not funcDesc:
+        cdef RFC_RC rc
+        cdef RFC_METADATA_QUERY_RESULT_HANDLE queryResult
+        cdef SAP_UC** names[3]
+        cdef unsigned counts[3]
+        cdef RFC_METADATA_QUERY_RESULT_ENTRY entry
+        cdef RFC_ABAP_NAME objName
+        cdef unsigned succeeded, failed, i, k
+        cdef RFC_METADATA_OBJ_TYPE[3] objTypes = [RFC_METADATA_FUNCTION, RFC_METADATA_TYPE, RFC_METADATA_CLASS]
+
+        kinds = ("functions", "types", "classes")
+        object_names = (functions or [], types or [], classes or [])
+        for k in range(3):
+            counts[k] = len(object_names[k])
+            names[k] = NULL
+        queryResult = RfcCreateMetadataQueryResult(&errorInfo)
+        if queryResult == NULL:
             self._error(&errorInfo)
-        return wrapFunctionDescription(funcDesc)
+        try:
+            for k in range(3):
+                if counts[k] > 0:
+                    names[k] = <SAP_UC**> malloc(counts[k] * sizeof(SAP_UC*))
+                    memset(names[k], 0, counts[k] * sizeof(SAP_UC*))
+                    for i, name in enumerate(object_names[k]):
+                        names[k][i] = fillString(name.upper())
+            with nogil:
+                rc = RfcMetadataBatchQuery(
+                    self._handle,
+                    <const SAP_UC**> names[0], counts[0],
+                    <const SAP_UC**> names[1], counts[1],
+                    <const SAP_UC**> names[2], counts[2],
+                    queryResult, &errorInfo
+                )
+            if rc != RFC_OK:
+                self._error(&errorInfo)
+            result = {}
+            for k in range(3):
+                rc = RfcDescribeMetadataQueryResult(queryResult, objTypes[k], &succeeded, &failed, &errorInfo)
+                if rc != RFC_OK:
+                    self._error(&errorInfo)
+                kind_result = {"succeeded": [], "failed": {}}
+                for i in range(succeeded):
+                    rc = RfcGetMetadataQuerySucceededEntry(queryResult, objTypes[k], i, objName, &errorInfo)
+                    if rc != RFC_OK:
+                        self._error(&errorInfo)
+                    kind_result["succeeded"].append(wrapString(objName))
+                for i in range(failed):
+                    rc = RfcGetMetadataQueryFailedEntry(queryResult, objTypes[k], i, &entry, &errorInfo)
+                    if rc != RFC_OK:
+                        self._error(&errorInfo)
+                    kind_result["failed"][wrapString(entry.name)] = wrapString(entry.errorMessage)
+                result[kinds[k]] = kind_result
+            return result
+        finally:
+            for k in range(3):
+                if names[k] != NULL:
+                    for i in range(counts[k]):
+                        free(names[k][i])
+                    free(names[k])
+            RfcDestroyMetadataQueryResult(queryResult, NULL)
+
+    def save_metadata(self, path, functions=None, types=None):
+        """Saves function and type descriptions to a metadata snapshot file
+
+        The JSON snapshot contains the system id and release of the
+        connected backend system and the snapshot creation time, checked
+        by :meth:`load_metadata`.
+
+        :param path: Snapshot file path
+        :type path: string
+
+        :param functions: Names of function modules
+        :type functions: list of strings or None (default)
+
+        :param types: Names of structures and table types
+        :type types: list of strings or None (default)
+
+        :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if the
+                 connection is not open or a description can't be read.
+        """
+        if not self.alive:
+            raise RFCError("Metadata snapshot not saved, connection not open.")
+        attributes = self.get_connection_attributes()
+        snapshot = {
+            'version': _METADATA_SNAPSHOT_VERSION,
+            'sysid': attributes['sysId'],
+            'release': attributes['partnerRel'],
+            'timestamp': time_ns() // 1000000000,
+            'functions': [
+                _func_desc_to_dict(self.get_function_description(func_name))
+                for func_name in functions or []
+            ],
+            'types': [
+                _type_desc_to_dict(self.type_desc_get(type_name))
+                for type_name in types or []
+            ]
+        }
+        # replaced at once, for processes loading the snapshot
+        temp_path = f"{path}.{getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        replace(temp_path, path)
+
+    def load_metadata(self, path, max_age=None, overwrite=False):
+        """Loads function and type descriptions from a metadata snapshot file
+        into SAP NW RFC Lib cache
+
+        Loaded descriptions are used by subsequent :meth:`call` invocations,
+        without reading metadata from the backend system.
+
+        Descriptions already cached can be in use by calls and servers and are
+        replaced only if ``overwrite`` is True. Cached call plans of the system and
+        description handles of server functions are then refreshed. Replace
+        descriptions only when no calls are running and no :class:`TableCursor`
+        or :class:`TableStream` objects of the system are open.
+
+        :param path: Snapshot file path, saved by :meth:`save_metadata`
+        :type path: string
+
+        :param max_age: Maximum snapshot age in seconds, None (default) for any age
+        :type max_age: int or None
+
+        :param overwrite: Replace descriptions already cached (default is False)
+        :type overwrite: bool
+
+        :returns: Dictionary with ``functions`` and ``types`` names lists
+
+        :raises: :exc:`~pyrfc.RFCError` if the connection is not open, the snapshot
+                 is not of the connected backend system and release, older than
+                 ``max_age`` seconds, or descriptions are already cached and
+                 ``overwrite`` is False.
+        """
+        if not self.alive:
+            raise RFCError("Metadata snapshot not loaded, connection not open.")
+        snapshot = _read_metadata_snapshot(path, max_age)
+        attributes = self.get_connection_attributes()
+        checkSnapshotSystem(snapshot, attributes['sysId'], attributes['partnerRel'])
+        return addSnapshotDescriptions(snapshot, overwrite)
 
     def call(self, func_name, options=None, **params):
         """
@@ -883,11 +1611,40 @@ cdef class Connection:
 
               Examples: https://github.com/SAP/PyRFC/tree/main/examples/timeout
 
+            - ``lazy_tables`` If ``True``, TABLE parameters are returned as :class:`~pyrfc.TableCursor`
+              read-only sequences, converting table rows to Python on access, instead of lists of rows.
+              Useful for large tables, when only some rows are processed. Default: ``False``
+
+            - ``table_format`` Python representation of returned tables, ``rows``, ``columns``, ``numpy`` or ``arrow``, overriding
+              the ``table_format`` set at connection level. Can't be combined with ``lazy_tables``
+              or ``stream_tables``.
+
+            - ``stream_tables`` If ``True``, TABLE parameters are returned as :class:`~pyrfc.TableStream`
+              iterators, converting table rows to Python when iterated. Python memory of large tables is
+              bounded by the ``chunk_size``. Default: ``False``
+
+            - ``chunk_size`` Number of rows returned by :class:`~pyrfc.TableStream` iterators as one list.
+              Default: ``0``, rows are returned one by one
+
+            - ``intern_fields`` If ``True``, equal values of string, date and time fields of returned tables are
+              the same Python object, reducing the memory of tables with repeating values. With ``arrow`` table
+              format, string columns are returned dictionary encoded. Not used with ``numpy`` table format. Default: ``False``
+
+            - ``bcd_float`` If ``True``, BCD fields of ``numpy`` tables are returned as ``f8`` floats, losing
+              precision of large or exact decimal values. Default: ``False``, returned as ``Decimal`` objects
+
+            - ``fields`` Dictionary of STRUCTURE or TABLE parameter names and lists of field names. Only these fields
+              are returned, in given order, other fields are not converted to Python.
+
+              Example: ``{"ORDER_ITEMS_OUT": ["DOC_NUMBER", "MATERIAL", "NET_VALUE"]}``
+
         :type options: dictionary
 
         :param **params:
             Parameter of the function module.
             All non optional IMPORT, CHANGING, and TABLE parameters must be provided.
+            TABLE parameters are given as list of rows, or in column format, as dictionary
+            of equal length lists, NumPy structured array or Arrow table.
 
         :return: Dictionary with all EXPORT, CHANGING, and TABLE parameters.
                  The IMPORT parameters are also given, if :attr:`Connection.config.return_import_params`
@@ -899,44 +1656,69 @@ cdef class Connection:
         cdef RFC_ERROR_INFO errorInfo
         cdef RFC_ERROR_INFO openErrorInfo
         cdef SAP_UC *cName
+        cdef _CallPlan plan
+        cdef unsigned config = self.bconfig
         if type(func_name) is not str:
             raise RFCError("Remote function module name must be unicode string, received:", func_name, type(func_name))
-        cdef SAP_UC *funcName = fillString(func_name)
         if self._handle == NULL:
             raise RFCError(f"Remote function module '{func_name}' invocation rejected because the connection is closed")
-        cdef RFC_FUNCTION_DESC_HANDLE funcDesc = RfcGetFunctionDesc(self._handle, funcName, &errorInfo)
-        free(funcName)
-        if not funcDesc:
-            self._error(&errorInfo)
-        cdef RFC_FUNCTION_HANDLE funcCont = RfcCreateFunction(funcDesc, &errorInfo)
+        options = options or {}
+        if 'table_format' in options:
+            config = (config & ~_MASK_TABLE_FORMAT) | _table_format_mask(options['table_format'])
+        if options.get('intern_fields', False):
+            config |= _MASK_INTERN_FIELDS
+        if options.get('bcd_float', False):
+            config |= _MASK_BCD_FLOAT
+        lazy_tables = options.get('lazy_tables', False)
+        if lazy_tables and config & _MASK_TABLE_FORMAT:
+            raise RFCError("Call option 'lazy_tables' can't be combined with table format other than 'rows'")
+        stream_tables = options.get('stream_tables', False)
+        if stream_tables and lazy_tables:
+            raise RFCError("Call option 'stream_tables' can't be combined with 'lazy_tables'")
+        if stream_tables and config & _MASK_TABLE_FORMAT:
+            raise RFCError("Call option 'stream_tables' can't be combined with table format other than 'rows'")
+        chunk_size = options.get('chunk_size', 0)
+        if type(chunk_size) is not int or chunk_size < 0:
+            raise RFCError(f"Call option 'chunk_size' must be a non-negative integer, received '{chunk_size}'")
+        plan = self._get_call_plan(func_name)
+        layouts = fieldsLayouts(plan, options['fields']) if options.get('fields') else None
+        cdef RFC_FUNCTION_HANDLE funcCont = RfcCreateFunction(plan.funcDesc, &errorInfo)
         if not funcCont:
             self._error(&errorInfo)
         cdef int isActive = 0
-        options = options or {}
-        cancel_timer = None
+        timeout_entry = None
+        owner = None
+        if lazy_tables or stream_tables:
+            # function container released with the last TableCursor or TableStream
+            owner = _FunctionContainer.__new__(_FunctionContainer)
+            (<_FunctionContainer> owner).handle = funcCont
+            (<_FunctionContainer> owner).plan = plan
         try:  # now we have a function module
             if 'not_requested' in options:
                 skip_parameters = options['not_requested']
                 if type(skip_parameters) is not list:
                     skip_parameters = [skip_parameters]
                 for name in skip_parameters:
-                    cName = fillString(name)
-                    rc = RfcSetParameterActive(funcCont, cName, isActive, &errorInfo)
-                    free(cName)
+                    if name in plan.index:
+                        rc = RfcSetParameterActive(funcCont, plan.paramDesc[<unsigned> plan.index[name]].name, isActive, &errorInfo)
+                    else:
+                        # unknown parameter, error raised by NW RFC SDK
+                        cName = fillString(name)
+                        rc = RfcSetParameterActive(funcCont, cName, isActive, &errorInfo)
+                        free(cName)
                     if rc != RFC_OK:
                         self._error(&errorInfo)
             # set connection timeout, starts before writing input parameters to container
             timeout = options.get('timeout', self.__config['timeout'])
             if timeout is not None:
-                cancel_timer = Timer(timeout, cancel_connection, (self,))
-                cancel_timer.start()
+                timeout_entry = _timeout_scheduler.schedule(timeout, self)
             for name, value in params.iteritems():
-                functionContainerSet(funcDesc, funcCont, name, value, self.bconfig)
+                callPlanSet(plan, funcCont, name, value, config)
             # save old handle for troubleshooting
             with nogil:
                 rc = RfcInvoke(self._handle, funcCont, &errorInfo)
-            if cancel_timer is not None:
-                cancel_timer.cancel()
+            if timeout_entry is not None:
+                _timeout_scheduler.unschedule(timeout_entry)
             # print("invoke:", errorInfo.group, rc, self.handle, self.is_valid())
             if rc != RFC_OK:
                 if errorInfo.code in (
@@ -959,14 +1741,15 @@ cdef class Connection:
                     elif errorInfo.code == RFC_CANCELED:
                         errorInfo.message = fillString(f"Connection was canceled: {closed_handle}. New handle: {self.handle}")
                 self._error(&errorInfo)
-            if self.bconfig & _MASK_RETURN_IMPORT_PARAMS:
-                return functionContainerGet(funcDesc, funcCont, <RFC_DIRECTION> 0, self.bconfig)
+            if config & _MASK_RETURN_IMPORT_PARAMS:
+                return callPlanGet(plan, funcCont, <RFC_DIRECTION> 0, config, owner, layouts, stream_tables, chunk_size)
             else:
-                return functionContainerGet(funcDesc, funcCont, RFC_IMPORT, self.bconfig)
+                return callPlanGet(plan, funcCont, RFC_IMPORT, config, owner, layouts, stream_tables, chunk_size)
         finally:
-            if cancel_timer is not None:
-                cancel_timer.cancel()
-            RfcDestroyFunction(funcCont, NULL)
+            if timeout_entry is not None:
+                _timeout_scheduler.unschedule(timeout_entry)
+            if owner is None:
+                RfcDestroyFunction(funcCont, NULL)
 
     ##########################################################################
     #  HELPER METHODS
@@ -1004,6 +1787,8 @@ cdef class Connection:
         cdef RFC_RC rc = RfcRemoveTypeDesc(sysId, typeName, &errorInfo)
         free(sysId)
         free(typeName)
+        # call plans may refer to the removed type
+        _remove_call_plans(sysid)
         if rc != RFC_OK:
             self._error(&errorInfo)
         return rc
@@ -1025,6 +1810,7 @@ cdef class Connection:
         cdef RFC_RC rc = RfcRemoveFunctionDesc(sysId, funcName, &errorInfo)
         free(sysId)
         free(funcName)
+        _remove_call_plans(sysid, func_name)
         if rc != RFC_OK:
             self._error(&errorInfo)
         return rc
@@ -1050,8 +1836,8 @@ cdef class Connection:
         cdef RFC_RC rc
         cdef RFC_ERROR_INFO errorInfo
         cdef SAP_UC* queueName
-        cdef RFC_FUNCTION_DESC_HANDLE funcDesc
         cdef RFC_FUNCTION_HANDLE funcCont
+        cdef _CallPlan plan
 
         if not self.alive:
             self._open()
@@ -1071,17 +1857,13 @@ cdef class Connection:
 
         try:
             for func_name, params in calls:
-                funcName = fillString(func_name)
-                funcDesc = RfcGetFunctionDesc(self._handle, funcName, &errorInfo)
-                free(funcName)
-                if not funcDesc:
-                    self._error(&errorInfo)
-                funcCont = RfcCreateFunction(funcDesc, &errorInfo)
+                plan = self._get_call_plan(func_name)
+                funcCont = RfcCreateFunction(plan.funcDesc, &errorInfo)
                 if not funcCont:
                     self._error(&errorInfo)
                 try:
                     for name, value in params.iteritems():
-                        functionContainerSet(funcDesc, funcCont, name, value, self.bconfig)
+                        callPlanSet(plan, funcCont, name, value, self.bconfig)
                     # Add RFC call to transaction
                     rc = RfcInvokeInTransaction(self._tHandle, funcCont, &errorInfo)
                     if rc != RFC_OK:
@@ -1151,8 +1933,8 @@ cdef class Connection:
         cdef SAP_UC** queueNames
         cdef RFC_UNIT_ATTRIBUTES unitAttr
         cdef RFC_UNIT_IDENTIFIER uIdentifier
-        cdef RFC_FUNCTION_DESC_HANDLE funcDesc
         cdef RFC_FUNCTION_HANDLE funcCont
+        cdef _CallPlan plan
         cdef SAP_UC* sapuc
 
         if not self.alive:
@@ -1236,7 +2018,7 @@ cdef class Connection:
 
         # queue (deallocate)
         if len(queue_names) > 0:
-            for i, queue_name in enumerate(queue_names):
+            for i in range(queueNameCount):
                 free(queueNames[i])
             free(queueNames)
         # uid (deallocate)
@@ -1248,17 +2030,13 @@ cdef class Connection:
 
         try:
             for func_name, params in calls:
-                funcName = fillString(func_name)
-                funcDesc = RfcGetFunctionDesc(self._handle, funcName, &errorInfo)
-                free(funcName)
-                if not funcDesc:
-                    self._error(&errorInfo)
-                funcCont = RfcCreateFunction(funcDesc, &errorInfo)
+                plan = self._get_call_plan(func_name)
+                funcCont = RfcCreateFunction(plan.funcDesc, &errorInfo)
                 if not funcCont:
                     self._error(&errorInfo)
                 try:
                     for name, value in params.iteritems():
-                        functionContainerSet(funcDesc, funcCont, name, value, self.bconfig)
+                        callPlanSet(plan, funcCont, name, value, self.bconfig)
                     # Add RFC call to unit
                     rc = RfcInvokeInUnit(self._uHandle, funcCont, &errorInfo)
                     if rc != RFC_OK:
@@ -1266,7 +2044,6 @@ cdef class Connection:
                 finally:
                     RfcDestroyFunction(funcCont, NULL)
             # execute
-            _server_log("bgRFC", "Invocation finished. submitting unit.")
             with nogil:
                 rc = RfcSubmitUnit(self._uHandle, &errorInfo)
             if rc != RFC_OK:
@@ -1357,7 +2134,7 @@ cdef class Connection:
             raise RFCError("Argument 'background' must be a boolean value.")
         return {'background': background, 'id': id, "queued": False}
 
-    def fill_and_submit_unit(self, unit, calls, queue_names=None, attributes=None):
+    def fill_and_submit_unit(self, unit, calls, queue_names=None, attributes=None, options=None):
         """Fills a unit with one or more RFC and submits it to the backend.
 
         Fills a unit for this connection, prepare the invocation
@@ -1385,27 +2162,33 @@ cdef class Connection:
         :param attributes: optional argument for attributes of the unit -- only valid if the background protocol
               is used. The attributes dict may contain the following keywords:
 
-              =============== ============================= ======================= ==========================================================================================
-              keyword         default                       type                    description
-              =============== ============================= ======================= ==========================================================================================
-              kernel_trace    0                             int                     If != 0, the backend will write kernel traces, while executing this unit.
-              sat_trace       0                             int                     If != 0, the backend will write statistic records, while executing this unit.
-              unit_history    0                             int                     If != 0, the backend will keep a "history" for this unit.
-              lock            0                             int                     Used only for type Q: If != 0, the unit will be written to the queue, but not processed.
-                                                                                    The unit can then be started manually in the ABAP debugger.
-              no_commit_check 0                             int                     Per default the backend will check during execution of a unit, whether one of the
-                                                                                    unit's function modules triggers an explicit or implicit COMMITWORK.
-                                                                                    In this case the unit is aborted with an error, because the transactional integrity of
-                                                                                    this unit cannot be guaranteed. By setting "no_commit_check" to true (!=0), this behavior
-                                                                                    can be suppressed, meaning the unit will be executed anyway, even if one of it's
-                                                                                    function modules "misbehaves" and triggers a COMMIT WORK.
-              user            current operating system user String, len |nbsp| 12   Sender User (optional).
-              client          "000"                         String, len |nbsp| 3    Sender Client ("Mandant") (optional).
-              t_code          ""                            String, len |nbsp| 20   Sender Transaction Code (optional).
-              program         current executable name       String, len |nbsp| 40   Sender Program (optional).
-              =============== ============================= ======================= ==========================================================================================
+              =============== ============================= ===================== ==========================================================================================
+              keyword         default                       type                  description
+              =============== ============================= ===================== ==========================================================================================
+              kernel_trace    0                             int                   If != 0, the backend will write kernel traces, while executing this unit.
+              sat_trace       0                             int                   If != 0, the backend will write statistic records, while executing this unit.
+              unit_history    0                             int                   If != 0, the backend will keep a "history" for this unit.
+              lock            0                             int                   Used only for type Q: If != 0, the unit will be written to the queue, but not processed.
+                                                                                  The unit can then be started manually in the ABAP debugger.
+              no_commit_check 0                             int                   Per default the backend will check during execution of a unit, whether one of the
+                                                                                  unit's function modules triggers an explicit or implicit COMMITWORK.
+                                                                                  In this case the unit is aborted with an error, because the transactional integrity of
+                                                                                  this unit cannot be guaranteed. By setting "no_commit_check" to true (!=0), this behavior
+                                                                                  can be suppressed, meaning the unit will be executed anyway, even if one of it's
+                                                                                  function modules "misbehaves" and triggers a COMMIT WORK.
+              user            current operating system user String, len |nbsp| 12 Sender User (optional).
+              client          "000"                         String, len |nbsp| 3  Sender Client ("Mandant") (optional).
+              t_code          ""                            String, len |nbsp| 20 Sender Transaction Code (optional).
+              program         current executable name       String, len |nbsp| 40 Sender Program (optional).
+              =============== ============================= ===================== ==========================================================================================
 
         :type attributes: dict or None (default)
+        :param options: optional call options. Allowed keys:
+
+            - ``timeout`` Cancel RFC connection if the unit is not filled and submitted within ``timeout`` seconds.
+              Overrides the timeout set as client connection configuration option.
+
+        :type options: dict or None (default)
         :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if an error
                  occurred. In this case, the unit is destroyed.
         """
@@ -1425,27 +2208,38 @@ cdef class Connection:
                            "or confirm_unit().")
         bg = unit['background']
         unit_id = unit['id']
+        options = options or {}
+        timeout = options.get('timeout', self.__config['timeout'])
 
         if bg is True:
             if len(unit_id) != RFC_UNITID_LN:
                 raise TypeError(f"Length of parameter 'unit['id']' must be {RFC_UNITID_LN} chars, found {len(unit_id)}.")
-            unit['queued'] = self._create_and_submit_unit(unit_id, calls, queue_names, attributes)
         elif bg is False:
             if len(unit_id) != RFC_TID_LN:
                 raise TypeError(f"Length of parameter 'unit['id']' must be {RFC_TID_LN} chars, found {len(unit_id)}.")
             if attributes is not None:
                 raise RFCError("Argument 'attributes' not valid. (t/qRFC does not support attributes.)")
-            if queue_names is None or type(queue_names) is list and len(queue_names) == 0:
+            if not (queue_names is None or type(queue_names) is list and len(queue_names) == 0 or len(queue_names) == 1):
+                raise RFCError("Argument 'queue_names' not valid. (t/qRFC only support one queue name.)")
+        else:
+            raise RFCError("Argument 'unit' not valid. (Is unit['background'] boolean?)")
+
+        timeout_entry = None
+        if timeout is not None:
+            timeout_entry = _timeout_scheduler.schedule(timeout, self)
+        try:
+            if bg is True:
+                unit['queued'] = self._create_and_submit_unit(unit_id, calls, queue_names, attributes)
+            elif queue_names is None or len(queue_names) == 0:
                 self._create_and_submit_transaction(unit_id, calls)
                 unit['queued'] = False
-            elif len(queue_names) == 1:
+            else:
                 queue_name = queue_names[0]
                 self._create_and_submit_transaction(unit_id, calls, queue_name)
                 unit['queued'] = True
-            else:
-                raise RFCError("Argument 'queue_names' not valid. (t/qRFC only support one queue name.)")
-        else:
-            raise RFCError("Argument 'unit' not valid. (Is unit['background'] boolean?)")
+        finally:
+            if timeout_entry is not None:
+                _timeout_scheduler.unschedule(timeout_entry)
         return unit
 
     def get_unit_state(self, unit):
@@ -1512,17 +2306,15 @@ cdef class Connection:
 # SERVER FUNCTIONALITY
 ################################################################################
 
-# global information about served functions / callbacks
-# "function_name": {"funcDescHandle": FunctionDescription object,
-#                   "callback": Python function,
-#                   "server": Server object)
-server_functions = {}
-
-# "server_log": Server logging flag, default False
-server_context = {}
+# servers with installed functions, each one keeping own functions in Server._functions
+# {"function_name": {"func_desc_handle": <uintptr_t> RFC_FUNCTION_DESC_HANDLE,
+#                    "callback": Python function,
+#                    "server": Server object}}
+_servers = []
 
-def _server_log(origin, log_message, *args):
-    if server_context.get("server_log", False):
+def _server_log(origin, log_message, *args, server=None):
+    # logged if server_log set for the server
+    if server is not None and server.options["server_context"]["server_log"]:
         if version_info > (3, 12):
             from datetime import UTC
             print (f"[{datetime.now(UTC).replace(tzinfo=None)} UTC] {origin} '{log_message}'", *args)
@@ -1530,36 +2322,107 @@ def _server_log(origin, log_message, *args):
             print (f"[{datetime.utcnow()} UTC] {origin} '{log_message}'", *args)
 
 
+class _ServerDispatcher(object):
+    """Invokes server callbacks, with bounded concurrency
+
+    Callbacks are invoked on the executor, if given, or in the SDK worker
+    thread receiving the request. Coroutine functions are run on the event loop.
+    Requests beyond max_in_flight wait, the GIL released, and are rejected
+    when max_queue requests already waiting.
+    """
+    def __init__(self, executor=None, max_in_flight=None, max_queue=None, loop=None):
+        self._executor = executor
+        self._loop = loop
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._cond = Condition()
+        self._in_flight = 0
+        self._waiting = 0
+
+    @property
+    def stats(self):
+        with self._cond:
+            return {"in_flight": self._in_flight, "waiting": self._waiting}
+
+    def __call__(self, callback, request_context, params):
+        with self._cond:
+            if self._max_in_flight is not None and self._in_flight >= self._max_in_flight:
+                if self._max_queue is not None and self._waiting >= self._max_queue:
+                    raise ExternalRuntimeError(
+                        message=f"Server busy: {self._in_flight} requests in process, {self._waiting} waiting",
+                        code=RFC_EXTERNAL_FAILURE
+                    )
+                self._waiting += 1
+                try:
+                    while self._in_flight >= self._max_in_flight:
+                        self._cond.wait()
+                finally:
+                    self._waiting -= 1
+            self._in_flight += 1
+        try:
+            if iscoroutinefunction(callback):
+                if self._loop is None or not self._loop.is_running():
+                    raise ExternalRuntimeError(
+                        message="Server event loop is not running",
+                        code=RFC_EXTERNAL_FAILURE
+                    )
+                return run_coroutine_threadsafe(callback(request_context, **params), self._loop).result()
+            if self._executor is None:
+                return callback(request_context, **params)
+            return self._executor.submit(callback, request_context, **params).result()
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+
+cdef dict lookupServerFunction(sysid, func_name):
+    """
+    Server function installed by a server of the backend system id.
+
+    SAP NW RFC Lib metadata lookup and generic function handler are installed per
+    process and get the connection only, not the server handle: the server is
+    resolved by the system id of the calling backend.
+
+    :return: Dictionary with ``func_desc_handle``, ``callback`` and ``server``, or None
+    """
+    cdef Server server
+    for server in _servers:
+        if server._repository_id == sysid and func_name in server._functions:
+            return server._functions[func_name]
+    return None
+
+
 cdef RFC_RC metadataLookup(
             const SAP_UC* functionName,
             RFC_ATTRIBUTES rfcAttributes,
             RFC_FUNCTION_DESC_HANDLE *funcDescHandle
         ) noexcept with gil:
-    global server_functions
     origin = "metadataLookup"
+    server = None
     try:
         function_name = wrapString(functionName)
-        if function_name not in server_functions:
-            _server_log(origin, f"No metadata found for function '{function_name}'.")
+        func_metadata = lookupServerFunction(wrapString(rfcAttributes.sysId, 8).rstrip('\0'), function_name)
+        if func_metadata is None:
+            # not installed by any server of the system
             return RFC_NOT_FOUND
-        func_metadata = server_functions[function_name]
-        # callback = func_metadata['callback']
+        server = func_metadata['server']
         funcDescHandle[0] = <RFC_FUNCTION_DESC_HANDLE><uintptr_t>func_metadata['func_desc_handle']
-        _server_log(origin, f"Function '{function_name}' handle {<uintptr_t>funcDescHandle[0]}.")
+        _server_log(origin, f"Function '{function_name}' handle {<uintptr_t>funcDescHandle[0]}.", server=server)
         return RFC_OK
     except Exception as ex:
-        _server_log(origin, "error", ex)
+        _server_log(origin, "error", ex, server=server)
         return RFC_NOT_FOUND
 
 
-cdef get_server_context(RFC_CONNECTION_HANDLE rfcHandle, RFC_ERROR_INFO* serverErrorInfo) with gil:
+cdef get_server_context(RFC_CONNECTION_HANDLE rfcHandle, RFC_ERROR_INFO* serverErrorInfo, server) with gil:
     cdef RFC_SERVER_CONTEXT context
     cdef RFC_RC rc
     origin = "get_server_context"
     try:
         rc = RfcGetServerContext(rfcHandle, &context, serverErrorInfo)
         if rc != RFC_OK or serverErrorInfo.code != RFC_OK:
-            _server_log(origin, f"error rc={rc} code={serverErrorInfo.code}")
+            _server_log(origin, f"error rc={rc} code={serverErrorInfo.code}", server=server)
             return None
         server_context = {
             "call_type": UnitCallType(context.type),
@@ -1571,7 +2434,7 @@ cdef get_server_context(RFC_CONNECTION_HANDLE rfcHandle, RFC_ERROR_INFO* serverE
             server_context ["unit_attributes"] = wrapUnitAttributes(context.unitAttributes)
         return server_context
     except Exception as ex:
-        _server_log(origin, "error", ex)
+        _server_log(origin, "error", ex, server=server)
         return None
 
 cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE funcHandle, RFC_ERROR_INFO* serverErrorInfo) noexcept with gil:
@@ -1581,12 +2444,31 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
     cdef RFC_FUNCTION_DESC_HANDLE funcDesc
     cdef RFC_ABAP_NAME funcName
 
-    global server_functions
     origin = "genericHandler"
+    server = None
 
     try:
+        funcDesc = RfcDescribeFunction(funcHandle, NULL)
+        RfcGetFunctionName(funcDesc, funcName, NULL)
+
+        func_name = wrapString(funcName)
+        rc = RfcGetConnectionAttributes(rfcHandle, &attributes, &errorInfo)
+        conn_attr = wrapConnectionAttributes(attributes) if rc == RFC_OK else None
+
+        func_data = Server._request_function(func_name, conn_attr)
+        if func_data is None:
+            # not installed by any server of the system
+            new_error = ExternalRuntimeError(
+                message=f"Server function '{func_name}' not installed for the calling system",
+                code=RFC_NOT_FOUND
+            )
+            fillError(new_error, serverErrorInfo)
+            return RFC_NOT_FOUND
+        callback = func_data['callback']
+        server = func_data['server']
+
         # section 5.6.2 of SAP NWRFC SDK Programming Guide 7.50
-        context = get_server_context(rfcHandle, serverErrorInfo)
+        context = get_server_context(rfcHandle, serverErrorInfo, server)
         if context is None:
             err_msg = f"Error code {serverErrorInfo.code} when getting server context for connection '{<uintptr_t>rfcHandle}'"
             new_error = ExternalRuntimeError(
@@ -1596,30 +2478,15 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
             fillError(new_error, serverErrorInfo)
             return RFC_EXTERNAL_FAILURE
 
-        funcDesc = RfcDescribeFunction(funcHandle, NULL)
-        RfcGetFunctionName(funcDesc, funcName, NULL)
-
-        func_name = wrapString(funcName)
-        if func_name not in server_functions:
-            _server_log(origin, f"error: No metadata found for function '{function_name}'")
-            return RFC_NOT_FOUND
-
-        func_data = server_functions[func_name]
-        callback = func_data['callback']
-        server = func_data['server']
-        # func_desc = func_data['func_desc_handle']
-        rc = RfcGetConnectionAttributes(rfcHandle, &attributes, &errorInfo)
-        if rc != RFC_OK:
-            _server_log(origin, f"Request for '{func_name}': Error while retrieving connection attributes (rc={rc}).")
-            if not server.debug:
-                raise ExternalRuntimeError(message="Invalid connection handle.", code=RFC_EXTERNAL_FAILURE)
+        if conn_attr is None:
+            # accepted by debug server, cf. Server._request_function()
             conn_attr = {}
         else:
-            conn_attr = wrapConnectionAttributes(attributes)
             _server_log(
                 origin,
                 "User '{user}' from system '{sysId}' client '{client}' host '{partnerHost}' invokes '{func_name}'"
-                .format(func_name=func_name, **conn_attr)
+                .format(func_name=func_name, **conn_attr),
+                server=server
             )
 
         # Context of the request. Might later be extended by activeParameter information.
@@ -1629,23 +2496,23 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
         }
 
         # Authentication check
-        auth_function = server_context["authentication_check"]
+        auth_function = server.options["server_context"]["authentication_check"]
         if callable(auth_function):
             check = auth_function(func_name, request_context)
             if check != RCStatus.OK:
                 message = f"No authentication for '{func_name}': {check}"
-                _server_log(origin, message)
+                _server_log(origin, message, server=server)
                 new_error = ExternalRuntimeError(message=message, code=RFC_EXTERNAL_FAILURE)
                 fillError(new_error, serverErrorInfo)
                 return RFC_EXTERNAL_FAILURE
-        _server_log(origin, f"Authenticated '{func_name}'", request_context['server_context'])
+        _server_log(origin, f"Authenticated '{func_name}'", request_context['server_context'], server=server)
 
         # Filter out variables that are of direction u'RFC_EXPORT'
         # (these will be set by the callback function)
         func_handle_variables = functionContainerGet(funcDesc, funcHandle, RFC_EXPORT, server.bconfig)
 
-        # Invoke callback function
-        result = callback(request_context, **func_handle_variables)
+        # Invoke callback function, on the server executor if configured
+        result = (<Server> server)._dispatcher(callback, request_context, func_handle_variables)
 
         # Return results
         if context["call_type"] != UnitCallType.background_unit:
@@ -1654,7 +2521,7 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
                     functionContainerSet(funcDesc, funcHandle, name, value, server.bconfig)
             else:
                 message = f"error: callback function {func_name} returned {type(result)} instead of dictionary"
-                _server_log(origin, message)
+                _server_log(origin, message, server=server)
                 new_error = ExternalRuntimeError(message=message, code=RFC_EXTERNAL_FAILURE)
                 fillError(new_error, serverErrorInfo)
                 return RFC_EXTERNAL_FAILURE
@@ -1668,21 +2535,21 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
         # returns:   RFC_EXTERNAL_FAILURE
         fillError(e, serverErrorInfo)
         serverErrorInfo.code = RFC_EXTERNAL_FAILURE  # Overwrite code, if set.
-        _server_log(origin, f"Request for '{func_name}' raises ExternalRuntimeError {e} - code set to RFC_EXTERNAL_FAILURE.")
+        _server_log(origin, f"Request for '{func_name}' raises ExternalRuntimeError {e} - code set to RFC_EXTERNAL_FAILURE.", server=server)
         return RFC_EXTERNAL_FAILURE
     except ABAPRuntimeError as e:  # ABAP Message
         # Parameter: msg_type, msg_class, msg_number, msg_v1-v4
         # returns:   RFC_ABAP_MESSAGE
         fillError(e, serverErrorInfo)
         serverErrorInfo.code = RFC_ABAP_MESSAGE  # Overwrite code, if set.
-        _server_log(origin, f"Request for '{func_name}' raises ABAPRuntimeError {e} - code set to RFC_ABAP_MESSAGE.")
+        _server_log(origin, f"Request for '{func_name}' raises ABAPRuntimeError {e} - code set to RFC_ABAP_MESSAGE.", server=server)
         return RFC_ABAP_MESSAGE
     except ABAPApplicationError as e:  # ABAP Exception in implementing function
         # Parameter: key (optional: msg_type, msg_class, msg_number, msg_v1-v4)
         # returns:   RFC_ABAP_EXCEPTION
         fillError(e, serverErrorInfo)
         serverErrorInfo.code = RFC_ABAP_EXCEPTION  # Overwrite code, if set.
-        _server_log(origin, f"Request for '{func_name}' raises ABAPApplicationError {e} - code set to RFC_ABAP_EXCEPTION.")
+        _server_log(origin, f"Request for '{func_name}' raises ABAPApplicationError {e} - code set to RFC_ABAP_EXCEPTION.", server=server)
         return RFC_ABAP_EXCEPTION
     except Exception as ex:
         exctype, value = exc_info()[:2]
@@ -1691,7 +2558,8 @@ cdef RFC_RC genericHandler(RFC_CONNECTION_HANDLE rfcHandle, RFC_FUNCTION_HANDLE
             f"Request for '{func_name}' raises an invalid exception:\n Exception: {exctype}\n Values: {value}\n"
             "Callback functions may only raise ABAPApplicationError, ABAPRuntimeError, or ExternalRuntimeError.\n"
             "The values of the request were:\n"
-            f"params: {func_handle_variables}\nrequest_context: {request_context}"
+            f"params: {func_handle_variables}\nrequest_context: {request_context}",
+            server=server
         )
         new_error = ExternalRuntimeError(
             message="Invalid exception raised by callback function.",
@@ -1745,6 +2613,37 @@ cdef class Server:
              behaves more permissive, e.g. allows incoming calls without a
              valid connection handle. (default is False)
 
+           * ``executor``
+             :class:`concurrent.futures.Executor` invoking callback functions, like
+             a thread pool or process pool. The SDK worker thread receiving the request
+             only reads and writes the function container (default is None, callbacks
+             are invoked in the SDK worker thread)
+
+           * ``max_in_flight``
+             Maximum number of callback functions invoked concurrently. Further requests
+             wait until a callback function completes (default is None, not limited)
+
+           * ``max_queue``
+             Maximum number of requests waiting when ``max_in_flight`` callback functions
+             are running. Further requests are rejected with ``RFC_EXTERNAL_FAILURE``
+             (default is None, not limited)
+
+           * ``process_pool``
+             Number of worker processes invoking callback functions, for CPU-bound
+             callbacks not limited by the GIL. Callback functions, their parameters and
+             results must be picklable. Can't be combined with ``executor`` (default is None)
+
+           * ``event_loop``
+             :class:`asyncio.AbstractEventLoop` running ``async def`` callback functions.
+             The SDK worker thread waits for the result with the GIL released.
+             Required when coroutine callback functions are installed (default is None)
+
+           * ``sysid``
+             System id of the backend system, identifying the SAP NW RFC Lib cache of
+             function descriptions. The client connection is opened only for function
+             descriptions not cached (default is None, the system id is taken from the
+             metadata snapshot or read over the client connection)
+
     :type config: dict or None (default)
 
     :raises: :exc:`~pyrfc.RFCError` or a subclass
@@ -1753,10 +2652,16 @@ cdef class Server:
     cdef public bint debug
     cdef public dict __config
     cdef public unsigned bconfig
+    cdef dict _client_params
     cdef Connection _client_connection
+    cdef object _repository_id
+    cdef object _release
     cdef ConnectionParameters _server_handle_params
     cdef RFC_SERVER_HANDLE _server_handle
     cdef object _server_thread
+    cdef object _dispatcher
+    cdef object _process_pool
+    cdef dict _functions
 
     @property
     def transaction_handlers(self):
@@ -1812,6 +2717,15 @@ cdef class Server:
         """
         return self._server_handle != NULL
 
+    @property
+    def dispatch_stats(self):
+        """Server callback dispatch statistics
+
+        :getter: Number of callback functions ``in_flight`` and requests ``waiting``
+        :type: dict
+        """
+        return self._dispatcher.stats
+
     @property
     def options(self):
         """Server instance configuration
@@ -1834,7 +2748,8 @@ cdef class Server:
                     'dtime', 'check_date', 'check_time',
                     'debug','server_log',
                     'authorization_check', 'authentication_check',
-                    'port'
+                    'port', 'executor', 'max_in_flight', 'max_queue', 'event_loop',
+                    'process_pool', 'sysid'
             ]:
                 raise RFCError(f"Connection configuration option '{k}' is not supported")
         self.__config = {}
@@ -1843,12 +2758,33 @@ cdef class Server:
         self.__config['check_date'] = config.get('check_date', True)
         self.__config['check_time'] = config.get('check_time', True)
         self.__config['debug'] = self.debug = config.get('debug', False)
-        server_context["server_log"] = config.get("server_log", False)
-        server_context["authentication_check"] = config.get("authentication_check", None)
-        server_context["authorization_check"] = config.get("authorization_check", None)
-        server_context["port"] = config.get("port", 8080)
-
-        self.__config["server_context"] = server_context
+        self.__config['executor'] = config.get('executor', None)
+        self.__config['max_in_flight'] = config.get('max_in_flight', None)
+        self.__config['max_queue'] = config.get('max_queue', None)
+        self.__config['event_loop'] = config.get('event_loop', None)
+        self.__config['process_pool'] = config.get('process_pool', None)
+        self.__config['sysid'] = config.get('sysid', None)
+        if self.__config['executor'] is not None and not isinstance(self.__config['executor'], Executor):
+            raise RFCError(f"Server executor must be a concurrent.futures.Executor, received {type(self.__config['executor'])}")
+        if self.__config['max_in_flight'] is not None and self.__config['max_in_flight'] < 1:
+            raise RFCError(f"Server max_in_flight must be a positive integer, received {self.__config['max_in_flight']}")
+        if self.__config['max_queue'] is not None and self.__config['max_queue'] < 0:
+            raise RFCError(f"Server max_queue must be a non-negative integer, received {self.__config['max_queue']}")
+        if self.__config['event_loop'] is not None and not isinstance(self.__config['event_loop'], AbstractEventLoop):
+            raise RFCError(f"Server event_loop must be an asyncio event loop, received {type(self.__config['event_loop'])}")
+        self._process_pool = None
+        if self.__config['process_pool'] is not None:
+            if self.__config['executor'] is not None:
+                raise RFCError("Server config options 'executor' and 'process_pool' can't be combined")
+            if self.__config['process_pool'] < 1:
+                raise RFCError(f"Server process_pool must be a positive integer, received {self.__config['process_pool']}")
+        self.__config["server_context"] = {
+            "server_log": config.get("server_log", False),
+            "authentication_check": config.get("authentication_check", None),
+            "authorization_check": config.get("authorization_check", None),
+            "port": config.get("port", 8080),
+        }
+        self._functions = {}
 
         self.bconfig = 0
         if self.__config['rstrip']:
@@ -1861,19 +2797,39 @@ cdef class Server:
             self.bconfig |= _MASK_CHECK_TIME
 
         self._server_handle_params = ConnectionParameters(**server_params)
-        self._client_connection = Connection(**client_params)
+        # client connection opened only for function descriptions not cached
+        self._client_params = client_params
+        self._client_connection = None
+        # function descriptions looked up in the cache of this repository,
+        # system id read over the client connection if not configured
+        self._repository_id = self.__config['sysid']
+        self._release = None
         self._server_thread=Thread(target=self.serve)
 
         # Create Server
         cdef RFC_ERROR_INFO errorInfo
         with nogil:
             self._server_handle = RfcCreateServer(self._server_handle_params._params, self._server_handle_params._params_count, &errorInfo)
-        if errorInfo.code == RFC_OK and callable(server_context["authorization_check"]):
+        if errorInfo.code == RFC_OK and callable(self.__config["server_context"]["authorization_check"]):
             RfcInstallAuthorizationCheckHandler(Server.__onAuthorizationCheck, &errorInfo)
         if errorInfo.code != RFC_OK:
             self._server_handle = NULL
             raise wrapError(&errorInfo)
-        _server_log("Server", f"{self.server_handle} created")
+
+        # process pool created with the server, shut down when closed
+        if self.__config['process_pool'] is not None:
+            # spawned, not forked from a process running SDK worker threads
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.__config['process_pool'],
+                mp_context=get_context("spawn")
+            )
+        self._dispatcher = _ServerDispatcher(
+            self.__config['executor'] if self._process_pool is None else self._process_pool,
+            self.__config['max_in_flight'],
+            self.__config['max_queue'],
+            self.__config['event_loop']
+        )
+        _server_log("Server", f"{self.server_handle} created", server=self)
 
     #
     # authorization check handler
@@ -1884,23 +2840,30 @@ cdef class Server:
         origin = "onAuthorizationCheck"
         security_attributes = wrapSecurityAttributes(secAttributes)
         functionName = security_attributes['functionName']
+        server = None
         try:
-            check = server_context["authorization_check"](<uintptr_t>rfcHandle, security_attributes)
+            func_data = lookupServerFunction(security_attributes['sysId'], functionName)
+            server = None if func_data is None else func_data['server']
+            authorization_check = None if server is None else server.options["server_context"]["authorization_check"]
+            if not callable(authorization_check):
+                # no authorization check by the server serving the function
+                return RFC_OK
+            check = authorization_check(<uintptr_t>rfcHandle, security_attributes)
             if check == RCStatus.OK:
                 # authorized
-                _server_log(origin, "Authorized", functionName)
+                _server_log(origin, "Authorized", functionName, server=server)
                 return RFC_OK
             # not authorized
             message=f"No authorization for '{functionName}': {check}"
-            _server_log(origin, message)
+            _server_log(origin, message, server=server)
             error = ExternalRuntimeError(message=message, code=RFC_AUTHORIZATION_FAILURE)
             fillError(error, errorInfo)
             return RFC_AUTHORIZATION_FAILURE
         except Exception as ex:
             message=f"Authorization exception raised for '{functionName}': {ex}"
-            _server_log(origin, message)
+            _server_log(origin, message, server=server)
             error = ExternalRuntimeError(message=message, code=RFC_AUTHORIZATION_FAILURE)
-            fillError(new_error, errorInfo)
+            fillError(error, errorInfo)
             return RFC_AUTHORIZATION_FAILURE
     #
     # transaction protocol handlers defined as class methods, calling application handlers
@@ -1913,6 +2876,12 @@ cdef class Server:
         "confirm": None,
     }
 
+    # servers which installed the transaction and bgRFC handlers, for logging
+    __handlersServer = {
+        "transaction": None,
+        "bgrfc": None,
+    }
+
     @staticmethod
     cdef RFC_RC __onCheckTransaction(RFC_CONNECTION_HANDLE rfcHandle, const SAP_UC *tid) with gil:
         origin = "onCheckTransaction"
@@ -1935,14 +2904,15 @@ cdef class Server:
 
     @staticmethod
     cdef RFC_RC __trfc_handler(origin, handler, RFC_CONNECTION_HANDLE rfcHandle, const SAP_UC *tid) with gil:
+        server = Server.__handlersServer["transaction"]
         if not callable(handler):
-            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'")
+            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'", server=server)
             return RFC_OK
         try:
             transaction_id = wrapString(tid)
             return handler(<uintptr_t>rfcHandle, transaction_id).value
         except Exception as ex:
-            _server_log(origin, "error:", ex)
+            _server_log(origin, "error:", ex, server=server)
             return RFC_EXTERNAL_FAILURE
 
     def transaction_rfc_init(self, sysId=None, transactionHandler=None):
@@ -2013,14 +2983,15 @@ cdef class Server:
 
     @staticmethod
     cdef RFC_RC __bgrfc_handler(origin, handler, RFC_CONNECTION_HANDLE rfcHandle, const RFC_UNIT_IDENTIFIER *identifier) with gil:
+        server = Server.__handlersServer["bgrfc"]
         if not callable(handler):
-            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'")
+            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'", server=server)
             return RFC_OK
         try:
             unit_identifier = wrapUnitIdentifier(identifier[0])
             return handler(<uintptr_t>rfcHandle, unit_identifier).value
         except Exception as ex:
-            _server_log(origin, "error:", ex)
+            _server_log(origin, "error:", ex, server=server)
             return RFC_EXTERNAL_FAILURE
 
     @staticmethod
@@ -2031,8 +3002,9 @@ cdef class Server:
             ) with gil:
         origin = "onGetStateFunction"
         handler = Server.__bgRfcHandler["getState"]
+        server = Server.__handlersServer["bgrfc"]
         if not callable(handler):
-            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'")
+            _server_log(origin, "not registered for server connection handle '{<uintptr_t>rfcHandle}'", server=server)
             return RFC_EXTERNAL_FAILURE
         try:
             unit_identifier = wrapUnitIdentifier(identifier[0])
@@ -2050,7 +3022,7 @@ cdef class Server:
                 raise Exception(f"TID {unit_identifier['id']} invalid state '{state}'")
             return RFC_OK
         except Exception as ex:
-            _server_log(origin, "error:\n", ex)
+            _server_log(origin, "error:\n", ex, server=server)
             return RFC_EXTERNAL_FAILURE
 
     def bgrfc_init(self, sysId=None, bgRfcHandler=None):
@@ -2101,9 +3073,10 @@ cdef class Server:
                             &errorInfo
                         )
         free(ucSysId)
-        _server_log(f"Server {self.server_handle}", f"bgRFC handlers installed: {self.bgrfc_handlers_count}")
+        Server.__handlersServer["bgrfc"] = self
+        _server_log(f"Server {self.server_handle}", f"bgRFC handlers installed: {self.bgrfc_handlers_count}", server=self)
         for k, v in self.__bgRfcHandler.items():
-            _server_log(f"bgRFC handler {k}", f"{self.__bgRfcHandler[k]}")
+            _server_log(f"bgRFC handler {k}", f"{self.__bgRfcHandler[k]}", server=self)
         if rc != RFC_OK or errorInfo.code != RFC_OK:
             raise wrapError(&errorInfo)
         return rc
@@ -2120,14 +3093,15 @@ cdef class Server:
                             &errorInfo
                         )
         free(ucSysId)
-        _server_log(f"Server {self.server_handle}", f"Transaction handlers installed: {self.transaction_handlers_count}")
+        Server.__handlersServer["transaction"] = self
+        _server_log(f"Server {self.server_handle}", f"Transaction handlers installed: {self.transaction_handlers_count}", server=self)
         for k, v in self.__transactionHandler.items():
-            _server_log(f"Transaction handler {k}", f"{self.__transactionHandler[k]}")
+            _server_log(f"Transaction handler {k}", f"{self.__transactionHandler[k]}", server=self)
         if rc != RFC_OK or errorInfo.code != RFC_OK:
             raise wrapError(&errorInfo)
         return rc
 
-    def add_function(self, func_name, callback):
+    def add_function(self, func_name, callback, func_desc=None):
         """
         Installs a function in the server.
 
@@ -2137,30 +3111,164 @@ cdef class Server:
         :param callback: A callback function that implements the logic.
             The function must accept a ``request_context`` parameter and
             all IMPORT, CHANGING, and TABLE parameters of the given
-            ``func_desc``.
+            ``func_desc``. Coroutine functions are run on the server ``event_loop``.
+
+        :param func_desc: Function description, installed without reading it
+            from the backend system. A description already cached by SAP NW RFC Lib,
+            for example by a previous server, is used instead. Default is None,
+            the description of ``func_name`` is read from SAP NW RFC Lib cache
+            or backend system.
+        :type func_desc: FunctionDescription or None
+
         :raises: :exc:`RFCError` if a function with the name given is already
-            installed.
+            installed, or a coroutine function given without server ``event_loop``.
         """
-        global server_functions
-        if func_name in server_functions:
-            raise RFCError(f"Server function '{func_name}' already installed.")
-        if not self._client_connection.alive:
+        self._check_function(func_name, callback)
+        if func_desc is not None:
+            if func_desc.name != func_name:
+                raise RFCError(f"Function description '{func_desc.name}' does not match server function '{func_name}'")
+            sysid = self._get_repository_id()
+            # cached description not replaced, can be in use by calls and other servers
+            if getCachedFunctionDesc(sysid, func_name) == NULL:
+                addFunctionDescription(sysid, func_desc)
+        self._install_function(func_name, callback)
+
+    def add_functions(self, functions, snapshot=None, max_age=None):
+        """
+        Installs functions in the server.
+
+        Function descriptions are taken from the metadata snapshot, if given,
+        or from SAP NW RFC Lib cache. Descriptions not found are read from
+        the backend system, using one client connection.
+
+        :param functions: Dictionary of ABAP remote function module names and
+            callback functions, cf. :meth:`add_function`
+        :type functions: dict
+
+        :param snapshot: Metadata snapshot file path, saved by
+            :meth:`Connection.save_metadata` from the server backend system.
+            Without ``sysid`` server configuration, the system id of the snapshot
+            is used; the release is checked once the client connection is opened.
+        :type snapshot: string or None
+
+        :param max_age: Maximum snapshot age in seconds, None (default) for any age
+        :type max_age: int or None
+
+        :returns: List of installed function names
+
+        :raises: :exc:`RFCError` if a function is already installed, or the
+            snapshot is not of the server backend system and release, or older
+            than ``max_age``.
+        """
+        if snapshot is not None:
+            snapshot = _read_metadata_snapshot(snapshot, max_age)
+            if self._repository_id is None:
+                # server system of the snapshot, without client logon
+                self._repository_id = snapshot['sysid']
+            checkSnapshotSystem(snapshot, self._repository_id, self._release)
+        for func_name, callback in functions.items():
+            self._check_function(func_name, callback)
+        if snapshot is not None:
+            # cached descriptions not replaced, can be in use by calls and other servers
+            addSnapshotDescriptions(uncachedSnapshot(snapshot))
+        opened = False
+        try:
+            for func_name, callback in functions.items():
+                if not opened and getCachedFunctionDesc(self._repository_id, func_name) == NULL:
+                    # one client connection for all descriptions not cached
+                    self._open_client()
+                    opened = True
+                self._install_function(func_name, callback)
+        finally:
+            if opened:
+                self._client_connection.close()
+        return list(functions)
+
+    cdef Connection _open_client(self):
+        """Client connection, opened for function descriptions not cached"""
+        if self._client_connection is None:
+            self._client_connection = Connection(**self._client_params)
+        elif not self._client_connection.alive:
             self._client_connection.open()
-        cdef RFC_ERROR_INFO errorInfo
-        cdef RFC_ABAP_NAME funcName = fillString(func_name)
-        cdef RFC_FUNCTION_DESC_HANDLE func_desc_handle = RfcGetFunctionDesc(self._client_connection._handle, funcName, &errorInfo)
-        if errorInfo.code != RFC_OK:
-            raise wrapError(&errorInfo)
-        self._client_connection.close()
+        if self._repository_id is None or self._release is None:
+            attributes = self._client_connection.get_connection_attributes()
+            if self._repository_id is None:
+                self._repository_id = attributes['sysId']
+            self._release = attributes['partnerRel']
+        return self._client_connection
+
+    cdef _get_repository_id(self):
+        """System id of the server backend, read over the client connection if not known"""
+        if self._repository_id is None:
+            try:
+                self._open_client()
+            finally:
+                if self._client_connection is not None:
+                    self._client_connection.close()
+        return self._repository_id
+
+    @staticmethod
+    def _request_function(func_name, conn_attr):
+        """
+        Server function of the request, by connection attributes
+
+        When connection attributes can't be retrieved, ``conn_attr`` is None and
+        the function is resolved by name, if installed by one server only, which
+        accepts the request in debug mode only.
+
+        :return: Dictionary with ``func_desc_handle``, ``callback`` and ``server``,
+                 or None if not installed
+        :raises: :exc:`ExternalRuntimeError` for connection attributes not retrieved
+                 when the server is not in debug mode
+        """
+        cdef Server server
+        if conn_attr is not None:
+            return lookupServerFunction(conn_attr['sysId'], func_name)
+        installed = [server._functions[func_name] for server in _servers if func_name in server._functions]
+        if len(installed) != 1:
+            # not installed, or the system id required to resolve the server
+            return None
+        server = installed[0]['server']
+        _server_log("genericHandler", f"Request for '{func_name}': Error while retrieving connection attributes.", server=server)
+        if not server.debug:
+            raise ExternalRuntimeError(message="Invalid connection handle.", code=RFC_EXTERNAL_FAILURE)
+        return installed[0]
+
+    def _check_function(self, func_name, callback):
+        if func_name in self._functions:
+            raise RFCError(f"Server function '{func_name}' already installed.")
+        if lookupServerFunction(self._get_repository_id(), func_name) is not None:
+            # requests of the system can't be routed to more than one server
+            raise RFCError(f"Server function '{func_name}' already installed by another server of system '{self._repository_id}'.")
+        if iscoroutinefunction(callback) and self.__config['event_loop'] is None:
+            raise RFCError(f"Server function '{func_name}' is a coroutine function, server 'event_loop' required.")
+        if self._process_pool is not None and not iscoroutinefunction(callback):
+            try:
+                dumps(callback)
+            except Exception as ex:
+                raise RFCError(f"Server function '{func_name}' callback can't be sent to process pool: {ex}") from None
+
+    cdef _install_function(self, func_name, callback):
+        # client connection opened only if not cached
+        cdef RFC_FUNCTION_DESC_HANDLE func_desc_handle = getCachedFunctionDesc(self._get_repository_id(), func_name)
+        if func_desc_handle == NULL:
+            opened = self._client_connection is None or not self._client_connection.alive
+            try:
+                func_desc_handle = self._open_client()._get_function_desc(func_name)
+            finally:
+                if opened and self._client_connection is not None:
+                    self._client_connection.close()
 
-        server_functions[func_name] = {
+        self._functions[func_name] = {
             "func_desc_handle": <uintptr_t>func_desc_handle,
             "callback": callback,
             "server": self
         }
+        if self not in _servers:
+            _servers.append(self)
 
-        _server_log(f"Server function {func_name}", "installed")
-        _server_log(f"Server function {func_name}", server_functions[func_name])
+        _server_log(f"Server function {func_name}", "installed", server=self)
+        _server_log(f"Server function {func_name}", self._functions[func_name], server=self)
 
     def serve(self):
         """
@@ -2179,7 +3287,7 @@ cdef class Server:
         rc = RfcLaunchServer(self._server_handle, &errorInfo)
         if rc != RFC_OK or errorInfo.code != RFC_OK:
             raise wrapError(&errorInfo)
-        _server_log("Server", f"{self.server_handle} launched")
+        _server_log("Server", f"{self.server_handle} launched", server=self)
 
         return rc
 
@@ -2188,7 +3296,7 @@ cdef class Server:
         Start the RFC server in new thread, waiting for incoming requests and processes them.
         """
         self._server_thread.start()
-        _server_log("Server", f"{self.server_handle} started")
+        _server_log("Server", f"{self.server_handle} started", server=self)
 
     def stop(self):
         """
@@ -2198,7 +3306,7 @@ cdef class Server:
             self._server_thread.join()
             with nogil:
                 RfcShutdownServer(self._server_handle, 60, NULL)
-            _server_log("Server", f"{self.server_handle} stopped")
+            _server_log("Server", f"{self.server_handle} stopped", server=self)
 
     def close(self):
         """
@@ -2219,15 +3327,19 @@ cdef class Server:
         with nogil:
             RfcDestroyServer(self._server_handle, NULL)
         self._server_handle = NULL
-        _server_log("Server", f"{server_handle} closed")
+        _server_log("Server", f"{server_handle} closed", server=self)
+
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+            self._process_pool = None
 
-        # Remove all installed server functions
-        global server_functions
-        after_remove = {}
-        for func_name, func_data in server_functions.items():
-            if func_data["server"] != self:
-                after_remove[func_name] = func_data
-        server_functions = after_remove
+        # Remove installed server functions
+        self._functions.clear()
+        if self in _servers:
+            _servers.remove(self)
+        for name, server in Server.__handlersServer.items():
+            if server is self:
+                Server.__handlersServer[name] = None
 
     def __dealloc__(self):
         self.close()
@@ -2386,6 +3498,95 @@ cdef RFC_FUNCTION_DESC_HANDLE fillFunctionDescription(func_desc):
 
     return funcDesc
 
+cdef RFC_FUNCTION_DESC_HANDLE addFunctionDescription(sysid, func_desc, bint overwrite=False) except NULL:
+    """
+    Adds the function description to SAP NW RFC Lib cache
+
+    The replaced description handle is released by SAP NW RFC Lib, while call plans
+    and server functions may still refer to it: descriptions already cached are replaced
+    only if ``overwrite`` is True, with all dependent handles refreshed by the caller.
+
+    :param sysid: System id of the cache repository
+    :param func_desc: object of class FunctionDescription
+    :param overwrite: Replace the cached description
+    :return: Handle of RFC_FUNCTION_DESC_HANDLE, owned by the cache
+    """
+    cdef RFC_ERROR_INFO errorInfo
+    if not overwrite and getCachedFunctionDesc(sysid, func_desc.name) != NULL:
+        raise RFCError(f"Function description '{func_desc.name}' already cached for system '{sysid}'")
+    cdef RFC_FUNCTION_DESC_HANDLE funcDesc = fillFunctionDescription(func_desc)
+    cdef SAP_UC* repositoryId = fillString(sysid)
+    cdef RFC_RC rc = RfcAddFunctionDesc(repositoryId, funcDesc, &errorInfo)
+    free(repositoryId)
+    if rc != RFC_OK:
+        RfcDestroyFunctionDesc(funcDesc, NULL)
+        raise wrapError(&errorInfo)
+    return funcDesc
+
+cdef dict uncachedSnapshot(snapshot):
+    """Metadata snapshot without descriptions already cached by SAP NW RFC Lib"""
+    sysid = snapshot['sysid']
+    return dict(
+        snapshot,
+        functions=[f for f in snapshot['functions'] if getCachedFunctionDesc(sysid, f['name']) == NULL],
+        types=[t for t in snapshot['types'] if getCachedTypeDesc(sysid, t['name']) == NULL]
+    )
+
+cdef refreshServerFunctions(sysid):
+    """Updates description handles of server functions installed for the system id"""
+    cdef RFC_FUNCTION_DESC_HANDLE funcDesc
+    cdef Server server
+    for server in _servers:
+        if server._repository_id != sysid:
+            continue
+        for func_name, func_data in server._functions.items():
+            funcDesc = getCachedFunctionDesc(sysid, func_name)
+            if funcDesc != NULL:
+                func_data['func_desc_handle'] = <uintptr_t>funcDesc
+
+cdef dict addSnapshotDescriptions(snapshot, bint overwrite=False):
+    """
+    Adds type and function descriptions of a metadata snapshot to SAP NW RFC Lib cache
+
+    Descriptions already cached are replaced only if ``overwrite`` is True, with
+    call plans and server functions of the system refreshed.
+
+    :param snapshot: Metadata snapshot, cf. _read_metadata_snapshot()
+    :param overwrite: Replace descriptions already cached
+    :return: Dictionary with ``functions`` and ``types`` names lists
+    """
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef RFC_TYPE_DESC_HANDLE typeDesc
+    sysid = snapshot['sysid']
+    cached = [
+        f['name'] for f in snapshot['functions'] if getCachedFunctionDesc(sysid, f['name']) != NULL
+    ] + [
+        t['name'] for t in snapshot['types'] if getCachedTypeDesc(sysid, t['name']) != NULL
+    ]
+    if cached and not overwrite:
+        raise RFCError(f"Metadata snapshot descriptions already cached for system '{sysid}': {', '.join(cached)}")
+    result = {'functions': [], 'types': []}
+    cdef SAP_UC* repositoryId = fillString(sysid)
+    try:
+        for type_dict in snapshot['types']:
+            typeDesc = fillTypeDescription(_type_desc_from_dict(type_dict))
+            rc = RfcAddTypeDesc(repositoryId, typeDesc, &errorInfo)
+            if rc != RFC_OK:
+                RfcDestroyTypeDesc(typeDesc, NULL)
+                raise wrapError(&errorInfo)
+            result['types'].append(type_dict['name'])
+        for func_dict in snapshot['functions']:
+            addFunctionDescription(sysid, _func_desc_from_dict(func_dict), overwrite)
+            result['functions'].append(func_dict['name'])
+    finally:
+        free(repositoryId)
+        if cached:
+            # call plans and server functions may refer to replaced descriptions
+            _remove_call_plans(sysid)
+            refreshServerFunctions(sysid)
+    return result
+
 cdef RFC_UNIT_IDENTIFIER fillUnitIdentifier(unit) except *:
     cdef RFC_UNIT_IDENTIFIER uIdentifier
     cdef SAP_UC* sapuc
@@ -2617,18 +3818,35 @@ cdef functionContainerSet(RFC_FUNCTION_DESC_HANDLE funcDesc, RFC_FUNCTION_HANDLE
         raise wrapError(&errorInfo)
     fillVariable(paramDesc.type, container, paramDesc.name, value, paramDesc.typeDescHandle, config)
 
-cdef fillStructureField(RFC_TYPE_DESC_HANDLE typeDesc, RFC_STRUCTURE_HANDLE container, name, value, unsigned config):
+cdef callPlanSet(_CallPlan plan, RFC_FUNCTION_HANDLE container, name, value, unsigned config):
+    cdef RFC_PARAMETER_DESC *paramDesc
+    i = plan.index.get(name)
+    if i is None:
+        # unknown parameter, error raised by NW RFC SDK
+        functionContainerSet(plan.funcDesc, container, name, value, config)
+        return
+    paramDesc = &plan.paramDesc[<unsigned> i]
+    fillVariable(paramDesc.type, container, paramDesc.name, value, paramDesc.typeDescHandle, config, paramLayout(plan, i))
+
+cdef fillStructureField(_TypeLayout layout, RFC_STRUCTURE_HANDLE container, name, value, unsigned config):
     cdef RFC_RC rc
     cdef RFC_ERROR_INFO errorInfo
     cdef RFC_FIELD_DESC fieldDesc
-    cdef SAP_UC* cName = fillString(name)
-    rc = RfcGetFieldDescByName(typeDesc, cName, &fieldDesc, &errorInfo)
-    free(cName)
-    if rc != RFC_OK:
-        raise wrapError(&errorInfo)
-    fillVariable(fieldDesc.type, container, fieldDesc.name, value, fieldDesc.typeDescHandle, config)
+    cdef SAP_UC* cName
+    i = layout.index.get(name)
+    if i is None:
+        # unknown field, error raised by NW RFC SDK
+        cName = fillString(name)
+        rc = RfcGetFieldDescByName(layout.typeDesc, cName, &fieldDesc, &errorInfo)
+        free(cName)
+        if rc != RFC_OK:
+            raise wrapError(&errorInfo)
+        fillVariable(fieldDesc.type, container, fieldDesc.name, value, fieldDesc.typeDescHandle, config)
+        return
+    cdef RFC_FIELD_DESC *field = &layout.fieldDesc[<unsigned> i]
+    fillVariable(field.type, container, field.name, value, field.typeDescHandle, config, fieldLayout(layout, i))
 
-cdef fillTable(RFC_TYPE_DESC_HANDLE typeDesc, RFC_TABLE_HANDLE container, lines, unsigned config):
+cdef fillTable(_TypeLayout layout, RFC_TABLE_HANDLE container, lines, unsigned config):
     cdef RFC_ERROR_INFO errorInfo
     cdef RFC_STRUCTURE_HANDLE lineHandle
     cdef unsigned int rowCount = int(len(lines))
@@ -2640,157 +3858,425 @@ cdef fillTable(RFC_TYPE_DESC_HANDLE typeDesc, RFC_TABLE_HANDLE container, lines,
         line = lines[i]
         if type(line) is dict:
             for name, value in line.iteritems():
-                fillStructureField(typeDesc, lineHandle, name, value, config)
+                fillStructureField(layout, lineHandle, name, value, config)
         else:
-            fillStructureField(typeDesc, lineHandle, '', line, config)
+            fillStructureField(layout, lineHandle, '', line, config)
         i += 1
 
-cdef fillVariable(RFCTYPE typ, RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config):
+cdef inline bint intInRange(RFCTYPE typ, int64_t n):
+    # INT1 unsigned byte, INT2 signed short, INT signed int
+    if typ == RFCTYPE_INT1:
+        return 0 <= n <= 255
+    if typ == RFCTYPE_INT2:
+        return -32768 <= n <= 32767
+    return INT32_MIN <= n <= INT32_MAX
+
+cdef bint isNumberArray(column):
+    # one-dimensional NumPy array of fixed width numbers
+    dtype = getattr(column, 'dtype', None)
+    return dtype is not None and dtype.kind in 'iuf' and column.ndim == 1 and hasattr(column, 'strides')
+
+cdef dict tableColumns(lines):
+    """Table columns as dict of field name and field values
+
+    Accepts dict of equal length sequences, NumPy structured array or Arrow table.
+    Integer and float columns are kept as NumPy arrays, filled from the array
+    buffer, other columns are converted to lists.
+    """
+    if type(lines) is dict:
+        columns = {}
+        invalid = None
+        for name, column in lines.items():
+            if isNumberArray(column):
+                columns[name] = column
+                continue
+            if hasattr(column, 'tolist'):
+                # NumPy array
+                column = column.tolist()
+            if isinstance(column, (str, bytes)) or not isinstance(column, Sequence):
+                if invalid is None:
+                    invalid = name
+                continue
+            # tuple, range and other sequences indexed as list
+            columns[name] = column if type(column) is list else list(column)
+        if invalid is not None:
+            if not columns:
+                # no columns at all, like a structure
+                raise TypeError('list required for table parameter, received', str(type(lines)))
+            raise TypeError('list required for table parameter column, received', str(type(lines[invalid])), invalid)
+        return columns
+    dtype = getattr(lines, 'dtype', None)
+    if dtype is not None and dtype.names:
+        # NumPy structured array
+        columns = {}
+        for name in dtype.names:
+            column = lines[name]
+            if column.dtype.kind == 'm':
+                # timedelta64 to time
+                column = [None if v is None else (datetime.min + v).time() for v in column.astype('m8[s]').tolist()]
+            elif not isNumberArray(column):
+                column = column.tolist()
+            columns[name] = column
+        return columns
+    if hasattr(lines, 'column_names') and hasattr(lines, 'column'):
+        # Arrow table or record batch
+        pa = import_optional('pyarrow', 'Arrow table parameter')
+        columns = {}
+        for name in lines.column_names:
+            column = lines.column(name)
+            if column.null_count == 0 and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+                columns[name] = column.to_numpy()
+            else:
+                columns[name] = column.to_pylist()
+        return columns
+    raise TypeError('list required for table parameter, received', str(type(lines)))
+
+cdef fillTableColumns(_TypeLayout layout, RFC_TABLE_HANDLE container, dict columns, unsigned config):
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef RFC_STRUCTURE_HANDLE lineHandle
+    cdef RFC_FIELD_DESC fieldDesc
+    cdef unsigned int rowCount = 0
+    cdef unsigned int columnCount = len(columns)
+    cdef unsigned int i, j
+    cdef RFC_FIELD_DESC **fields = NULL
+    cdef FieldSetter *setters = NULL
+    cdef const char **data = NULL
+    cdef Py_ssize_t *strides = NULL
+    cdef const int64_t[:] ints
+    cdef const double[:] floats
+    cdef int64_t n
+    cdef SAP_UC* cName
+    names = list(columns)
+    children = [None] * columnCount
+    # NumPy arrays referenced by data pointers
+    arrays = [None] * columnCount
+    values = [columns[name] for name in names]
+    for j in range(columnCount):
+        if j == 0:
+            rowCount = len(values[0])
+        elif len(values[j]) != rowCount:
+            raise TypeError('table columns of equal length required, received', {name: len(columns[name]) for name in names})
+    fields = <RFC_FIELD_DESC**> malloc(columnCount * sizeof(RFC_FIELD_DESC*))
+    setters = <FieldSetter*> malloc(columnCount * sizeof(FieldSetter))
+    data = <const char**> malloc(columnCount * sizeof(char*))
+    strides = <Py_ssize_t*> malloc(columnCount * sizeof(Py_ssize_t))
+    try:
+        # resolve field descriptor and setter once per column
+        for j in range(columnCount):
+            k = layout.index.get(names[j])
+            if k is None:
+                # unknown field, error raised by NW RFC SDK
+                cName = fillString(names[j])
+                rc = RfcGetFieldDescByName(layout.typeDesc, cName, &fieldDesc, &errorInfo)
+                free(cName)
+                if rc != RFC_OK:
+                    raise wrapError(&errorInfo)
+                raise RFCError(f"Field '{names[j]}' not found")
+            fields[j] = &layout.fieldDesc[<unsigned> k]
+            children[j] = fieldLayout(layout, k)
+            setters[j] = fieldSetter(fields[j].type)
+            if setters[j] == NULL:
+                raise RFCError('Unknown RFC type %d when filling %s' % (fields[j].type, names[j]))
+            # integer and float NumPy columns are read from the array buffer
+            data[j] = NULL
+            if type(values[j]) is list:
+                continue
+            dtype = values[j].dtype
+            if rowCount == 0:
+                values[j] = []
+            elif fields[j].type in (RFCTYPE_INT, RFCTYPE_INT1, RFCTYPE_INT2, RFCTYPE_INT8) and (dtype.kind == 'i' or (dtype.kind == 'u' and dtype.itemsize < 8)):
+                arrays[j] = values[j].astype('i8', copy=False)
+                ints = arrays[j]
+                data[j] = <const char*> &ints[0]
+                strides[j] = ints.strides[0]
+            elif fields[j].type == RFCTYPE_FLOAT and dtype.kind == 'f':
+                arrays[j] = values[j].astype('f8', copy=False)
+                floats = arrays[j]
+                data[j] = <const char*> &floats[0]
+                strides[j] = floats.strides[0]
+            else:
+                values[j] = values[j].tolist()
+        for i in range(rowCount):
+            lineHandle = RfcAppendNewRow(container, &errorInfo)
+            if not lineHandle:
+                raise wrapError(&errorInfo)
+            for j in range(columnCount):
+                if data[j] != NULL:
+                    if fields[j].type == RFCTYPE_FLOAT:
+                        rc = RfcSetFloat(lineHandle, fields[j].name, (<const double*> (data[j] + i * strides[j]))[0], &errorInfo)
+                    elif fields[j].type == RFCTYPE_INT8:
+                        rc = RfcSetInt8(lineHandle, fields[j].name, (<const int64_t*> (data[j] + i * strides[j]))[0], &errorInfo)
+                    else:
+                        n = (<const int64_t*> (data[j] + i * strides[j]))[0]
+                        if not intInRange(fields[j].type, n):
+                            raise OverflowError('integer out of range of field type, received', n, names[j])
+                        rc = RfcSetInt(lineHandle, fields[j].name, <RFC_INT> n, &errorInfo)
+                    if rc != RFC_OK:
+                        raise wrapError(&errorInfo)
+                    continue
+                value = values[j][i]
+                if value is None:
+                    # null value, field remains initial
+                    continue
+                try:
+                    setters[j](lineHandle, fields[j].name, value, fields[j].typeDescHandle, config, children[j])
+                except TypeError as e:
+                    e.args += (names[j], )
+                    raise
+    finally:
+        free(fields)
+        free(setters)
+        free(data)
+        free(strides)
+
+ctypedef int (*FieldSetter)(RFC_FUNCTION_HANDLE container, SAP_UC* cName, object value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1
+
+cdef int setStructure(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
     cdef RFC_RC rc
     cdef RFC_ERROR_INFO errorInfo
     cdef RFC_STRUCTURE_HANDLE struct
+    if type(value) is not dict:
+        raise TypeError('dictionary required for structure parameter, received', str(type(value)))
+    rc = RfcGetStructure(container, cName, &struct, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    if layout is None:
+        layout = newTypeLayout(typeDesc)
+    for name, value in value.iteritems():
+        fillStructureField(layout, struct, name, value, config)
+    return 0
+
+cdef int setTable(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
     cdef RFC_TABLE_HANDLE table
+    if type(value) is not list:
+        # columns checked before table handle is created
+        value = tableColumns(value)
+    rc = RfcGetTable(container, cName, &table, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    if layout is None:
+        layout = newTypeLayout(typeDesc)
+    if type(value) is list:
+        fillTable(layout, table, value, config)
+    else:
+        fillTableColumns(layout, table, value, config)
+    return 0
+
+cdef int setBytes(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_RAW* bValue = fillBytes(value)
+    rc = RfcSetBytes(container, cName, bValue, int(len(value)), &errorInfo)
+    free(bValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setXString(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_RAW* bValue = fillBytes(value)
+    rc = RfcSetXString(container, cName, bValue, int(len(value)), &errorInfo)
+    free(bValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setChars(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC* cValue
+    if type(value) is not str:
+        raise TypeError('an string is required, received', value, 'of type', type(value))
+    cValue = fillString(value)
+    rc = RfcSetChars(container, cName, cValue, strlenU(cValue), &errorInfo)
+    free(cValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setString(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    # also used for UTCLONG
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC* cValue
+    if type(value) is not str:
+        raise TypeError('an string is required, received', value, 'of type', type(value))
+    cValue = fillString(value)
+    rc = RfcSetString(container, cName, cValue, strlenU(cValue), &errorInfo)
+    free(cValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setNum(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
     cdef SAP_UC* cValue
-    cdef SAP_RAW* bValue
-    global _LOCALE_RADIX
-    # print ("fill", wrapString(cName), value, type(value))
     try:
-        if typ == RFCTYPE_STRUCTURE:
-            if type(value) is not dict:
-                raise TypeError('dictionary required for structure parameter, received', str(type(value)))
-            rc = RfcGetStructure(container, cName, &struct, &errorInfo)
-            if rc != RFC_OK:
-                raise wrapError(&errorInfo)
-            for name, value in value.iteritems():
-                fillStructureField(typeDesc, struct, name, value, config)
-        elif typ == RFCTYPE_TABLE:
-            if type(value) is not list:
-                raise TypeError('list required for table parameter, received', str(type(value)))
-            rc = RfcGetTable(container, cName, &table, &errorInfo)
-            if rc != RFC_OK:
-                raise wrapError(&errorInfo)
-            fillTable(typeDesc, table, value, config)
-        elif typ == RFCTYPE_BYTE:
-            bValue = fillBytes(value)
-            rc = RfcSetBytes(container, cName, bValue, int(len(value)), &errorInfo)
-            free(bValue)
-        elif typ == RFCTYPE_XSTRING:
-            bValue = fillBytes(value)
-            rc = RfcSetXString(container, cName, bValue, int(len(value)), &errorInfo)
-            free(bValue)
-        elif typ == RFCTYPE_CHAR:
-            if type(value) is not str:
-                raise TypeError('an string is required, received', value, 'of type', type(value))
+        if value.isdigit():
             cValue = fillString(value)
-            rc = RfcSetChars(container, cName, cValue, strlenU(cValue), &errorInfo)
+            rc = RfcSetNum(container, cName, cValue, strlenU(cValue), &errorInfo)
             free(cValue)
-        elif typ == RFCTYPE_STRING:
-            if type(value) is not str:
-                raise TypeError('an string is required, received', value, 'of type', type(value))
+        else:
+            raise
+    except Exception as ex:
+        raise TypeError('a numeric string is required, received', value, 'of type', type(value))
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setDecimal(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    # BCD, FLOAT, DECF16 and DECF34
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC* cValue
+    global _LOCALE_RADIX
+    # cast to string prevents rounding errors in NWRFC SDK
+    try:
+        if type(value) is float or type(value) is Decimal:
+            svalue = str(value)
+        else:
+            # string passed from application should be locale correct, do nothing
+            svalue = value
+        # decimal separator must be "." for the Decimal parsing check
+        locale_radix = _LOCALE_RADIX  # localeconv()['decimal_point']
+        if locale_radix != ".":
+            Decimal('.'.join(svalue.rsplit(locale_radix, 1)))
+        else:
+            Decimal(svalue)
+        cValue = fillString(svalue)
+    except Exception as ex:
+        raise TypeError('a decimal value required, received', value, 'of type', type(value))
+    rc = RfcSetString(container, cName, cValue, strlenU(cValue), &errorInfo)
+    free(cValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setInt(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    # INT, INT1 and INT2
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    if type(value) is not int:
+        raise TypeError('an integer required, received', value, 'of type', type(value))
+    rc = RfcSetInt(container, cName, value, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setInt8(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    if type(value) is not int:
+        raise TypeError('an integer required, received', value, 'of type', type(value))
+    rc = RfcSetInt8(container, cName, value, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setDate(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC* cValue
+    if not value:
+        return 0
+    cValue = NULL
+    try:
+        if type(value) is date:
+            cValue = fillString(f'{value.year:04}{value.month:02}{value.day:02}')
+        elif type(value) is str:
+            if config & _MASK_CHECK_DATE:
+                if len(value) != 8:
+                    raise Exception
+                if len(value.strip()) > 0:
+                    date(int(value[:4]), int(value[4:6]), int(value[6:8]))
             cValue = fillString(value)
-            rc = RfcSetString(container, cName, cValue, strlenU(cValue), &errorInfo)
-            free(cValue)
-        elif typ == RFCTYPE_NUM:
-            try:
-                if value.isdigit():
-                    cValue = fillString(value)
-                    rc = RfcSetNum(container, cName, cValue, strlenU(cValue), &errorInfo)
-                    free(cValue)
-                else:
-                    raise
-            except Exception as ex:
-                raise TypeError('a numeric string is required, received', value, 'of type', type(value))
-        elif typ == RFCTYPE_BCD or typ == RFCTYPE_FLOAT or typ == RFCTYPE_DECF16 or typ == RFCTYPE_DECF34:
-            # cast to string prevents rounding errors in NWRFC SDK
-            try:
-                if type(value) is float or type(value) is Decimal:
-                    svalue = str(value)
-                else:
-                    # string passed from application should be locale correct, do nothing
-                    svalue = value
-                # decimal separator must be "." for the Decimal parsing check
-                locale_radix = _LOCALE_RADIX  # localeconv()['decimal_point']
-                if locale_radix != ".":
-                    Decimal('.'.join(svalue.rsplit(locale_radix, 1)))
-                else:
-                    Decimal(svalue)
-                cValue = fillString(svalue)
-            except Exception as ex:
-                raise TypeError('a decimal value required, received', value, 'of type', type(value))
-            rc = RfcSetString(container, cName, cValue, strlenU(cValue), &errorInfo)
+        else:
+            raise Exception
+    except Exception as ex:
+        if cValue != NULL:
             free(cValue)
-        elif typ in (RFCTYPE_INT, RFCTYPE_INT1, RFCTYPE_INT2):
-            if type(value) is not int:
-                raise TypeError('an integer required, received', value, 'of type', type(value))
-            rc = RfcSetInt(container, cName, value, &errorInfo)
-        elif typ == RFCTYPE_INT8:
-            if type(value) is not int:
-                raise TypeError('an integer required, received', value, 'of type', type(value))
-            rc = RfcSetInt8(container, cName, value, &errorInfo)
-        elif typ == RFCTYPE_UTCLONG:
-            if type(value) is not str:
-                raise TypeError('an string is required, received', value, 'of type', type(value))
+        raise TypeError('date value required, received', value, 'of type', type(value))
+    rc = RfcSetDate(container, cName, cValue, &errorInfo)
+    free(cValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef int setTime(RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout) except -1:
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef SAP_UC* cValue
+    if not value:
+        return 0
+    cValue = NULL
+    try:
+        if type(value) is time:
+            cValue = fillString(f'{value.hour:02}{value.minute:02}{value.second:02}')
+        elif type(value) is str:
+            if config & _MASK_CHECK_TIME:
+                if len(value) != 6:
+                    raise Exception
+                if len(value.rstrip()) > 0:
+                    time(int(value[:2]), int(value[2:4]), int(value[4:6]))
             cValue = fillString(value)
-            rc = RfcSetString(container, cName, cValue, strlenU(cValue), &errorInfo)
-            free(cValue)
-        elif typ == RFCTYPE_DATE:
-            if value:
-                cValue = NULL
-                try:
-                    if type(value) is date:
-                        cValue = fillString(f'{value.year:04}{value.month:02}{value.day:02}')
-                    elif type(value) is str:
-                        if config & _MASK_CHECK_DATE:
-                            if len(value) != 8:
-                                raise Exception
-                            if len(value.strip()) > 0:
-                                date(int(value[:4]), int(value[4:6]), int(value[6:8]))
-                        cValue = fillString(value)
-                    else:
-                        raise Exception
-                except Exception as ex:
-                    if cValue != NULL:
-                        free(cValue)
-                    raise TypeError('date value required, received', value, 'of type', type(value))
-                if cValue != NULL:
-                    rc = RfcSetDate(container, cName, cValue, &errorInfo)
-                    free(cValue)
-            else:
-                rc = RFC_OK
-        elif typ == RFCTYPE_TIME:
-            if value:
-                cValue = NULL
-                try:
-                    if type(value) is time:
-                        cValue = fillString(f'{value.hour:02}{value.minute:02}{value.second:02}')
-                    elif type(value) is str:
-                        if config & _MASK_CHECK_TIME:
-                            if len(value) != 6:
-                                raise Exception
-                            if len(value.rstrip()) > 0:
-                                time(int(value[:2]), int(value[2:4]), int(value[4:6]))
-                        cValue = fillString(value)
-                    else:
-                        raise Exception
-                except Exception as ex:
-                    if cValue != NULL:
-                        free(cValue)
-                    raise TypeError('time value required, received', value, 'of type', type(value))
-                if cValue != NULL:
-                    rc = RfcSetTime(container, cName, cValue, &errorInfo)
-                    free(cValue)
-            else:
-                rc = RFC_OK
         else:
-            raise RFCError('Unknown RFC type %d when filling %s' % (typ, wrapString(cName)))
+            raise Exception
+    except Exception as ex:
+        if cValue != NULL:
+            free(cValue)
+        raise TypeError('time value required, received', value, 'of type', type(value))
+    rc = RfcSetTime(container, cName, cValue, &errorInfo)
+    free(cValue)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    return 0
+
+cdef FieldSetter fieldSetter(RFCTYPE typ):
+    """Setter function for given RFC type, NULL if not supported"""
+    if typ == RFCTYPE_STRUCTURE:
+        return setStructure
+    elif typ == RFCTYPE_TABLE:
+        return setTable
+    elif typ == RFCTYPE_BYTE:
+        return setBytes
+    elif typ == RFCTYPE_XSTRING:
+        return setXString
+    elif typ == RFCTYPE_CHAR:
+        return setChars
+    elif typ == RFCTYPE_STRING or typ == RFCTYPE_UTCLONG:
+        return setString
+    elif typ == RFCTYPE_NUM:
+        return setNum
+    elif typ == RFCTYPE_BCD or typ == RFCTYPE_FLOAT or typ == RFCTYPE_DECF16 or typ == RFCTYPE_DECF34:
+        return setDecimal
+    elif typ in (RFCTYPE_INT, RFCTYPE_INT1, RFCTYPE_INT2):
+        return setInt
+    elif typ == RFCTYPE_INT8:
+        return setInt8
+    elif typ == RFCTYPE_DATE:
+        return setDate
+    elif typ == RFCTYPE_TIME:
+        return setTime
+    return NULL
+
+cdef fillVariable(RFCTYPE typ, RFC_FUNCTION_HANDLE container, SAP_UC* cName, value, RFC_TYPE_DESC_HANDLE typeDesc, unsigned config, _TypeLayout layout=None):
+    # print ("fill", wrapString(cName), value, type(value))
+    cdef FieldSetter setter = fieldSetter(typ)
+    if setter == NULL:
+        raise RFCError('Unknown RFC type %d when filling %s' % (typ, wrapString(cName)))
+    try:
+        setter(container, cName, value, typeDesc, config, layout)
     except TypeError as e:
         # This way the field name will be attached in reverse direction
         # to the argument list of the exception. This helps users to find
         # mistakes easier in complex mapping scenarios.
         e.args += (wrapString(cName), )
         raise
-    if rc != RFC_OK:
-        raise wrapError(&errorInfo)
 
 cdef SAP_RAW* fillBytes(pystr) except NULL:
     cdef size_t size = len(pystr)
@@ -2857,15 +4343,65 @@ cdef fillError(exception, RFC_ERROR_INFO* errorInfo):
 cdef SAP_UC* fillString(pyuc) except NULL:
     cdef RFC_RC rc
     cdef RFC_ERROR_INFO errorInfo
+    cdef Py_ssize_t i, j, length
+    cdef Py_UCS1* latin1
+    cdef Py_UCS2* ucs2
+    cdef Py_UCS4* ucs4
+    cdef SAP_UC* sapuc
+    if isinstance(pyuc, str) and PyUnicode_KIND(pyuc) == PyUnicode_1BYTE_KIND:
+        # ASCII or Latin-1 string, code points widened to SAP_UC
+        length = PyUnicode_GET_LENGTH(pyuc)
+        latin1 = PyUnicode_1BYTE_DATA(pyuc)
+        sapuc = mallocU(length + 1)
+        for i in range(length):
+            sapuc[i] = latin1[i]
+        sapuc[length] = 0
+        return sapuc
+    if isinstance(pyuc, str) and PyUnicode_KIND(pyuc) == PyUnicode_2BYTE_KIND:
+        # BMP string, code points copied to SAP_UC unless surrogates
+        length = PyUnicode_GET_LENGTH(pyuc)
+        ucs2 = PyUnicode_2BYTE_DATA(pyuc)
+        sapuc = mallocU(length + 1)
+        for i in range(length):
+            if 0xD800 <= ucs2[i] <= 0xDFFF:
+                break
+            sapuc[i] = ucs2[i]
+        else:
+            sapuc[length] = 0
+            return sapuc
+        free(sapuc)
+    elif isinstance(pyuc, str):
+        # supplementary characters encoded as SAP_UC surrogate pairs
+        length = PyUnicode_GET_LENGTH(pyuc)
+        ucs4 = PyUnicode_4BYTE_DATA(pyuc)
+        sapuc = mallocU(2 * length + 1)
+        j = 0
+        for i in range(length):
+            if 0xD800 <= ucs4[i] <= 0xDFFF:
+                break
+            if ucs4[i] < 0x10000:
+                sapuc[j] = ucs4[i]
+                j += 1
+            else:
+                sapuc[j] = 0xD800 + ((ucs4[i] - 0x10000) >> 10)
+                sapuc[j + 1] = 0xDC00 + ((ucs4[i] - 0x10000) & 0x3FF)
+                j += 2
+        else:
+            sapuc[j] = 0
+            return sapuc
+        free(sapuc)
+    # lone surrogates rejected by UTF-8 encoding, as before
+    # temporary UTF-8 bytes, not cached in the string object
     ucbytes = pyuc.encode()
     cdef unsigned ucbytes_len = <unsigned> len(ucbytes)
     cdef unsigned sapuc_size = ucbytes_len + 1
-    cdef SAP_UC* sapuc = mallocU(sapuc_size)
+    sapuc = mallocU(sapuc_size)
     sapuc[0] = 0
     cdef unsigned result_len = 0
     if ucbytes_len > 0:
         rc = RfcUTF8ToSAPUC(ucbytes, ucbytes_len, sapuc, &sapuc_size, &result_len, &errorInfo)
         if rc != RFC_OK:
+            free(sapuc)
             raise wrapError(&errorInfo)
     return sapuc
 
@@ -3024,6 +4560,90 @@ cdef functionContainerGet(
             )
     return result
 
+cdef callPlanGet(
+            _CallPlan plan,
+            RFC_FUNCTION_HANDLE container,
+            RFC_DIRECTION filter_parameter_direction,
+            unsigned config,
+            owner=None,
+            dict layouts=None,
+            bint stream=False,
+            unsigned chunk_size=0
+        ):
+    """
+    :param plan: call plan of the function module, cf. functionContainerGet()
+    :param container: a C pointer to a function container
+    :param filter_parameter_direction: A RFC_DIRECTION - parameters with this
+           direction will be excluded.
+    :param config (rstrip: right strip strings, dtime: return datetime objects)
+    :param owner: _FunctionContainer owning the container, if TABLE parameters
+           shall be returned as TableCursor or TableStream
+    :param layouts: Parameter name: _TypeLayout of selected fields, cf. fieldsLayouts()
+    :param stream: TABLE parameters returned as TableStream instead of TableCursor
+    :param chunk_size: Number of rows per TableStream chunk, 0 for single rows
+    :return:
+    """
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef RFC_TABLE_HANDLE table
+    cdef RFC_STRUCTURE_HANDLE structure
+    cdef unsigned i
+    cdef RFC_PARAMETER_DESC *paramDesc
+    cdef _TypeLayout layout
+    result = {}
+    for i in range(plan.paramCount):
+        paramDesc = &plan.paramDesc[i]
+        if paramDesc.direction != filter_parameter_direction:
+            layout = layouts.get(plan.names[i]) if layouts else None
+            if paramDesc.type == RFCTYPE_TABLE and (owner is not None or layout is not None):
+                rc = RfcGetTable(container, paramDesc.name, &table, &errorInfo)
+                if rc != RFC_OK:
+                    raise wrapError(&errorInfo)
+                if layout is None:
+                    layout = paramLayout(plan, i)
+                if stream:
+                    result[plan.names[i]] = wrapTableStream(owner, layout, table, config, chunk_size)
+                elif owner is not None:
+                    result[plan.names[i]] = wrapTableCursor(owner, layout, table, config)
+                else:
+                    result[plan.names[i]] = wrapTable(layout, table, config)
+                continue
+            if layout is not None:
+                rc = RfcGetStructure(container, paramDesc.name, &structure, &errorInfo)
+                if rc != RFC_OK:
+                    raise wrapError(&errorInfo)
+                result[plan.names[i]] = wrapStructure(layout, structure, config)
+                continue
+            result[plan.names[i]] = wrapVariable(
+                paramDesc.type,
+                container,
+                paramDesc.name,
+                paramDesc.nucLength,
+                paramDesc.typeDescHandle,
+                config,
+                paramLayout(plan, i)
+            )
+    return result
+
+cdef dict fieldsLayouts(_CallPlan plan, fields):
+    """
+    Layouts of selected fields of STRUCTURE and TABLE parameters.
+
+    :param plan: call plan of the function module
+    :param fields: Dictionary of parameter names and field names lists
+    :return: Dictionary of parameter names and _TypeLayout objects
+    """
+    cdef _TypeLayout layout
+    layouts = {}
+    for name, field_names in fields.items():
+        if name not in plan.index:
+            raise RFCError(f"Call option 'fields' parameter '{name}' not found")
+        layout = paramLayout(plan, plan.index[name])
+        if layout is None:
+            raise RFCError(f"Call option 'fields' parameter '{name}' is not a structure or table")
+        layouts[name] = getFieldsLayout(layout, field_names)
+    return layouts
+
 cdef wrapUnitIdentifier(RFC_UNIT_IDENTIFIER uIdentifier):
     return {
         'queued': "Q" == wrapString(&uIdentifier.unitType, 1),
@@ -3061,51 +4681,709 @@ cdef wrapSecurityAttributes(RFC_SECURITY_ATTRIBUTES *secAttributes):
         security_attributes['sncAclKey'] = bytes(secAttributes.sncAclKey)[:secAttributes.sncAclKeyLength]
     return security_attributes
 
-cdef wrapStructure(RFC_TYPE_DESC_HANDLE typeDesc, RFC_STRUCTURE_HANDLE container, unsigned config):
-    cdef unsigned i, fieldCount
-    cdef RFC_FIELD_DESC fieldDesc
-    RfcGetFieldCount(typeDesc, &fieldCount, NULL)
+cdef list internedValues(_TypeLayout layout):
+    """Per field dictionaries of wrapped table values, None for fields not interned"""
+    cdef unsigned i
+    cdef RFCTYPE typ
+    interned = []
+    for i in range(layout.fieldCount):
+        typ = layout.fieldDesc[i].type
+        if typ == RFCTYPE_CHAR or typ == RFCTYPE_NUM or typ == RFCTYPE_STRING or typ == RFCTYPE_DATE or typ == RFCTYPE_TIME:
+            interned.append({})
+        else:
+            interned.append(None)
+    return interned
+
+cdef wrapStructure(_TypeLayout layout, RFC_STRUCTURE_HANDLE container, unsigned config, list interned=None):
+    """
+    :param layout: Layout of the structure type or of selected fields
+    :param interned: Per field dictionaries of table values already wrapped,
+           re-used for equal values of table rows
+    """
+    cdef unsigned i
+    cdef RFC_FIELD_DESC *fieldDesc
     result = {}
-    for i in range(fieldCount):
-        RfcGetFieldDescByIndex(typeDesc, i, &fieldDesc, NULL)
-        result[wrapString(fieldDesc.name)] = wrapVariable(
+    for i in range(layout.fieldCount):
+        fieldDesc = &layout.fieldDesc[i]
+        value = wrapVariable(
                 fieldDesc.type,
                 container,
                 fieldDesc.name,
                 fieldDesc.nucLength,
                 fieldDesc.typeDescHandle,
-                config
+                config,
+                fieldLayout(layout, i)
             )
+        if interned is not None and interned[i] is not None:
+            value = (<dict> interned[i]).setdefault(value, value)
+        result[layout.names[i]] = value
     if len(result) == 1:
         if '' in result:
             result = result['']
     return result
 
-# # Used for debugging tables, cf. wrapTable()
-# cdef class TableCursor:
-#
-#    cdef RFC_TYPE_DESC_HANDLE typeDesc
-#    cdef RFC_TABLE_HANDLE container
-#
-#    def __getitem__(self, i):
-#        cdef RFC_ERROR_INFO errorInfo
-#        RfcMoveTo(self.container, i, &errorInfo)
-#        return wrapStructure(self.typeDesc, self.container)
+cdef class _FunctionContainer:
+    """Owns a function container, kept alive by TableCursor and TableStream instances"""
+    cdef RFC_FUNCTION_HANDLE handle
+    # call plan of the container description, in use until released
+    cdef object plan
+
+    def __cinit__(self):
+        self.handle = NULL
+
+    def __dealloc__(self):
+        if self.handle != NULL:
+            RfcDestroyFunction(self.handle, NULL)
+            self.handle = NULL
+
+
+cdef class TableCursor:
+    """Read-only sequence of ABAP table rows
+
+    Returned by :meth:`~pyrfc.Connection.call` for TABLE parameters, when the
+    ``lazy_tables`` call option is set. Rows stay in the NW RFC SDK table and
+    are converted to Python when indexed or iterated, not cached.
+    The function container is released with the last cursor referencing it.
+
+    Supports ``len()``, indexing, slicing and iteration. Use ``list(cursor)``
+    to get all rows, like without ``lazy_tables`` option.
+    """
+    cdef object _owner
+    cdef _TypeLayout _layout
+    cdef RFC_TABLE_HANDLE _container
+    cdef unsigned _rowCount
+    cdef unsigned _config
+    cdef list _interned
 
-cdef wrapTable(RFC_TYPE_DESC_HANDLE typeDesc, RFC_TABLE_HANDLE container, unsigned config):
+    def __init__(self):
+        raise TypeError("TableCursor is returned by Connection.call() with 'lazy_tables' option")
+
+    cdef _row(self, unsigned index):
+        cdef RFC_ERROR_INFO errorInfo
+        cdef RFC_RC rc = RfcMoveTo(self._container, index, &errorInfo)
+        if rc != RFC_OK:
+            raise wrapError(&errorInfo)
+        return wrapStructure(self._layout, self._container, self._config, self._interned)
+
+    def __len__(self):
+        return self._rowCount
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._rowCount))]
+        if index < 0:
+            index += self._rowCount
+        if index < 0 or index >= self._rowCount:
+            raise IndexError("table index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        cdef unsigned i
+        for i in range(self._rowCount):
+            yield self._row(i)
+
+    def __repr__(self):
+        return f"<TableCursor rows={self._rowCount}>"
+
+Sequence.register(TableCursor)
+
+cdef wrapTableCursor(owner, _TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config):
     cdef RFC_ERROR_INFO errorInfo
     cdef unsigned rowCount
-    # # For debugging in tables (cf. class TableCursor)
-    # tc = TableCursor()
-    # tc.typeDesc = typeDesc
-    # tc.container = container
-    # return tc
+    cdef RFC_RC rc = RfcGetRowCount(container, &rowCount, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    cdef TableCursor cursor = TableCursor.__new__(TableCursor)
+    cursor._owner = owner
+    cursor._layout = layout
+    cursor._container = container
+    cursor._rowCount = rowCount
+    cursor._config = config
+    if config & _MASK_INTERN_FIELDS:
+        cursor._interned = internedValues(layout)
+    return cursor
+
+cdef class TableStream:
+    """Iterator over ABAP table rows, converting rows when read
+
+    Returned by :meth:`~pyrfc.Connection.call` for TABLE parameters, when the
+    ``stream_tables`` call option is set. Rows are converted to Python in table
+    order when iterated, so that the complete table never exists as Python
+    objects. With ``chunk_size`` call option, lists of up to ``chunk_size`` rows
+    are returned instead of single rows.
+
+    The stream can be iterated only once. The NW RFC SDK table rows are deleted
+    when the stream is exhausted and the function container is released when all
+    streams of the call are exhausted or garbage collected.
+    """
+    cdef object _owner
+    cdef _TypeLayout _layout
+    cdef RFC_TABLE_HANDLE _container
+    cdef unsigned _rowCount
+    # index of the next row
+    cdef unsigned _index
+    cdef unsigned _chunkSize
+    cdef unsigned _config
+    cdef list _interned
+
+    def __init__(self):
+        raise TypeError("TableStream is returned by Connection.call() with 'stream_tables' option")
+
+    cdef unsigned _remaining(self):
+        if self._owner is None:
+            return 0
+        return self._rowCount - self._index
+
+    cdef _next(self):
+        """Wrap the next row"""
+        cdef RFC_ERROR_INFO errorInfo
+        cdef RFC_RC rc = RfcMoveTo(self._container, self._index, &errorInfo)
+        if rc != RFC_OK:
+            raise wrapError(&errorInfo)
+        row = wrapStructure(self._layout, self._container, self._config, self._interned)
+        self._index += 1
+        return row
+
+    cdef _close(self):
+        """Delete all table rows and release the function container, if not used by other streams"""
+        cdef RFC_ERROR_INFO errorInfo
+        cdef RFC_TABLE_HANDLE container = self._container
+        self._owner = None
+        self._container = NULL
+        if container != NULL and RfcDeleteAllRows(container, &errorInfo) != RFC_OK:
+            raise wrapError(&errorInfo)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cdef unsigned rowCount = self._remaining()
+        if rowCount == 0:
+            self._close()
+            raise StopIteration
+        if self._chunkSize == 0:
+            return self._next()
+        return [self._next() for _ in range(min(rowCount, self._chunkSize))]
+
+    def __length_hint__(self):
+        cdef unsigned rowCount = self._remaining()
+        if self._chunkSize == 0:
+            return rowCount
+        return (rowCount + self._chunkSize - 1) // self._chunkSize
+
+    def __repr__(self):
+        return f"<TableStream rows={self._remaining()} chunk_size={self._chunkSize}>"
+
+cdef wrapTableStream(owner, _TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config, unsigned chunk_size):
+    cdef RFC_ERROR_INFO errorInfo
+    cdef TableStream stream = TableStream.__new__(TableStream)
+    if RfcGetRowCount(container, &stream._rowCount, &errorInfo) != RFC_OK:
+        raise wrapError(&errorInfo)
+    stream._index = 0
+    stream._owner = owner
+    stream._layout = layout
+    stream._container = container
+    stream._chunkSize = chunk_size
+    stream._config = config
+    if config & _MASK_INTERN_FIELDS:
+        stream._interned = internedValues(layout)
+    return stream
+
+cdef wrapTableColumns(_TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config):
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned rowCount, i
+    cdef RFC_FIELD_DESC *fieldDesc
+    cdef list interned = internedValues(layout) if config & _MASK_INTERN_FIELDS else None
+    if RfcGetRowCount(container, &rowCount, &errorInfo) != RFC_OK:
+        raise wrapError(&errorInfo)
+    columns = [[None] * rowCount for _ in range(layout.fieldCount)]
+    while rowCount > 0:
+        rowCount -= 1
+        if RfcMoveTo(container, rowCount, &errorInfo) != RFC_OK:
+            raise wrapError(&errorInfo)
+        for i in range(layout.fieldCount):
+            fieldDesc = &layout.fieldDesc[i]
+            value = wrapVariable(
+                fieldDesc.type,
+                container,
+                fieldDesc.name,
+                fieldDesc.nucLength,
+                fieldDesc.typeDescHandle,
+                config,
+                fieldLayout(layout, i)
+            )
+            if interned is not None and interned[i] is not None:
+                value = (<dict> interned[i]).setdefault(value, value)
+            columns[i][rowCount] = value
+        if RfcDeleteCurrentRow(container, &errorInfo) != RFC_OK:
+            raise wrapError(&errorInfo)
+    if layout.fieldCount == 1 and layout.names[0] == '':
+        # table of elementary line type
+        return columns[0]
+    return dict(zip(layout.names, columns))
+
+cdef RFC_INT8 NAT = -0x7FFFFFFFFFFFFFFF - 1
+
+cdef bint parseDigits(const SAP_UC *value, unsigned length, int *result):
+    cdef unsigned i
+    result[0] = 0
+    for i in range(length):
+        if value[i] < 0x30 or value[i] > 0x39:
+            return False
+        result[0] = result[0] * 10 + (value[i] - 0x30)
+    return True
+
+cdef bint dateToDays(const SAP_UC *value, RFC_INT8 *days):
+    """ABAP date to days since 1970-01-01, False if empty or invalid"""
+    cdef int year, month, day, era, yoe, doy, doe
+    if not parseDigits(value, 4, &year) or not parseDigits(value + 4, 2, &month) or not parseDigits(value + 6, 2, &day):
+        return False
+    if year == 0 or month < 1 or month > 12 or day < 1 or day > 31:
+        return False
+    # days from civil date, proleptic Gregorian calendar
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days[0] = <RFC_INT8> era * 146097 + doe - 719468
+    return True
+
+cdef bint timeToSeconds(const SAP_UC *value, RFC_INT8 *seconds):
+    """ABAP time to seconds since midnight, False if empty or invalid"""
+    cdef int hour, minute, second
+    if not parseDigits(value, 2, &hour) or not parseDigits(value + 2, 2, &minute) or not parseDigits(value + 4, 2, &second):
+        return False
+    if hour > 23 or minute > 59 or second > 59:
+        return False
+    seconds[0] = hour * 3600 + minute * 60 + second
+    return True
+
+cdef void copyUCS4(unsigned char *target, const SAP_UC *value, unsigned length, bint rstrip):
+    """Write SAP unicode string to zero-initialized NumPy unicode field of the same length"""
+    cdef unsigned i = 0
+    cdef unsigned n = 0
+    cdef Py_UCS4 c
+    if rstrip:
+        while length > 0 and value[length - 1] == 0x20:
+            length -= 1
+    while i < length:
+        c = value[i]
+        if 0xD800 <= c < 0xDC00 and i + 1 < length and 0xDC00 <= value[i + 1] < 0xE000:
+            c = 0x10000 + ((c - 0xD800) << 10) + (value[i + 1] - 0xDC00)
+            i += 1
+        memcpy(target + n * 4, &c, 4)
+        n += 1
+        i += 1
+
+# offset of numpy fields not in the fixed width buffer
+cdef unsigned _NO_OFFSET = <unsigned> -1
+
+cdef numpyFieldType(RFC_FIELD_DESC *fieldDesc, unsigned config):
+    cdef RFCTYPE typ = fieldDesc.type
+    if typ == RFCTYPE_INT:
+        return 'i4'
+    elif typ == RFCTYPE_INT1:
+        return 'u1'
+    elif typ == RFCTYPE_INT2:
+        return 'i2'
+    elif typ == RFCTYPE_INT8:
+        return 'i8'
+    elif typ == RFCTYPE_FLOAT:
+        return 'f8'
+    elif typ == RFCTYPE_BCD:
+        # Decimal objects, float only on request, losing precision
+        return 'f8' if config & _MASK_BCD_FLOAT else 'O'
+    elif typ == RFCTYPE_CHAR or typ == RFCTYPE_NUM:
+        return f'U{fieldDesc.nucLength}'
+    elif typ == RFCTYPE_BYTE:
+        return f'S{fieldDesc.nucLength}'
+    elif typ == RFCTYPE_DATE:
+        return 'M8[D]' if config & _MASK_DTIME else 'U8'
+    elif typ == RFCTYPE_TIME:
+        return 'm8[s]' if config & _MASK_DTIME else 'U6'
+    raise RFCError(f"Table format 'numpy' not supported for field '{wrapString(fieldDesc.name)}' of type {RfcFieldType(typ).name}")
+
+cdef wrapTableNumpy(_TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config):
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned rowCount, i, itemsize, bufferLength = 8
+    cdef RFC_FIELD_DESC *fieldDesc
+    cdef unsigned char[::1] raw
+    cdef unsigned char *row
+    cdef unsigned char *field
+    cdef unsigned *offsets = NULL
+    cdef SAP_UC *buffer = NULL
+    cdef RFC_INT intValue
+    cdef RFC_INT2 int2Value
+    cdef RFC_INT8 int8Value
+    cdef RFC_FLOAT floatValue
+    np = import_optional('numpy', "table format 'numpy'")
+    types = [numpyFieldType(&layout.fieldDesc[i], config) for i in range(layout.fieldCount)]
+    dtype = np.dtype([(layout.names[i], types[i]) for i in range(layout.fieldCount)])
+    rc = RfcGetRowCount(container, &rowCount, &errorInfo)
+    if rc != RFC_OK:
+        raise wrapError(&errorInfo)
+    # object fields filled apart, the fixed width fields directly in array buffer
+    objects = {i: [None] * rowCount for i in range(layout.fieldCount) if types[i] == 'O'}
+    fixed = np.dtype([(dtype.names[i], types[i]) for i in range(layout.fieldCount) if i not in objects]) if objects else dtype
+    array = np.zeros(rowCount, dtype=fixed)
+    if rowCount > 0:
+        itemsize = fixed.itemsize
+        if itemsize > 0:
+            raw = array.view(np.uint8)
+        offsets = <unsigned*> malloc(layout.fieldCount * sizeof(unsigned))
+        try:
+            for i in range(layout.fieldCount):
+                offsets[i] = _NO_OFFSET if i in objects else fixed.fields[dtype.names[i]][1]
+                if layout.fieldDesc[i].nucLength > bufferLength:
+                    bufferLength = layout.fieldDesc[i].nucLength
+            buffer = mallocU(bufferLength)
+            while rowCount > 0:
+                rowCount -= 1
+                rc = RfcMoveTo(container, rowCount, &errorInfo)
+                if rc != RFC_OK:
+                    raise wrapError(&errorInfo)
+                if itemsize > 0:
+                    row = &raw[rowCount * itemsize]
+                for i in range(layout.fieldCount):
+                    fieldDesc = &layout.fieldDesc[i]
+                    if offsets[i] == _NO_OFFSET:
+                        objects[i][rowCount] = wrapVariable(
+                            fieldDesc.type,
+                            container,
+                            fieldDesc.name,
+                            fieldDesc.nucLength,
+                            fieldDesc.typeDescHandle,
+                            config
+                        )
+                        continue
+                    field = row + offsets[i]
+                    if fieldDesc.type == RFCTYPE_INT:
+                        rc = RfcGetInt(container, fieldDesc.name, &intValue, &errorInfo)
+                        memcpy(field, &intValue, sizeof(RFC_INT))
+                    elif fieldDesc.type == RFCTYPE_INT1:
+                        rc = RfcGetInt1(container, fieldDesc.name, <RFC_INT1*> field, &errorInfo)
+                    elif fieldDesc.type == RFCTYPE_INT2:
+                        rc = RfcGetInt2(container, fieldDesc.name, &int2Value, &errorInfo)
+                        memcpy(field, &int2Value, sizeof(RFC_INT2))
+                    elif fieldDesc.type == RFCTYPE_INT8:
+                        rc = RfcGetInt8(container, fieldDesc.name, &int8Value, &errorInfo)
+                        memcpy(field, &int8Value, sizeof(RFC_INT8))
+                    elif fieldDesc.type == RFCTYPE_FLOAT or fieldDesc.type == RFCTYPE_BCD:
+                        rc = RfcGetFloat(container, fieldDesc.name, &floatValue, &errorInfo)
+                        memcpy(field, &floatValue, sizeof(RFC_FLOAT))
+                    elif fieldDesc.type == RFCTYPE_CHAR:
+                        rc = RfcGetChars(container, fieldDesc.name, buffer, fieldDesc.nucLength, &errorInfo)
+                        copyUCS4(field, buffer, fieldDesc.nucLength, config & _MASK_RSTRIP)
+                    elif fieldDesc.type == RFCTYPE_NUM:
+                        rc = RfcGetNum(container, fieldDesc.name, buffer, fieldDesc.nucLength, &errorInfo)
+                        copyUCS4(field, buffer, fieldDesc.nucLength, False)
+                    elif fieldDesc.type == RFCTYPE_BYTE:
+                        rc = RfcGetBytes(container, fieldDesc.name, field, fieldDesc.nucLength, &errorInfo)
+                    elif fieldDesc.type == RFCTYPE_DATE:
+                        rc = RfcGetDate(container, fieldDesc.name, buffer, &errorInfo)
+                        if config & _MASK_DTIME:
+                            if not dateToDays(buffer, &int8Value):
+                                int8Value = NAT
+                            memcpy(field, &int8Value, sizeof(RFC_INT8))
+                        elif not (parseDigits(buffer, 8, &intValue) and intValue == 0):
+                            # empty date '00000000' remains '', like in rows table format
+                            copyUCS4(field, buffer, 8, False)
+                    elif fieldDesc.type == RFCTYPE_TIME:
+                        rc = RfcGetTime(container, fieldDesc.name, buffer, &errorInfo)
+                        if config & _MASK_DTIME:
+                            if not timeToSeconds(buffer, &int8Value):
+                                int8Value = NAT
+                            memcpy(field, &int8Value, sizeof(RFC_INT8))
+                        else:
+                            copyUCS4(field, buffer, 6, False)
+                    if rc != RFC_OK:
+                        raise wrapError(&errorInfo)
+                RfcDeleteCurrentRow(container, &errorInfo)
+        finally:
+            free(offsets)
+            free(buffer)
+    if objects:
+        fixedArray = array
+        array = np.empty(len(fixedArray), dtype=dtype)
+        for i in range(layout.fieldCount):
+            array[dtype.names[i]] = objects[i] if i in objects else fixedArray[dtype.names[i]]
+    if layout.fieldCount == 1 and layout.names[0] == '':
+        # table of elementary line type
+        return array[dtype.names[0]]
+    return array
+
+ctypedef struct ArrowColumn:
+    unsigned char *data         # fixed width values
+    unsigned char *validity     # DATE and TIME null bitmap
+    int32_t *offsets            # variable length values
+    unsigned char *varData
+    size_t varLength
+    size_t varCapacity
+    unsigned nullCount
+
+cdef unsigned char *reserveArrowData(ArrowColumn *column, size_t length) except NULL:
+    """Reserve space for variable length value, returns the pointer to write to"""
+    cdef size_t capacity
+    cdef unsigned char *varData
+    if column.varLength + length > column.varCapacity:
+        capacity = column.varCapacity * 2 + length + 64
+        varData = <unsigned char*> realloc(column.varData, capacity)
+        if varData == NULL:
+            raise MemoryError()
+        column.varData = varData
+        column.varCapacity = capacity
+    return column.varData + column.varLength
+
+cdef bint bcdToDecimal128(const SAP_UC *value, unsigned length, unsigned decimals, unsigned char *target):
+    """ABAP BCD string to Arrow decimal128 value scaled by decimals, False if invalid"""
+    cdef uint32_t limbs[4]
+    cdef uint64_t words[2]
+    cdef uint64_t t, carry
+    cdef unsigned i, k, digit, fraction = 0
+    cdef bint negative = False, point = False
+    limbs[0] = limbs[1] = limbs[2] = limbs[3] = 0
+    for i in range(length + decimals):
+        if i < length:
+            if value[i] == 0x2D:  # '-'
+                negative = True
+                continue
+            if value[i] == 0x2E or value[i] == 0x2C:  # '.' or ','
+                point = True
+                continue
+            if value[i] == 0x20 or value[i] == 0x2B:  # ' ' or '+'
+                continue
+            if value[i] < 0x30 or value[i] > 0x39:
+                return False
+            if point:
+                fraction += 1
+            digit = value[i] - 0x30
+        elif fraction < decimals:
+            # scale to decimals
+            fraction += 1
+            digit = 0
+        else:
+            break
+        carry = digit
+        for k in range(4):
+            t = <uint64_t> limbs[k] * 10 + carry
+            limbs[k] = <uint32_t> t
+            carry = t >> 32
+    if negative:
+        carry = 1
+        for k in range(4):
+            t = <uint64_t> (~limbs[k] & 0xFFFFFFFFU) + carry
+            limbs[k] = <uint32_t> t
+            carry = t >> 32
+    # little endian word order
+    words[0] = limbs[0] | (<uint64_t> limbs[1] << 32)
+    words[1] = limbs[2] | (<uint64_t> limbs[3] << 32)
+    memcpy(target, words, 16)
+    return True
+
+cdef arrowFieldType(pa, RFC_FIELD_DESC *fieldDesc):
+    cdef RFCTYPE typ = fieldDesc.type
+    if typ == RFCTYPE_INT:
+        return pa.int32()
+    elif typ == RFCTYPE_INT1:
+        return pa.uint8()
+    elif typ == RFCTYPE_INT2:
+        return pa.int16()
+    elif typ == RFCTYPE_INT8:
+        return pa.int64()
+    elif typ == RFCTYPE_FLOAT:
+        return pa.float64()
+    elif typ == RFCTYPE_BCD:
+        return pa.decimal128(min(2 * fieldDesc.nucLength - 1, 38), fieldDesc.decimals)
+    elif typ == RFCTYPE_CHAR or typ == RFCTYPE_NUM or typ == RFCTYPE_STRING:
+        return pa.string()
+    elif typ == RFCTYPE_BYTE or typ == RFCTYPE_XSTRING:
+        return pa.binary()
+    elif typ == RFCTYPE_DATE:
+        return pa.date32()
+    elif typ == RFCTYPE_TIME:
+        return pa.time32('s')
+    raise RFCError(f"Table format 'arrow' not supported for field '{wrapString(fieldDesc.name)}' of type {RfcFieldType(typ).name}")
+
+cdef unsigned arrowFieldWidth(RFC_FIELD_DESC *fieldDesc):
+    """Arrow value width in bytes, 0 for variable length values"""
+    cdef RFCTYPE typ = fieldDesc.type
+    if typ == RFCTYPE_INT or typ == RFCTYPE_DATE or typ == RFCTYPE_TIME:
+        return 4
+    elif typ == RFCTYPE_INT1:
+        return 1
+    elif typ == RFCTYPE_INT2:
+        return 2
+    elif typ == RFCTYPE_INT8 or typ == RFCTYPE_FLOAT:
+        return 8
+    elif typ == RFCTYPE_BCD:
+        return 16
+    return 0
+
+cdef wrapTableArrow(_TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config):
+    cdef RFC_RC rc
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned rowCount, row, i, width, strLen, resultLen, utf8Size, bufferLength = 64
+    cdef RFC_FIELD_DESC *fieldDesc
+    cdef ArrowColumn *columns = NULL
+    cdef ArrowColumn *column
+    cdef SAP_UC *buffer = NULL
+    cdef unsigned char *target
+    cdef RFC_INT8 int8Value
+    cdef int32_t int32Value
+    cdef bint valid
+    pa = import_optional('pyarrow', "table format 'arrow'")
+    types = [arrowFieldType(pa, &layout.fieldDesc[i]) for i in range(layout.fieldCount)]
+    RfcGetRowCount(container, &rowCount, &errorInfo)
+    # fixed width buffers are Python owned, passed to Arrow without copy
+    buffers = []
+    columns = <ArrowColumn*> malloc(layout.fieldCount * sizeof(ArrowColumn))
+    if columns == NULL:
+        raise MemoryError()
+    memset(columns, 0, layout.fieldCount * sizeof(ArrowColumn))
+    try:
+        for i in range(layout.fieldCount):
+            fieldDesc = &layout.fieldDesc[i]
+            width = arrowFieldWidth(fieldDesc)
+            if width > 0:
+                data = bytearray(rowCount * width)
+                validity = bytearray((rowCount + 7) // 8)
+                if rowCount > 0:
+                    columns[i].data = data
+                    columns[i].validity = validity
+                buffers.append((validity, data))
+            else:
+                offsets = bytearray((rowCount + 1) * sizeof(int32_t))
+                columns[i].offsets = <int32_t*> (<unsigned char*> offsets)
+                buffers.append((None, offsets))
+            # BCD string: two digits per byte, sign and decimal separator
+            width = 2 * fieldDesc.nucLength + 2 if fieldDesc.type == RFCTYPE_BCD else fieldDesc.nucLength + 2
+            if width > bufferLength:
+                bufferLength = width
+        buffer = mallocU(bufferLength)
+        # rows are read in order, for appending variable length values
+        for row in range(rowCount):
+            rc = RfcMoveTo(container, row, &errorInfo)
+            if rc != RFC_OK:
+                raise wrapError(&errorInfo)
+            for i in range(layout.fieldCount):
+                fieldDesc = &layout.fieldDesc[i]
+                column = &columns[i]
+                if fieldDesc.type == RFCTYPE_INT:
+                    rc = RfcGetInt(container, fieldDesc.name, <RFC_INT*> (column.data + row * 4), &errorInfo)
+                elif fieldDesc.type == RFCTYPE_INT1:
+                    rc = RfcGetInt1(container, fieldDesc.name, <RFC_INT1*> (column.data + row), &errorInfo)
+                elif fieldDesc.type == RFCTYPE_INT2:
+                    rc = RfcGetInt2(container, fieldDesc.name, <RFC_INT2*> (column.data + row * 2), &errorInfo)
+                elif fieldDesc.type == RFCTYPE_INT8:
+                    rc = RfcGetInt8(container, fieldDesc.name, <RFC_INT8*> (column.data + row * 8), &errorInfo)
+                elif fieldDesc.type == RFCTYPE_FLOAT:
+                    rc = RfcGetFloat(container, fieldDesc.name, <RFC_FLOAT*> (column.data + row * 8), &errorInfo)
+                elif fieldDesc.type == RFCTYPE_DATE or fieldDesc.type == RFCTYPE_TIME:
+                    if fieldDesc.type == RFCTYPE_DATE:
+                        rc = RfcGetDate(container, fieldDesc.name, buffer, &errorInfo)
+                        valid = dateToDays(buffer, &int8Value)
+                    else:
+                        rc = RfcGetTime(container, fieldDesc.name, buffer, &errorInfo)
+                        valid = timeToSeconds(buffer, &int8Value)
+                    if valid:
+                        int32Value = <int32_t> int8Value
+                        memcpy(column.data + row * 4, &int32Value, 4)
+                        column.validity[row >> 3] |= 1 << (row & 7)
+                    else:
+                        column.nullCount += 1
+                elif fieldDesc.type == RFCTYPE_BCD:
+                    rc = RfcGetString(container, fieldDesc.name, buffer, bufferLength, &resultLen, &errorInfo)
+                    if rc == RFC_OK and not bcdToDecimal128(buffer, resultLen, fieldDesc.decimals, column.data + row * 16):
+                        raise RFCError(f"Invalid BCD value '{wrapString(buffer, resultLen)}' of field '{layout.names[i]}'")
+                elif fieldDesc.type == RFCTYPE_BYTE:
+                    target = reserveArrowData(column, fieldDesc.nucLength)
+                    rc = RfcGetBytes(container, fieldDesc.name, target, fieldDesc.nucLength, &errorInfo)
+                    column.varLength += fieldDesc.nucLength
+                elif fieldDesc.type == RFCTYPE_XSTRING:
+                    rc = RfcGetStringLength(container, fieldDesc.name, &strLen, &errorInfo)
+                    if rc == RFC_OK:
+                        target = reserveArrowData(column, strLen)
+                        rc = RfcGetXString(container, fieldDesc.name, target, strLen, &resultLen, &errorInfo)
+                        column.varLength += resultLen
+                else:
+                    # CHAR, NUM and STRING
+                    if fieldDesc.type == RFCTYPE_STRING:
+                        rc = RfcGetStringLength(container, fieldDesc.name, &strLen, &errorInfo)
+                        if rc == RFC_OK and strLen + 1 > bufferLength:
+                            free(buffer)
+                            buffer = NULL
+                            bufferLength = strLen + 1
+                            buffer = mallocU(bufferLength)
+                        if rc == RFC_OK:
+                            rc = RfcGetString(container, fieldDesc.name, buffer, strLen + 1, &resultLen, &errorInfo)
+                    elif fieldDesc.type == RFCTYPE_CHAR:
+                        resultLen = fieldDesc.nucLength
+                        rc = RfcGetChars(container, fieldDesc.name, buffer, resultLen, &errorInfo)
+                        if config & _MASK_RSTRIP:
+                            while resultLen > 0 and buffer[resultLen - 1] == 0x20:
+                                resultLen -= 1
+                    else:
+                        resultLen = fieldDesc.nucLength
+                        rc = RfcGetNum(container, fieldDesc.name, buffer, resultLen, &errorInfo)
+                    if rc == RFC_OK and resultLen > 0:
+                        utf8Size = resultLen * 3 + 1
+                        target = reserveArrowData(column, utf8Size)
+                        rc = RfcSAPUCToUTF8(buffer, resultLen, target, &utf8Size, &strLen, &errorInfo)
+                        column.varLength += strLen
+                if rc != RFC_OK:
+                    raise wrapError(&errorInfo)
+                if column.offsets != NULL:
+                    column.offsets[row + 1] = <int32_t> column.varLength
+        arrays = []
+        for i in range(layout.fieldCount):
+            column = &columns[i]
+            validity, data = buffers[i]
+            if column.offsets != NULL:
+                data = pa.py_buffer(column.varData[:column.varLength] if column.varLength > 0 else b'')
+                array = pa.Array.from_buffers(types[i], rowCount, [None, pa.py_buffer(buffers[i][1]), data], 0)
+                if config & _MASK_INTERN_FIELDS and types[i] == pa.string():
+                    # categorical codes and distinct values
+                    array = array.dictionary_encode()
+                arrays.append(array)
+            else:
+                arrays.append(pa.Array.from_buffers(
+                    types[i],
+                    rowCount,
+                    [pa.py_buffer(validity) if column.nullCount > 0 else None, pa.py_buffer(data)],
+                    column.nullCount
+                ))
+    finally:
+        for i in range(layout.fieldCount):
+            free(columns[i].varData)
+        free(columns)
+        free(buffer)
+    if layout.fieldCount == 1 and layout.names[0] == '':
+        # table of elementary line type
+        return arrays[0]
+    return pa.Table.from_arrays(arrays, names=layout.names)
+
+cdef wrapTable(_TypeLayout layout, RFC_TABLE_HANDLE container, unsigned config):
+    """
+    :param layout: Layout of the table line type or of selected fields
+    """
+    cdef RFC_ERROR_INFO errorInfo
+    cdef unsigned rowCount
+    if config & _MASK_TABLE_COLUMNS:
+        return wrapTableColumns(layout, container, config)
+    if config & _MASK_TABLE_NUMPY:
+        return wrapTableNumpy(layout, container, config)
+    if config & _MASK_TABLE_ARROW:
+        return wrapTableArrow(layout, container, config)
+    cdef list interned = internedValues(layout) if config & _MASK_INTERN_FIELDS else None
     RfcGetRowCount(container, &rowCount, &errorInfo)
     table = [None] * rowCount
     while rowCount > 0:
         rowCount -= 1
         RfcMoveTo(container, rowCount, &errorInfo)
-        table[rowCount] = wrapStructure(typeDesc, container, config)
+        table[rowCount] = wrapStructure(layout, container, config, interned)
         RfcDeleteCurrentRow(container, &errorInfo)
     return table
 
@@ -3115,8 +5393,13 @@ cdef wrapVariable(
             SAP_UC* cName,
             unsigned cLen,
             RFC_TYPE_DESC_HANDLE typeDesc,
-            unsigned config
+            unsigned config,
+            _TypeLayout layout=None
         ):
+    """
+    :param layout: Layout of STRUCTURE and TABLE types, owned by the call plan,
+           created for this value when None
+    """
     cdef RFC_RC rc
     cdef RFC_ERROR_INFO errorInfo
     cdef RFC_STRUCTURE_HANDLE structure
@@ -3137,12 +5420,12 @@ cdef wrapVariable(
         rc = RfcGetStructure(container, cName, &structure, &errorInfo)
         if rc != RFC_OK:
             raise wrapError(&errorInfo)
-        return wrapStructure(typeDesc, structure, config)
+        return wrapStructure(layout if layout is not None else newTypeLayout(typeDesc), structure, config)
     elif typ == RFCTYPE_TABLE:
         rc = RfcGetTable(container, cName, &table, &errorInfo)
         if rc != RFC_OK:
             raise wrapError(&errorInfo)
-        return wrapTable(typeDesc, table, config)
+        return wrapTable(layout if layout is not None else newTypeLayout(typeDesc), table, config)
     elif typ == RFCTYPE_CHAR:
         charValue = mallocU(cLen)
         try:
@@ -3329,50 +5612,60 @@ cdef wrapError(RFC_ERROR_INFO* errorInfo):
             wrapString(errorInfo.abapMsgV3), wrapString(errorInfo.abapMsgV4)
         )
 
+# byte order of SAP_UC (UTF-16) code units, for PyUnicode_DecodeUTF16
+cdef int SAPUC_BYTEORDER = -1 if byteorder == 'little' else 1
+
+cdef inline bint isSpaceU(SAP_UC uc):
+    # ASCII whitespace, as stripped by bytes.rstrip()
+    return uc == 0x20 or 0x09 <= uc <= 0x0d
+
 cdef wrapString(const SAP_UC* uc, uclen=-1, rstrip=True):
-    cdef RFC_RC rc
-    cdef RFC_ERROR_INFO errorInfo
-    if uclen == -1:
-        uclen = strlenU(uc)
-    if uclen == 0:
+    """
+    Decodes SAP_UC (UTF-16) string into Python string, in one allocation.
+    Trailing blanks are trimmed before decoding, ASCII strings are narrowed
+    without decoding.
+
+    :param uc: SAP_UC string
+    :param uclen: String length in SAP_UC characters, -1 if zero terminated
+    :param rstrip: Trim trailing whitespace
+    :return: Python string
+    """
+    cdef Py_ssize_t i, length = strlenU(<SAP_UC*> uc) if uclen == -1 else uclen
+    cdef int order = SAPUC_BYTEORDER
+    cdef Py_UCS1* ascii
+    if rstrip:
+        while length > 0 and isSpaceU(uc[length - 1]):
+            length -= 1
+    if length == 0:
         return ''
-    cdef unsigned utf8_size = uclen * 5 + 1
-    cdef char *utf8 = <char*> malloc(utf8_size)
-    utf8[0] = 0
-    cdef unsigned result_len = 0
-    rc = RfcSAPUCToUTF8(uc, uclen, <RFC_BYTE*> utf8, &utf8_size, &result_len, &errorInfo)
-    if rc != RFC_OK:
-        # raise wrapError(&errorInfo)
-        raise RFCError('wrapString uclen: %u utf8_size: %u' % (uclen, utf8_size))
-    utf8[result_len] = 0
+    i = 0
+    while i < length and uc[i] < 0x80:
+        i += 1
+    if i == length:
+        # ASCII string narrowed to compact 1-byte Python string
+        result = PyUnicode_New(length, 127)
+        ascii = PyUnicode_1BYTE_DATA(result)
+        for i in range(length):
+            ascii[i] = <Py_UCS1> uc[i]
+        return result
     try:
-        if rstrip:
-            return utf8[:result_len].rstrip().decode()
-
-        return utf8[:result_len].decode()
-    finally:
-        free(utf8)
+        return PyUnicode_DecodeUTF16(<char*> uc, length * sizeof(SAP_UC), NULL, &order)
+    except UnicodeDecodeError:
+        # invalid UTF-16, left to SAP NW RFC Lib conversion
+        return wrapStringUTF8(uc, length)
 
-cdef wrapString(SAP_UC* uc, uclen=-1, rstrip=True):
+cdef wrapStringUTF8(const SAP_UC* uc, unsigned uclen):
     cdef RFC_RC rc
     cdef RFC_ERROR_INFO errorInfo
-    if uclen == -1:
-        uclen = strlenU(uc)
-    if uclen == 0:
-        return ''
     cdef unsigned utf8_size = uclen * 5 + 1
     cdef char *utf8 = <char*> malloc(utf8_size)
     utf8[0] = 0
     cdef unsigned result_len = 0
     rc = RfcSAPUCToUTF8(uc, uclen, <RFC_BYTE*> utf8, &utf8_size, &result_len, &errorInfo)
     if rc != RFC_OK:
-        # raise wrapError(&errorInfo)
+        free(utf8)
         raise RFCError('wrapString uclen: %u utf8_size: %u' % (uclen, utf8_size))
-    utf8[result_len] = 0
     try:
-        if rstrip:
-            return utf8[:result_len].rstrip().decode()
-
         return utf8[:result_len].decode()
     finally:
         free(utf8)
@@ -48,6 +48,24 @@ class RFCLibError(RFCError):
         self.msg_v3 = msg_v3
         self.msg_v4 = msg_v4
 
+    def __reduce__(self):
+        """Pickle all error attributes, like for server process pool."""
+        return (
+            self.__class__,
+            (
+                self.message,
+                self.code,
+                self.key,
+                self.msg_class,
+                self.msg_type,
+                self.msg_number,
+                self.msg_v1,
+                self.msg_v2,
+                self.msg_v3,
+                self.msg_v4,
+            ),
+        )
+
     def __str__(self):
         """Convert RFCLibError object to string."""
         code = 28 if self.code is None else self.code  # 28 = RFC_UNKNOWN_ERROR
@@ -0,0 +1,281 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+""":mod:`pyrfc` client connection pool."""
+
+from collections import deque
+from contextlib import contextmanager, suppress
+from threading import Condition
+from time import monotonic
+
+from pyrfc._cyrfc import Connection
+from pyrfc._exception import RFCError
+
+
+class ConnectionPool:
+    """Thread-safe pool of client connections to one SAP backend system.
+
+    Connections are opened on demand, up to ``max_size``, and re-used after
+    returned to the pool. Idle connections are checked on borrow by
+    :meth:`Connection.is_valid`, and by :meth:`Connection.ping` when idle
+    longer than ``ping_interval``. Broken connections are re-opened.
+
+    >>> pool = ConnectionPool(max_size=5, dest="MME")
+    >>> with pool.borrow() as conn:
+    ...     conn.call("STFC_CONNECTION", REQUTEXT="Hello SAP!")
+
+    :param min_size: Connections opened when the pool is created and kept open
+           when idle (default is 0)
+    :type min_size: int
+
+    :param max_size: Maximum number of open connections (default is 10)
+    :type max_size: int
+
+    :param idle_timeout: Idle connections above ``min_size`` are closed after
+           ``idle_timeout`` seconds (default is 300). ``None`` keeps them open,
+           ``0`` closes them when returned to the pool.
+    :type idle_timeout: float or None
+
+    :param ping_interval: Connections idle longer than ``ping_interval`` seconds
+           are pinged on borrow (default is 60). ``None`` deactivates the ping.
+    :type ping_interval: float or None
+
+    :param borrow_timeout: Default for :meth:`borrow` ``timeout`` (default is None,
+           waiting until a connection is returned to the pool)
+    :type borrow_timeout: float or None
+
+    :param config: Client connection configuration, cf. :class:`Connection`
+    :type config: dict or None (default)
+
+    :param params: SAP connection parameters, cf. :class:`Connection`
+    :type params: Keyword parameters
+
+    :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if the pool
+             configuration is not valid or ``min_size`` connections can't be opened.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        min_size=0,
+        max_size=10,
+        idle_timeout=300,
+        ping_interval=60,
+        borrow_timeout=None,
+        config=None,
+        **params,
+    ):
+        """Init ConnectionPool class."""
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise RFCError(
+                f"Connection pool size not valid: min_size={min_size}, max_size={max_size}"  # noqa: E501
+            )
+        self._min_size = min_size
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._ping_interval = ping_interval
+        self._borrow_timeout = borrow_timeout
+        self._config = config
+        self._params = params
+        self._cond = Condition()
+        # idle connections and the time returned, most recently used last
+        self._idle = deque()
+        self._in_use = set()
+        # open connections, including connections being opened
+        self._size = 0
+        self._closed = False
+        try:
+            for _ in range(min_size):
+                self._size += 1
+                self._idle.append((self._open(), monotonic()))
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def stats(self):
+        """Connection pool statistics
+
+        :getter: Number of ``open``, ``idle`` and ``in_use`` connections
+        :type: dict
+        """
+        with self._cond:
+            return {
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+            }
+
+    @property
+    def max_size(self):
+        """Maximum number of open connections
+
+        :getter: Pool ``max_size``
+        :type: int
+        """
+        return self._max_size
+
+    @property
+    def closed(self):
+        """Connection pool closed
+
+        :getter: True when closed
+        :type: boolean
+        """
+        return self._closed
+
+    def acquire(self, timeout=None):
+        """Take a connection from the pool
+
+        The connection must be given back by :meth:`release`. Prefer the
+        :meth:`borrow` context manager, which does it automatically.
+
+        :param timeout: Seconds to wait for a connection, when ``max_size``
+               connections are in use. Default is ``borrow_timeout``.
+        :type timeout: float or None
+
+        :returns: Open client connection
+        :rtype: Connection
+
+        :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if no connection
+                 available within ``timeout`` seconds or the connection can't be opened.
+        """
+        if timeout is None:
+            timeout = self._borrow_timeout
+        deadline = None if timeout is None else monotonic() + timeout
+        evicted = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RFCError("Connection pool is closed")
+                    evicted += self._evict_idle()
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self._max_size:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise RFCError(
+                            f"No connection available within {timeout} seconds, all {self._max_size} connections in use"  # noqa: E501
+                        )
+                    self._cond.wait(remaining)
+        finally:
+            self._close_all(evicted)
+        try:
+            if conn is None:
+                conn = self._open()
+            else:
+                self._check(conn, last_used)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            if conn is not None:
+                self._close_all([conn])
+            raise
+        with self._cond:
+            self._in_use.add(conn)
+        return conn
+
+    def release(self, conn):
+        """Give the connection back to the pool
+
+        Closed connections are removed from the pool.
+
+        :param conn: Connection taken by :meth:`acquire`
+        :type conn: Connection
+
+        :raises: :exc:`~pyrfc.RFCError` if the connection is not from this pool.
+        """
+        with self._cond:
+            if conn not in self._in_use:
+                raise RFCError("Connection not acquired from this pool")
+            self._in_use.discard(conn)
+            evicted = []
+            if self._closed or not conn.alive:
+                self._size -= 1
+                evicted.append(conn)
+            else:
+                self._idle.append((conn, monotonic()))
+            # after returned, idle_timeout 0 closes connections above min_size
+            evicted += self._evict_idle()
+            self._cond.notify()
+        self._close_all(evicted)
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """Context manager borrowing a connection from the pool
+
+        :param timeout: cf. :meth:`acquire`
+        :type timeout: float or None
+
+        :returns: Open client connection, returned to the pool on exit
+        :rtype: Connection
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close the pool and idle connections
+
+        Connections in use are closed when released.
+        """
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self):
+        return Connection(config=self._config, **self._params)
+
+    def _check(self, conn, last_used):
+        """Re-open the connection if not valid or ping fails"""
+        if not conn.is_valid():
+            conn.reopen()
+        elif (
+            self._ping_interval is not None
+            and monotonic() - last_used > self._ping_interval
+        ):
+            try:
+                conn.ping()
+            except RFCError:
+                conn.reopen()
+
+    def _evict_idle(self):
+        """Remove connections idle longer than idle_timeout, called with lock"""
+        evicted = []
+        if self._idle_timeout is None:
+            return evicted
+        expired = monotonic() - self._idle_timeout
+        # least recently used first
+        while self._idle and self._size > self._min_size:
+            conn, last_used = self._idle[0]
+            if last_used > expired:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            evicted.append(conn)
+        return evicted
+
+    @staticmethod
+    def _close_all(connections):
+        for conn in connections:
+            with suppress(RFCError):
+                conn.close()
@@ -0,0 +1,290 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+""":mod:`pyrfc` paged table reader."""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from decimal import Decimal
+from textwrap import wrap
+
+from pyrfc._exception import RFCError
+from pyrfc._pool import ConnectionPool
+
+# RFC_READ_TABLE OPTIONS line length
+_OPTIONS_LINE_LENGTH = 72
+
+
+def _number(cast):
+    def convert(value):
+        value = value.strip()
+        if not value:
+            return None
+        # ABAP trailing minus sign
+        if value.endswith("-"):
+            value = "-" + value[:-1].strip()
+        return cast(value)
+
+    return convert
+
+
+def _date(value):
+    if not value.strip("0 "):
+        return None
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        # invalid date, returned as is
+        return value
+
+
+def _time(value):
+    if not value.strip():
+        return None
+    try:
+        return time(int(value[:2]), int(value[2:4]), int(value[4:6]))
+    except ValueError:
+        return value
+
+
+def _string(value):
+    return value.rstrip()
+
+
+# ABAP internal type of RFC_READ_TABLE FIELDS: converter, other types as string
+_CONVERTERS = {
+    "I": _number(int),
+    "b": _number(int),
+    "s": _number(int),
+    "8": _number(int),
+    "P": _number(Decimal),
+    "a": _number(Decimal),
+    "e": _number(Decimal),
+    "F": _number(float),
+    "D": _date,
+    "T": _time,
+}
+
+
+def _options_lines(where):
+    """Split the WHERE condition into RFC_READ_TABLE OPTIONS lines"""
+    lines = wrap(
+        where,
+        width=_OPTIONS_LINE_LENGTH,
+        break_long_words=False,
+        break_on_hyphens=False,
+    )
+    for line in lines:
+        if len(line) > _OPTIONS_LINE_LENGTH:
+            raise RFCError(f"WHERE condition word too long: '{line}'")
+    return [{"TEXT": line} for line in lines]
+
+
+class TableReader:
+    """Paged, parallel reader of ABAP tables via RFC_READ_TABLE
+
+    Table rows are read in pages of ``page_size`` rows, by ROWSKIPS and
+    ROWCOUNT parameters, and returned in table order. Up to ``max_workers``
+    pages are read in parallel, on connections from a :class:`ConnectionPool`.
+    The fixed length ``DATA`` rows are parsed into dictionaries of typed
+    values, using the returned ``FIELDS`` offsets and ABAP types: integers,
+    :class:`~decimal.Decimal`, float, :class:`~datetime.date` and
+    :class:`~datetime.time` values. Initial dates and times are returned as None,
+    invalid ones and other types as right stripped strings.
+
+    >>> with TableReader("T000", fields=["MANDT", "MTEXT"], dest="MME") as reader:
+    ...     for rows in reader.read():
+    ...         save(rows, reader.checkpoint)
+
+    Key range ``partitions`` are read one after the other, each one paged.
+    Partitions by key ranges give consistent results for tables changed while
+    read, which paging alone does not guarantee.
+
+    After a failure, reading is resumed from the ``checkpoint`` saved after the
+    last processed page.
+
+    :param table: ABAP table or view name
+    :type table: string
+
+    :param fields: Field names to read, default is all fields
+    :type fields: list of strings or None
+
+    :param where: Open SQL WHERE condition
+    :type where: string or None
+
+    :param partitions: WHERE conditions of partitions, like key ranges,
+           combined with ``where`` condition
+    :type partitions: list of strings or None
+
+    :param page_size: Number of rows per page (default is 10000)
+    :type page_size: int
+
+    :param max_workers: Maximum number of pages read in parallel, default is
+           the pool ``max_size``
+    :type max_workers: int or None
+
+    :param func_name: RFC_READ_TABLE compatible function module
+           (default is "RFC_READ_TABLE")
+    :type func_name: string
+
+    :param pool: Connection pool to use. When not given, a new pool is created
+           from ``max_workers``, ``config`` and ``params``, closed with the reader.
+    :type pool: ConnectionPool or None (default)
+
+    :param config: Client connection configuration, cf. :class:`Connection`
+    :type config: dict or None (default)
+
+    :param params: SAP connection parameters, cf. :class:`Connection`
+    :type params: Keyword parameters
+
+    :raises: :exc:`~pyrfc.RFCError` if the reader configuration is not valid.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        table,
+        *,
+        fields=None,
+        where=None,
+        partitions=None,
+        page_size=10000,
+        max_workers=None,
+        func_name="RFC_READ_TABLE",
+        pool=None,
+        config=None,
+        **params,
+    ):
+        """Init TableReader class."""
+        if page_size < 1 or (max_workers is not None and max_workers < 1):
+            raise RFCError(
+                f"Table reader configuration not valid: page_size={page_size}, max_workers={max_workers}"  # noqa: E501
+            )
+        self._table = table
+        self._func_name = func_name
+        self._page_size = page_size
+        self._fields = [{"FIELDNAME": name} for name in fields or []]
+        self._options = [
+            _options_lines(
+                " AND ".join(
+                    f"( {condition} )" for condition in (where, partition) if condition
+                )
+            )
+            for partition in partitions or [None]
+        ]
+        self._own_pool = pool is None
+        self._pool = (
+            ConnectionPool(max_size=max_workers or 10, config=config, **params)
+            if pool is None
+            else pool
+        )
+        self._max_workers = max_workers or self._pool.max_size
+        self._checkpoint = {"partition": 0, "page": 0}
+
+    @property
+    def checkpoint(self):
+        """Reading position after the last returned page
+
+        :getter: Dictionary with ``partition`` and ``page`` index, to resume
+                 reading by :meth:`read`
+        :type: dict
+        """
+        return dict(self._checkpoint)
+
+    def read(self, checkpoint=None):
+        """Read table pages
+
+        :param checkpoint: Resume reading from :attr:`checkpoint`, default is
+               reading from the first page
+        :type checkpoint: dict or None
+
+        :returns: Generator of pages, lists of rows dictionaries
+
+        :raises: :exc:`~pyrfc.RFCError` or a subclass thereof if a page can't be read.
+        """
+        if checkpoint is None:
+            checkpoint = {"partition": 0, "page": 0}
+        partition, page = checkpoint["partition"], checkpoint["page"]
+        self._checkpoint = {"partition": partition, "page": page}
+        pending = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=self._max_workers, thread_name_prefix="pyrfc"
+        )
+        try:
+            while partition < len(self._options):
+                # read ahead pages of the current partition
+                while len(pending) < self._max_workers:
+                    pending.append(executor.submit(self._read_page, partition, page))
+                    page += 1
+                rows = pending.popleft().result()
+                if len(rows) < self._page_size:
+                    # last page of the partition, pages read ahead are empty
+                    self._cancel(pending)
+                    partition += 1
+                    page = 0
+                    self._checkpoint = {"partition": partition, "page": 0}
+                else:
+                    self._checkpoint["page"] += 1
+                if rows:
+                    yield rows
+        finally:
+            self._cancel(pending)
+            executor.shutdown(wait=True)
+
+    def rows(self, checkpoint=None):
+        """Read table rows
+
+        :param checkpoint: cf. :meth:`read`
+        :type checkpoint: dict or None
+
+        :returns: Generator of rows dictionaries
+        """
+        for rows in self.read(checkpoint):
+            yield from rows
+
+    def close(self):
+        """Close the reader
+
+        The connection pool is closed when created by the reader.
+        """
+        if self._own_pool:
+            self._pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_page(self, partition, page):
+        with self._pool.borrow() as conn:
+            result = conn.call(
+                self._func_name,
+                QUERY_TABLE=self._table,
+                ROWSKIPS=page * self._page_size,
+                ROWCOUNT=self._page_size,
+                OPTIONS=self._options[partition],
+                FIELDS=self._fields,
+            )
+        layout = [
+            (
+                field["FIELDNAME"],
+                int(field["OFFSET"]),
+                int(field["OFFSET"]) + int(field["LENGTH"]),
+                _CONVERTERS.get(field["TYPE"], _string),
+            )
+            for field in result["FIELDS"]
+        ]
+        return [
+            {
+                name: convert(line["WA"][start:end])
+                for name, start, end, convert in layout
+            }
+            for line in result["DATA"]
+        ]
+
+    @staticmethod
+    def _cancel(pending):
+        while pending:
+            pending.popleft().cancel()
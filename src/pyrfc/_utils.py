@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+from importlib import import_module
+
 
 def enum_names(enum_obj):
     """Enum object names."""
@@ -11,3 +13,16 @@ def enum_names(enum_obj):
 def enum_values(enum_obj):
     """Enum object values."""
     return {en.value for en in enum_obj}
+
+
+def import_optional(module_name, feature):
+    """Import optional dependency module, required for given feature."""
+    # local import, pyrfc._exception imports this module
+    from pyrfc._exception import RFCError  # noqa: PLC0415
+
+    try:
+        return import_module(module_name)
+    except ImportError:
+        raise RFCError(
+            f"Python package '{module_name}' is required for {feature}"
+        ) from None
@@ -252,6 +252,15 @@ cdef extern from "sapnwrfc.h":
         RFC_WEBSOCKET_SERVER
         RFC_PROXY_WEBSOCKET_CLIENT
 
+    ctypedef enum RFC_METADATA_OBJ_TYPE:
+        RFC_METADATA_FUNCTION
+        RFC_METADATA_TYPE
+        RFC_METADATA_CLASS
+
+    ctypedef struct RFC_METADATA_QUERY_RESULT_ENTRY:
+        RFC_ABAP_NAME name
+        SAP_UC errorMessage[512]
+
     ctypedef enum RFC_SERVER_STATE:
         RFC_SERVER_INITIAL
         RFC_SERVER_STARTING
@@ -384,7 +393,9 @@ cdef extern from "sapnwrfc.h":
     RFC_RC RfcGetTypeLength(RFC_TYPE_DESC_HANDLE typeHandle, unsigned *nucByteLength, unsigned *ucByteLength, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcDestroyTypeDesc(RFC_TYPE_DESC_HANDLE typeHandle, RFC_ERROR_INFO *errorInfo)
     RFC_TYPE_DESC_HANDLE RfcGetTypeDesc(RFC_CONNECTION_HANDLE rfcHandle, SAP_UC *typeName, RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcAddTypeDesc(const SAP_UC *repositoryID, RFC_TYPE_DESC_HANDLE typeHandle, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcRemoveTypeDesc(SAP_UC *repositoryID, SAP_UC *typeName, RFC_ERROR_INFO *errorInfo)
+    RFC_TYPE_DESC_HANDLE RfcGetCachedTypeDesc(const SAP_UC *repositoryID, const SAP_UC *typeName, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcMetadataBatchQuery(
         RFC_CONNECTION_HANDLE rfcHandle,
         const SAP_UC **functionNames,
@@ -394,6 +405,26 @@ cdef extern from "sapnwrfc.h":
         const SAP_UC **classNames,
         unsigned classCount,
         RFC_METADATA_QUERY_RESULT_HANDLE handle,
+        RFC_ERROR_INFO *errorInfo) nogil
+    RFC_METADATA_QUERY_RESULT_HANDLE RfcCreateMetadataQueryResult(RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcDestroyMetadataQueryResult(RFC_METADATA_QUERY_RESULT_HANDLE handle, RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcDescribeMetadataQueryResult(
+        RFC_METADATA_QUERY_RESULT_HANDLE handle,
+        RFC_METADATA_OBJ_TYPE type,
+        unsigned *successful,
+        unsigned *failed,
+        RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcGetMetadataQueryFailedEntry(
+        RFC_METADATA_QUERY_RESULT_HANDLE handle,
+        RFC_METADATA_OBJ_TYPE type,
+        unsigned index,
+        RFC_METADATA_QUERY_RESULT_ENTRY *entry,
+        RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcGetMetadataQuerySucceededEntry(
+        RFC_METADATA_QUERY_RESULT_HANDLE handle,
+        RFC_METADATA_OBJ_TYPE type,
+        unsigned index,
+        RFC_ABAP_NAME succeedObj,
         RFC_ERROR_INFO *errorInfo)
 
     RFC_FUNCTION_DESC_HANDLE RfcCreateFunctionDesc(SAP_UC *name, RFC_ERROR_INFO *errorInfo)
@@ -403,12 +434,14 @@ cdef extern from "sapnwrfc.h":
     RFC_RC RfcGetParameterDescByIndex(RFC_FUNCTION_DESC_HANDLE funcDesc, unsigned index, RFC_PARAMETER_DESC *paramDesc, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcGetParameterDescByName(RFC_FUNCTION_DESC_HANDLE funcDesc, SAP_UC *name, RFC_PARAMETER_DESC *paramDesc, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcDestroyFunctionDesc(RFC_FUNCTION_DESC_HANDLE funcDesc, RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcAddFunctionDesc(const SAP_UC *repositoryID, RFC_FUNCTION_DESC_HANDLE funcDesc, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcRemoveFunctionDesc(const SAP_UC *repositoryID, const SAP_UC *functionName, RFC_ERROR_INFO *errorInfo)
     RFC_FUNCTION_DESC_HANDLE RfcGetCachedFunctionDesc(const SAP_UC *repositoryID, const SAP_UC *funcName, RFC_ERROR_INFO *errorInfo)
 
     RFC_RC RfcGetRowCount(RFC_TABLE_HANDLE tableHandle, unsigned *rowCount, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcMoveTo(RFC_TABLE_HANDLE tableHandle, unsigned index, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcDeleteCurrentRow(RFC_TABLE_HANDLE tableHandle, RFC_ERROR_INFO *errorInfo)
+    RFC_RC RfcDeleteAllRows(RFC_TABLE_HANDLE tableHandle, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcGetTable(DATA_CONTAINER_HANDLE dataHandle, SAP_UC *name, RFC_TABLE_HANDLE *tableHandle, RFC_ERROR_INFO *errorInfo)
     RFC_STRUCTURE_HANDLE RfcAppendNewRow(RFC_TABLE_HANDLE tableHandle, RFC_ERROR_INFO *errorInfo)
     RFC_RC RfcUTF8ToSAPUC(
@@ -0,0 +1,76 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+
+import pytest
+from pyrfc import AsyncConnection, ConnectionPool, RFCError
+
+from tests.config import CONNECTION_DEST as params
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncConnection:
+    def test_call(self):
+        async def main():
+            async with AsyncConnection(max_size=2, **params) as client:
+                return await client.call("STFC_CONNECTION", REQUTEXT="Hello SAP!")
+
+        assert run(main())["ECHOTEXT"] == "Hello SAP!"
+
+    def test_gather(self):
+        async def main():
+            async with AsyncConnection(max_size=3, **params) as client:
+                results = await client.gather(*[
+                    ("STFC_CONNECTION", {"REQUTEXT": str(idx)}) for idx in range(10)
+                ])
+                assert client.pool.stats["open"] <= 3
+                return results
+
+        results = run(main())
+        assert [res["ECHOTEXT"] for res in results] == [str(idx) for idx in range(10)]
+
+    def test_gather_with_options(self):
+        async def main():
+            async with AsyncConnection(**params) as client:
+                return await client.gather(
+                    ("RFC_PING_AND_WAIT", {"SECONDS": 5}, {"timeout": 1}),
+                    ("STFC_CONNECTION", {"REQUTEXT": "ok"}),
+                    return_exceptions=True,
+                )
+
+        results = run(main())
+        assert isinstance(results[0], RFCError)
+        assert results[0].key == "RFC_CANCELED"
+        assert results[1]["ECHOTEXT"] == "ok"
+
+    def test_cancel(self):
+        pool = ConnectionPool(max_size=1, **params)
+
+        async def main():
+            async with AsyncConnection(pool=pool) as client:
+                task = asyncio.create_task(client.call("RFC_PING_AND_WAIT", SECONDS=10))
+                await asyncio.sleep(1)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                # connection re-opened and returned to the pool
+                return await client.call("STFC_CONNECTION", REQUTEXT="after")
+
+        assert run(main())["ECHOTEXT"] == "after"
+        assert not pool.closed
+        pool.close()
+
+    def test_closed(self):
+        async def main():
+            client = AsyncConnection(**params)
+            await client.close()
+            await client.call("STFC_CONNECTION", REQUTEXT="Hello SAP!")
+
+        with pytest.raises(RFCError) as ex:
+            run(main())
+        assert ex.value.args[0] == "Async connection is closed"
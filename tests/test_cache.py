@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+from time import sleep
+
+import pytest
+from pyrfc import (
+    Connection,
+    MetadataCache,
+    RFCError,
+    get_metadata_cache,
+    set_metadata_cache,
+)
+
+from tests.config import CONNECTION_DEST as params
+from tests.config import UNICODETEST
+
+
+def load_without_resptext(conn, path):
+    # STFC_CONNECTION description cached without RESPTEXT parameter
+    conn.save_metadata(path, functions=["STFC_CONNECTION"])
+    with open(path, encoding="utf-8") as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    func_dict = snapshot["functions"][0]
+    func_dict["parameters"] = [
+        parameter
+        for parameter in func_dict["parameters"]
+        if parameter["name"] != "RESPTEXT"
+    ]
+    with open(path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+    conn.load_metadata(path, overwrite=True)
+
+
+class TestMetadataCache:
+    def setup_method(self):
+        self.default_cache = get_metadata_cache()
+        self.conn = Connection(**params)
+        self.sysid = self.conn.get_connection_attributes()["sysId"]
+
+    def teardown_method(self):
+        set_metadata_cache(self.default_cache)
+        self.conn.close()
+
+    def test_hits_and_misses(self):
+        cache = MetadataCache(max_size=10)
+        set_metadata_cache(cache)
+        for _ in range(3):
+            res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+            assert res["ECHOTEXT"] == UNICODETEST
+        stats = cache.stats
+        assert stats["size"] == 1
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+        assert cache.keys(self.sysid) == [(self.sysid, "STFC_CONNECTION")]
+
+    def test_lru_eviction(self):
+        cache = MetadataCache(max_size=1)
+        set_metadata_cache(cache)
+        self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        self.conn.call("STFC_STRUCTURE")
+        assert cache.keys() == [(self.sysid, "STFC_STRUCTURE")]
+        assert cache.stats["evictions"] == 1
+
+    def test_ttl_expiration(self, tmp_path):
+        cache = MetadataCache(ttl=0.1)
+        set_metadata_cache(cache)
+        load_without_resptext(self.conn, str(tmp_path / "metadata.json"))
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert "RESPTEXT" not in res
+        sleep(0.2)
+        # expired description read again from backend
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert res["ECHOTEXT"] == UNICODETEST
+        assert "RESPTEXT" in res
+        assert cache.stats["expirations"] == 1
+        assert cache.stats["misses"] == 2
+
+    def test_invalidate_sysid(self):
+        cache = MetadataCache()
+        set_metadata_cache(cache)
+        self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        self.conn.call("STFC_STRUCTURE")
+        assert cache.invalidate(self.sysid, "STFC_CONNECTION") == 1
+        assert cache.keys() == [(self.sysid, "STFC_STRUCTURE")]
+        assert cache.invalidate(self.sysid) == 1
+        assert len(cache) == 0
+        # metadata and descriptions read again from backend
+        res = self.conn.call("STFC_STRUCTURE", IMPORTSTRUCT={"RFCINT4": 4})
+        assert res["ECHOSTRUCT"]["RFCINT4"] == 4
+
+    def test_invalidate_reads_description_again(self, tmp_path):
+        cache = MetadataCache()
+        set_metadata_cache(cache)
+        load_without_resptext(self.conn, str(tmp_path / "metadata.json"))
+        assert "RESPTEXT" not in self.conn.call("STFC_CONNECTION")
+        # description in use by a table cursor is not removed
+        cursor_res = self.conn.call(
+            "STFC_STRUCTURE", options={"lazy_tables": True}, RFCTABLE=[{}]
+        )
+        cache.invalidate(self.sysid)
+        # not read again while STFC_STRUCTURE description in use by table cursor
+        assert "RESPTEXT" not in self.conn.call("STFC_CONNECTION")
+        assert cache.keys() == []
+        del cursor_res
+        assert "RESPTEXT" in self.conn.call("STFC_CONNECTION")
+        assert cache.keys() == [(self.sysid, "STFC_CONNECTION")]
+
+    def test_invalid_configuration(self):
+        with pytest.raises(RFCError) as ex:
+            MetadataCache(max_size=0)
+        assert (
+            ex.value.args[0]
+            == "Metadata cache configuration not valid: max_size=0, ttl=None"
+        )
+        with pytest.raises(TypeError):
+            set_metadata_cache({})
@@ -109,6 +109,153 @@ class TestConnection:
         assert conn.options["timeout"] == 123
         conn.close()
 
+    def test_config_table_format_columns(self):
+        conn = Connection(
+            config={"table_format": "columns"},
+            **CONNECTION_PARAMS,
+        )
+        assert conn.options["table_format"] == "columns"
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": f"{idx:04}"} for idx in range(5)]
+        table = conn.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+        assert type(table) is dict
+        assert "RFCFLOAT" in table
+        assert table["RFCINT4"][:5] == [0, 1, 2, 3, 4]
+        assert table["RFCCHAR4"][:5] == ["0000", "0001", "0002", "0003", "0004"]
+        assert all(len(column) == 6 for column in table.values())
+        # rows table format as call option
+        table = conn.call(
+            "STFC_STRUCTURE",
+            options={"table_format": "rows"},
+            RFCTABLE=IMPORTTABLE,
+        )["RFCTABLE"]
+        assert type(table) is list
+        assert table[4]["RFCINT4"] == 4
+        conn.close()
+
+    def test_config_table_format_numpy(self):
+        np = pytest.importorskip("numpy")
+        conn = Connection(
+            config={"table_format": "numpy", "dtime": True},
+            **CONNECTION_PARAMS,
+        )
+        IMPORTTABLE = [
+            {
+                "RFCINT4": idx,
+                "RFCFLOAT": idx / 2,
+                "RFCCHAR4": f"{idx:04}",
+                "RFCDATE": "20240229",
+                "RFCTIME": "123456",
+            }
+            for idx in range(5)
+        ]
+        table = conn.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+        assert isinstance(table, np.ndarray)
+        assert len(table) == 6
+        assert table.dtype["RFCINT4"] == np.dtype("i4")
+        assert table.dtype["RFCINT1"] == np.dtype("u1")
+        assert table.dtype["RFCDATE"] == np.dtype("M8[D]")
+        assert list(table["RFCINT4"][:5]) == [0, 1, 2, 3, 4]
+        assert list(table["RFCFLOAT"][:5]) == [0.0, 0.5, 1.0, 1.5, 2.0]
+        assert list(table["RFCCHAR4"][:2]) == ["0000", "0001"]
+        assert table["RFCDATE"][0] == np.datetime64("2024-02-29")
+        assert table["RFCTIME"][0] == np.timedelta64(12 * 3600 + 34 * 60 + 56, "s")
+        # deep table line type not supported
+        with pytest.raises(RFCError) as ex:
+            conn.call("STFC_DEEP_TABLE", IMPORT_TAB=[{"STR": "A", "XSTR": b"B"}])
+        error = ex.value
+        assert error.args[0].startswith("Table format 'numpy' not supported for field")
+        conn.close()
+
+    def test_config_table_format_arrow(self):
+        pa = pytest.importorskip("pyarrow")
+        conn = Connection(
+            config={"table_format": "arrow"},
+            **CONNECTION_PARAMS,
+        )
+        IMPORTTABLE = [
+            {
+                "RFCINT4": idx,
+                "RFCFLOAT": idx / 2,
+                "RFCCHAR4": f"{idx:04}",
+                "RFCHEX3": b"\x01\x02\x03",
+                "RFCDATE": "20240229",
+                "RFCTIME": "123456",
+            }
+            for idx in range(5)
+        ]
+        IMPORTTABLE[1]["RFCDATE"] = "00000000"
+        table = conn.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+        assert isinstance(table, pa.Table)
+        assert table.num_rows == 6
+        assert table.schema.field("RFCINT4").type == pa.int32()
+        assert table.schema.field("RFCDATE").type == pa.date32()
+        assert table.schema.field("RFCTIME").type == pa.time32("s")
+        assert table.column("RFCINT4").to_pylist()[:5] == [0, 1, 2, 3, 4]
+        assert table.column("RFCFLOAT").to_pylist()[:5] == [0.0, 0.5, 1.0, 1.5, 2.0]
+        assert table.column("RFCCHAR4").to_pylist()[:2] == ["0000", "0001"]
+        assert table.column("RFCHEX3").to_pylist()[0] == b"\x01\x02\x03"
+        dates = table.column("RFCDATE").to_pylist()
+        assert dates[:2] == [datetime.date(2024, 2, 29), None]
+        assert table.column("RFCTIME").to_pylist()[0] == datetime.time(12, 34, 56)
+        conn.close()
+
+    def test_call_option_intern_fields(self):
+        conn = Connection(**CONNECTION_PARAMS)
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": "ABCD"} for idx in range(5)]
+        table = conn.call(
+            "STFC_STRUCTURE",
+            options={"intern_fields": True},
+            RFCTABLE=IMPORTTABLE,
+        )["RFCTABLE"]
+        assert table[0]["RFCCHAR4"] == "ABCD"
+        assert all(row["RFCCHAR4"] is table[0]["RFCCHAR4"] for row in table[:5])
+        table = conn.call(
+            "STFC_STRUCTURE",
+            options={"intern_fields": True, "table_format": "columns"},
+            RFCTABLE=IMPORTTABLE,
+        )["RFCTABLE"]
+        assert all(value is table["RFCCHAR4"][0] for value in table["RFCCHAR4"][:5])
+        conn.close()
+
+    def test_call_option_intern_fields_arrow(self):
+        pa = pytest.importorskip("pyarrow")
+        conn = Connection(**CONNECTION_PARAMS)
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": "ABCD"} for idx in range(5)]
+        table = conn.call(
+            "STFC_STRUCTURE",
+            options={"intern_fields": True, "table_format": "arrow"},
+            RFCTABLE=IMPORTTABLE,
+        )["RFCTABLE"]
+        column = table.column("RFCCHAR4")
+        assert pa.types.is_dictionary(column.type)
+        assert column.to_pylist()[:5] == ["ABCD"] * 5
+        assert table.schema.field("RFCINT4").type == pa.int32()
+        conn.close()
+
+    def test_config_table_format_not_supported(self):
+        with pytest.raises(RFCError) as ex:
+            Connection(
+                config={"table_format": "cells"},
+                **CONNECTION_PARAMS,
+            )
+        error = ex.value
+        assert (
+            error.args[0]
+            == "Table format 'cells' is not supported, expected one of: rows, columns, numpy, arrow"  # noqa: E501
+        )
+        conn = Connection(**CONNECTION_PARAMS)
+        with pytest.raises(RFCError) as ex:
+            conn.call(
+                "STFC_STRUCTURE",
+                options={"lazy_tables": True, "table_format": "columns"},
+            )
+        error = ex.value
+        assert (
+            error.args[0]
+            == "Call option 'lazy_tables' can't be combined with table format other than 'rows'"  # noqa: E501
+        )
+        conn.close()
+
     def test_config_not_supported(self):
         with pytest.raises(RFCError) as ex:
             Connection(
@@ -15,7 +15,12 @@ with suppress(ModuleNotFoundError):
     import tomllib
 
 import pytest
-from pyrfc import Connection, ExternalRuntimeError, RFCError, __version__
+from pyrfc import (
+    Connection,
+    ExternalRuntimeError,
+    RFCError,
+    __version__,
+)
 
 
 class TestConnection:
@@ -160,6 +165,66 @@ class TestConnection:
             int,
         )
 
+    def test_prefetch_metadata(self):
+        sysid = self.conn.get_connection_attributes()["sysId"]
+        self.conn.func_desc_remove(sysid, "STFC_CONNECTION")
+        result = self.conn.prefetch_metadata(
+            functions=["STFC_CONNECTION", "STFC_STRUCTURE", "NOT_EXISTING_FM"],
+            types=["RFCTEST"],
+        )
+        assert set(result["functions"]["succeeded"]) == {
+            "STFC_CONNECTION",
+            "STFC_STRUCTURE",
+        }
+        assert list(result["functions"]["failed"]) == ["NOT_EXISTING_FM"]
+        assert result["types"] == {"succeeded": ["RFCTEST"], "failed": {}}
+        assert result["classes"] == {"succeeded": [], "failed": {}}
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert res["ECHOTEXT"] == UNICODETEST
+
+    def test_function_description_cached(self):
+        sysid = self.conn.get_connection_attributes()["sysId"]
+        self.conn.func_desc_remove(sysid, "STFC_STRUCTURE")
+        # read from backend, then from cache
+        func_desc = self.conn.get_function_description("STFC_STRUCTURE")
+        cached_desc = self.conn.get_function_description("stfc_structure")
+        assert cached_desc.name == func_desc.name == "STFC_STRUCTURE"
+        assert len(cached_desc.parameters) == len(func_desc.parameters)
+
+    def test_metadata_snapshot(self, tmp_path):
+        path = str(tmp_path / "metadata.json")
+        self.conn.save_metadata(
+            path, functions=["STFC_CONNECTION", "STFC_STRUCTURE"], types=["RFCTEST"]
+        )
+        sysid = self.conn.get_connection_attributes()["sysId"]
+        self.conn.func_desc_remove(sysid, "STFC_CONNECTION")
+        self.conn.func_desc_remove(sysid, "STFC_STRUCTURE")
+        self.conn.type_desc_remove(sysid, "RFCTEST")
+        assert self.conn.load_metadata(path) == {
+            "functions": ["STFC_CONNECTION", "STFC_STRUCTURE"],
+            "types": ["RFCTEST"],
+        }
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert res["ECHOTEXT"] == UNICODETEST
+        # cached descriptions replaced only on request
+        with pytest.raises(RFCError) as ex:
+            self.conn.load_metadata(path)
+        assert (
+            ex.value.args[0]
+            == f"Metadata snapshot descriptions already cached for system '{sysid}': STFC_CONNECTION, STFC_STRUCTURE, RFCTEST"  # noqa: E501
+        )
+        assert self.conn.load_metadata(path, overwrite=True)["types"] == ["RFCTEST"]
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert res["ECHOTEXT"] == UNICODETEST
+        with pytest.raises(RFCError) as ex:
+            self.conn.load_metadata(path, max_age=-1)
+        assert "exceeds max_age -1" in ex.value.args[0]
+        self.conn.close()
+        with pytest.raises(RFCError) as ex:
+            self.conn.save_metadata(path, functions=["STFC_CONNECTION"])
+        assert ex.value.args[0] == "Metadata snapshot not saved, connection not open."
+        self.conn.open()
+
     def test_STFC_returns_structure_and_table(self):
         IMPORTSTRUCT = {
             "RFCFLOAT": 1.23456789,
@@ -278,3 +343,30 @@ class TestConnection:
         )
         assert res["COUNTER"] == counter + 1
         assert res["RESULT"] == start_value + counter
+
+
+class TestCallPlan:
+    def setup_method(self):
+        self.conn = Connection(**paramsdest)
+        assert self.conn.alive
+
+    def teardown_method(self):
+        self.conn.close()
+        assert not self.conn.alive
+
+    def test_call_plan_reused_and_removed(self):
+        sysid = self.conn.get_connection_attributes()["sysId"]
+        for _ in range(3):
+            res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+            assert res["ECHOTEXT"] == UNICODETEST
+        # call plan invalidated with the function description
+        self.conn.func_desc_remove(sysid, "STFC_CONNECTION")
+        res = self.conn.call("STFC_CONNECTION", REQUTEXT=UNICODETEST)
+        assert res["ECHOTEXT"] == UNICODETEST
+
+    def test_call_plan_unknown_parameter(self):
+        with pytest.raises(ExternalRuntimeError) as ex:
+            self.conn.call("STFC_CONNECTION", undefined=0)
+        error = ex.value
+        assert error.key == "RFC_INVALID_PARAMETER"
+        assert error.message == "field 'undefined' not found"
@@ -55,6 +55,149 @@ def test_table_rejects_non_list():
     assert error.args[2] == "RFCTABLE"
 
 
+def test_table_rejects_unknown_field():
+    with pytest.raises(ExternalRuntimeError) as ex:
+        client.call(
+            "STFC_STRUCTURE",
+            RFCTABLE=[{"RFCINT1": 1}, {"RFCINT1": 2, "UNKNOWN": 3}],
+        )
+    error = ex.value
+    assert error.key == "RFC_INVALID_PARAMETER"
+    assert "UNKNOWN" in error.message
+
+
+def test_table_many_rows():
+    ROWS = 5000
+    IMPORTTABLE = [
+        {"RFCINT4": idx, "RFCCHAR4": f"{idx % 10000:04}", "RFCDATE": "20240101"}
+        for idx in range(ROWS)
+    ]
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == ROWS + 1
+    for idx in range(ROWS):
+        assert output[idx]["RFCINT4"] == idx
+        assert output[idx]["RFCCHAR4"] == IMPORTTABLE[idx]["RFCCHAR4"]
+        assert output[idx]["RFCDATE"] == "20240101"
+
+
+def test_table_columns_input():
+    ROWS = 100
+    IMPORTTABLE = {
+        "RFCINT4": list(range(ROWS)),
+        "RFCCHAR4": [f"{idx:04}" for idx in range(ROWS)],
+        "RFCFLOAT": [idx / 2 for idx in range(ROWS)],
+        "RFCDATE": ["20240101"] * ROWS,
+    }
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == ROWS + 1
+    for idx in range(ROWS):
+        assert output[idx]["RFCINT4"] == idx
+        assert output[idx]["RFCCHAR4"] == IMPORTTABLE["RFCCHAR4"][idx]
+        assert output[idx]["RFCFLOAT"] == IMPORTTABLE["RFCFLOAT"][idx]
+        assert output[idx]["RFCDATE"] == "20240101"
+
+
+def test_table_columns_input_numpy():
+    np = pytest.importorskip("numpy")
+    IMPORTTABLE = np.array(
+        [(idx, f"{idx:04}", idx / 2) for idx in range(10)],
+        dtype=[("RFCINT4", "i4"), ("RFCCHAR4", "U4"), ("RFCFLOAT", "f8")],
+    )
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == 11
+    for idx in range(10):
+        assert output[idx]["RFCINT4"] == idx
+        assert output[idx]["RFCCHAR4"] == f"{idx:04}"
+        assert output[idx]["RFCFLOAT"] == idx / 2
+
+
+def test_table_columns_input_numpy_columns():
+    np = pytest.importorskip("numpy")
+    IMPORTTABLE = {
+        "RFCINT1": np.arange(10, dtype="u1"),
+        "RFCINT4": np.arange(20, dtype=">i8")[::2],
+        "RFCFLOAT": np.arange(10, dtype="f4") / 2,
+    }
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == 11
+    for idx in range(10):
+        assert output[idx]["RFCINT1"] == idx
+        assert output[idx]["RFCINT4"] == 2 * idx
+        assert output[idx]["RFCFLOAT"] == idx / 2
+    for name, value in (("RFCINT4", 2**31), ("RFCINT2", 2**15), ("RFCINT1", 256)):
+        with pytest.raises(OverflowError) as ex:
+            client.call(
+                "STFC_STRUCTURE",
+                RFCTABLE={name: np.array([value], dtype="i8")},
+            )
+        assert ex.value.args[0] == "integer out of range of field type, received"
+        assert ex.value.args[1] == value
+        assert ex.value.args[2] == name
+    with pytest.raises(OverflowError) as ex:
+        client.call("STFC_STRUCTURE", RFCTABLE={"RFCINT1": np.array([-1])})
+    assert ex.value.args[1] == -1
+
+
+def test_table_columns_input_sequences():
+    IMPORTTABLE = {
+        "RFCINT4": range(10),
+        "RFCCHAR4": tuple(f"{idx:04}" for idx in range(10)),
+    }
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == 11
+    for idx in range(10):
+        assert output[idx]["RFCINT4"] == idx
+        assert output[idx]["RFCCHAR4"] == f"{idx:04}"
+
+
+def test_table_columns_input_arrow():
+    pa = pytest.importorskip("pyarrow")
+    IMPORTTABLE = pa.table({
+        "RFCINT4": pa.array(range(10), pa.int32()),
+        "RFCCHAR4": [f"{idx:04}" for idx in range(10)],
+        "RFCINT2": [None] * 10,
+    })
+    output = client.call("STFC_STRUCTURE", RFCTABLE=IMPORTTABLE)["RFCTABLE"]
+    assert len(output) == 11
+    for idx in range(10):
+        assert output[idx]["RFCINT4"] == idx
+        assert output[idx]["RFCCHAR4"] == f"{idx:04}"
+        # null values remain initial
+        assert output[idx]["RFCINT2"] == 0
+
+
+def test_table_columns_input_errors():
+    with pytest.raises(TypeError) as ex:
+        client.call(
+            "STFC_STRUCTURE",
+            RFCTABLE={"RFCINT4": [1, 2], "RFCCHAR4": ["A"]},
+        )
+    error = ex.value
+    assert error.args[0] == "table columns of equal length required, received"
+    assert error.args[1] == {"RFCINT4": 2, "RFCCHAR4": 1}
+    assert error.args[2] == "RFCTABLE"
+    with pytest.raises(TypeError) as ex:
+        client.call(
+            "STFC_STRUCTURE",
+            RFCTABLE={"RFCINT4": [1, "2"]},
+        )
+    error = ex.value
+    assert error.args[0] == "an integer required, received"
+    assert error.args[1] == "2"
+    assert error.args[4] == "RFCINT4"
+    assert error.args[5] == "RFCTABLE"
+    with pytest.raises(TypeError) as ex:
+        client.call(
+            "STFC_STRUCTURE",
+            RFCTABLE={"RFCINT4": [1, 2], "RFCCHAR4": "AB"},
+        )
+    error = ex.value
+    assert error.args[0] == "list required for table parameter column, received"
+    assert error.args[1] == "<class 'str'>"
+    assert error.args[2] == "RFCCHAR4"
+    assert error.args[3] == "RFCTABLE"
+
+
 def test_basic_datatypes():
     INPUTS = [
         {
@@ -139,6 +282,15 @@ def test_string_unicode():
         assert is_input["ZSHLP_MAT1"] == res["ZSHLP_MAT1"]
 
 
+def test_string_rstrip_whitespace():
+    hello = "Hällo \U0001f4aa\t \r"
+    res = client.call(
+        "STFC_CONNECTION",
+        REQUTEXT=hello,
+    )["ECHOTEXT"]
+    assert res == "Hällo \U0001f4aa"
+
+
 def test_date_output():
     lm = client.call(
         "BAPI_USER_GET_DETAIL",
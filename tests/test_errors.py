@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import pickle
+
 import pytest
 from pyrfc import (
     ABAPApplicationError,
@@ -114,3 +116,22 @@ class TestErrors:
         assert error.code == 20
         assert error.key == "RFC_INVALID_PARAMETER"
         assert error.message == "field 'XRFCCHAR1' not found"
+
+    def test_error_pickle(self):
+        error = ABAPApplicationError(
+            message="ID:SV Type:E Number:029 T008X",
+            code=5,
+            key="TABLE_NOT_AVAILABLE",
+            msg_class="SV",
+            msg_type="E",
+            msg_number="029",
+            msg_v1="T008X",
+        )
+        unpickled = pickle.loads(pickle.dumps(error))
+        assert type(unpickled) is ABAPApplicationError
+        assert str(unpickled) == str(error)
+        assert unpickled.key == "TABLE_NOT_AVAILABLE"
+        assert unpickled.msg_v1 == "T008X"
+        unpickled = pickle.loads(pickle.dumps(LogonError()))
+        assert unpickled.code == 2
+        assert unpickled.key == "RFC_LOGON_FAILURE"
@@ -2,7 +2,8 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-from pyrfc import Connection
+import pytest
+from pyrfc import Connection, RFCError, TableCursor, TableStream
 
 from tests.config import CONNECTION_DEST as params
 
@@ -61,3 +62,92 @@ class TestOptions:
             "FIELD": "",
             "SYSTEM": "MMECLNT620",
         }
+
+    def test_fields_projection(self):
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": f"{idx:04}"} for idx in range(3)]
+        res = self.conn.call(
+            "STFC_STRUCTURE",
+            {
+                "fields": {
+                    "RFCTABLE": ["RFCCHAR4", "RFCINT4"],
+                    "ECHOSTRUCT": ["RFCINT4"],
+                }
+            },
+            IMPORTSTRUCT={"RFCINT4": 7},
+            RFCTABLE=IMPORTTABLE,
+        )
+        assert res["ECHOSTRUCT"] == {"RFCINT4": 7}
+        assert list(res["RFCTABLE"][0]) == ["RFCCHAR4", "RFCINT4"]
+        assert res["RFCTABLE"][:3] == [
+            {"RFCCHAR4": row["RFCCHAR4"], "RFCINT4": row["RFCINT4"]}
+            for row in IMPORTTABLE
+        ]
+
+    def test_fields_projection_errors(self):
+        with pytest.raises(RFCError) as ex:
+            self.conn.call("STFC_STRUCTURE", {"fields": {"RFCTABLE": ["NOFIELD"]}})
+        assert ex.value.args[0].startswith("Field 'NOFIELD' not found")
+        with pytest.raises(RFCError) as ex:
+            self.conn.call("STFC_STRUCTURE", {"fields": {"RESPTEXT": ["X"]}})
+        assert (
+            ex.value.args[0]
+            == "Call option 'fields' parameter 'RESPTEXT' is not a structure or table"
+        )
+
+    def test_STFC_returns_lazy_table(self):
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": f"{idx:04}"} for idx in range(10)]
+        res = self.conn.call(
+            "STFC_STRUCTURE",
+            options={"lazy_tables": True},
+            RFCTABLE=IMPORTTABLE,
+        )
+        table = res["RFCTABLE"]
+        assert isinstance(table, TableCursor)
+        assert len(table) == len(IMPORTTABLE) + 1
+        assert table[0]["RFCINT4"] == 0
+        assert table[-2]["RFCCHAR4"] == "0009"
+        assert [row["RFCINT4"] for row in table[2:5]] == [2, 3, 4]
+        rows = list(table)
+        assert len(rows) == len(IMPORTTABLE) + 1
+        for idx in range(len(IMPORTTABLE)):
+            assert rows[idx]["RFCINT4"] == idx
+        with pytest.raises(IndexError):
+            table[len(IMPORTTABLE) + 1]
+        # rows remain accessible after the connection is closed
+        self.conn.close()
+        assert table[1]["RFCINT4"] == 1
+        self.conn.open()
+
+    def test_STFC_returns_table_stream(self):
+        IMPORTTABLE = [{"RFCINT4": idx, "RFCCHAR4": f"{idx:04}"} for idx in range(10)]
+        res = self.conn.call(
+            "STFC_STRUCTURE",
+            options={"stream_tables": True},
+            RFCTABLE=IMPORTTABLE,
+        )
+        stream = res["RFCTABLE"]
+        assert isinstance(stream, TableStream)
+        assert next(stream)["RFCINT4"] == 0
+        rows = list(stream)
+        assert len(rows) == len(IMPORTTABLE)
+        assert [row["RFCINT4"] for row in rows[:9]] == list(range(1, 10))
+        # stream exhausted
+        assert list(stream) == []
+
+        res = self.conn.call(
+            "STFC_STRUCTURE",
+            options={"stream_tables": True, "chunk_size": 4},
+            RFCTABLE=IMPORTTABLE,
+        )
+        chunks = list(res["RFCTABLE"])
+        assert [len(chunk) for chunk in chunks] == [4, 4, 3]
+        assert chunks[1][0]["RFCCHAR4"] == "0004"
+
+        with pytest.raises(RFCError) as ex:
+            self.conn.call(
+                "STFC_STRUCTURE", options={"stream_tables": True, "chunk_size": -1}
+            )
+        assert (
+            ex.value.args[0]
+            == "Call option 'chunk_size' must be a non-negative integer, received '-1'"
+        )
@@ -0,0 +1,99 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyrfc import Connection, ConnectionPool, RFCError
+
+from tests.config import CONNECTION_DEST as params
+
+
+class TestConnectionPool:
+    def setup_method(self):
+        self.pool = ConnectionPool(min_size=1, max_size=2, **params)
+
+    def teardown_method(self):
+        self.pool.close()
+        assert self.pool.closed
+
+    def test_min_size_opened(self):
+        assert self.pool.stats == {"open": 1, "idle": 1, "in_use": 0}
+
+    def test_borrow_and_reuse(self):
+        with self.pool.borrow() as conn:
+            assert isinstance(conn, Connection)
+            assert conn.alive
+            assert self.pool.stats["in_use"] == 1
+            handle = conn.handle
+        assert self.pool.stats == {"open": 1, "idle": 1, "in_use": 0}
+        with self.pool.borrow() as conn:
+            assert conn.handle == handle
+
+    def test_max_size_timeout(self):
+        c1 = self.pool.acquire()
+        c2 = self.pool.acquire()
+        assert self.pool.stats == {"open": 2, "idle": 0, "in_use": 2}
+        with pytest.raises(RFCError) as ex:
+            self.pool.acquire(timeout=0.1)
+        error = ex.value
+        assert (
+            error.args[0]
+            == "No connection available within 0.1 seconds, all 2 connections in use"
+        )
+        self.pool.release(c1)
+        self.pool.release(c2)
+
+    def test_closed_connection_discarded(self):
+        with self.pool.borrow() as conn:
+            conn.close()
+        assert self.pool.stats == {"open": 0, "idle": 0, "in_use": 0}
+        with self.pool.borrow() as conn:
+            assert conn.alive
+
+    def test_invalid_connection_reopened(self):
+        with self.pool.borrow() as conn:
+            conn.cancel()
+        with self.pool.borrow() as conn:
+            assert conn.is_valid()
+            conn.ping()
+
+    def test_idle_eviction(self):
+        pool = ConnectionPool(max_size=2, idle_timeout=0, **params)
+        with pool.borrow():
+            pass
+        with pool.borrow():
+            assert pool.stats["open"] == 1
+        assert pool.stats["open"] == 0
+        pool.close()
+
+    def test_parallel_calls(self):
+        def call(idx):
+            with self.pool.borrow() as conn:
+                return conn.call("STFC_CONNECTION", REQUTEXT=str(idx))["ECHOTEXT"]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            result = list(executor.map(call, range(10)))
+        assert result == [str(idx) for idx in range(10)]
+        assert self.pool.stats["open"] <= 2
+
+    def test_release_foreign_connection(self):
+        conn = Connection(**params)
+        with pytest.raises(RFCError) as ex:
+            self.pool.release(conn)
+        assert ex.value.args[0] == "Connection not acquired from this pool"
+        conn.close()
+
+    def test_size_not_valid(self):
+        with pytest.raises(RFCError) as ex:
+            ConnectionPool(min_size=3, max_size=2, **params)
+        assert (
+            ex.value.args[0] == "Connection pool size not valid: min_size=3, max_size=2"
+        )
+
+    def test_closed_pool(self):
+        self.pool.close()
+        with pytest.raises(RFCError) as ex:
+            self.pool.acquire()
+        assert ex.value.args[0] == "Connection pool is closed"
@@ -2,14 +2,19 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 
 import pytest
 from pyrfc import (
     ABAPApplicationError,
     Connection,
+    ExternalRuntimeError,
+    FunctionDescription,
     RCStatus,
     RFCError,
     Server,
@@ -41,6 +46,14 @@ def my_stfc_connection(request_context=None, REQUTEXT=""):
     }
 
 
+def my_stfc_structure(request_context=None, IMPORTSTRUCT=None, RFCTABLE=None):
+    return {
+        "ECHOSTRUCT": IMPORTSTRUCT,
+        "RFCTABLE": RFCTABLE or [IMPORTSTRUCT],
+        "RESPTEXT": f"Python server sends {len(RFCTABLE or [IMPORTSTRUCT])} table rows",
+    }
+
+
 dir_path = os.path.dirname(os.path.realpath(__file__))
 set_ini_file_directory(dir_path)
 
@@ -172,6 +185,228 @@ class TestServer:
         assert result["ECHOSTRUCT"]["RFCDATE"] == "20230928"
         assert result["ECHOSTRUCT"]["RFCTIME"] == "240000"
 
+    def test_dispatch_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            server = Server(
+                server_params={"dest": "MME_GATEWAY"},
+                client_params={"dest": "MME"},
+                config={"executor": executor, "max_in_flight": 2, "max_queue": 4},
+            )
+            server.add_function("STFC_STRUCTURE", my_stfc_structure)
+            server.start()
+            client = Connection(dest="MME")
+            result = client.call("ZSERVER_TEST_STFC_STRUCTURE")
+            client.close()
+            server.close()
+        assert result["RESPTEXT"] == "Python server sends 1 table rows"
+        assert server.dispatch_stats == {"in_flight": 0, "waiting": 0}
+
+    def test_async_callback(self):
+        async def my_async_stfc_structure(
+            request_context=None, IMPORTSTRUCT=None, RFCTABLE=None
+        ):
+            await asyncio.sleep(0.1)
+            return my_stfc_structure(request_context, IMPORTSTRUCT, RFCTABLE)
+
+        async def run():
+            server = Server(
+                server_params={"dest": "MME_GATEWAY"},
+                client_params={"dest": "MME"},
+                config={"event_loop": asyncio.get_running_loop()},
+            )
+            server.add_function("STFC_STRUCTURE", my_async_stfc_structure)
+            server.start()
+            client = Connection(dest="MME")
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, client.call, "ZSERVER_TEST_STFC_STRUCTURE"
+            )
+            client.close()
+            server.close()
+            return result
+
+        result = asyncio.run(run())
+        assert result["RESPTEXT"] == "Python server sends 1 table rows"
+
+    def test_servers_function_registry(self):
+        server1 = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+        )
+        server2 = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+        )
+        # function installed by one server per backend system
+        server1.add_function("STFC_STRUCTURE", my_stfc_structure)
+        with pytest.raises(RFCError) as ex:
+            server2.add_function("STFC_STRUCTURE", my_stfc_structure)
+        assert ex.value.args[0] == (
+            "Server function 'STFC_STRUCTURE' already installed "
+            "by another server of system 'MME'."
+        )
+        # other functions installed by other servers of the system
+        server2.add_function("RFC_PING", lambda request_context: {})
+        server1.close()
+        server2.add_function("STFC_STRUCTURE", my_stfc_structure)
+        server2.start()
+        client = Connection(dest="MME")
+        result = client.call("ZSERVER_TEST_STFC_STRUCTURE")
+        client.close()
+        server2.close()
+        assert result["RESPTEXT"] == "Python server sends 1 table rows"
+
+    def test_request_without_connection_attributes(self):
+        server1 = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+            config={"debug": True},
+        )
+        server1.add_function("RFC_PING", lambda request_context: {})
+        # function of the only server installing it, accepted in debug mode
+        assert Server._request_function("RFC_PING", None)["server"] is server1
+        server1.debug = False
+        with pytest.raises(ExternalRuntimeError) as ex:
+            Server._request_function("RFC_PING", None)
+        assert ex.value.message == "Invalid connection handle."
+        server1.close()
+        assert Server._request_function("RFC_PING", None) is None
+
+    def test_add_function_description(self):
+        server = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+        )
+        func_desc = FunctionDescription("ZPYRFC_STFC_STRUCTURE")
+        for parameter in client.get_function_description("STFC_STRUCTURE").parameters:
+            func_desc.add_parameter(**parameter)
+        with pytest.raises(RFCError) as ex:
+            server.add_function("STFC_STRUCTURE", my_stfc_structure, func_desc)
+        assert (
+            ex.value.args[0]
+            == "Function description 'ZPYRFC_STFC_STRUCTURE' does not match server function 'STFC_STRUCTURE'"  # noqa: E501
+        )
+        server.add_function("ZPYRFC_STFC_STRUCTURE", my_stfc_structure, func_desc)
+        server.close()
+
+    def test_add_function_description_twice(self):
+        func_desc = FunctionDescription("ZPYRFC_STFC_STRUCTURE_TWICE")
+        for parameter in client.get_function_description("STFC_STRUCTURE").parameters:
+            func_desc.add_parameter(**parameter)
+        server1 = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+        )
+        server1.add_function(
+            "ZPYRFC_STFC_STRUCTURE_TWICE", my_stfc_structure, func_desc
+        )
+        with pytest.raises(RFCError) as ex:
+            server1.add_function(
+                "ZPYRFC_STFC_STRUCTURE_TWICE", my_stfc_structure, func_desc
+            )
+        assert (
+            ex.value.args[0]
+            == "Server function 'ZPYRFC_STFC_STRUCTURE_TWICE' already installed."
+        )
+        server1.close()
+        # description cached by the first server used, not replaced
+        server2 = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+            config={"sysid": client.get_connection_attributes()["sysId"]},
+        )
+        server2.add_function(
+            "ZPYRFC_STFC_STRUCTURE_TWICE", my_stfc_structure, func_desc
+        )
+        server2.close()
+
+    def test_add_functions_snapshot(self, tmp_path):
+        path = str(tmp_path / "metadata.json")
+        client.save_metadata(path, functions=["STFC_STRUCTURE"])
+        server = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+        )
+        installed = server.add_functions(
+            {"STFC_STRUCTURE": my_stfc_structure}, snapshot=path, max_age=60
+        )
+        assert installed == ["STFC_STRUCTURE"]
+        server.start()
+        conn = Connection(dest="MME")
+        result = conn.call("ZSERVER_TEST_STFC_STRUCTURE")
+        conn.close()
+        server.close()
+        assert result["RESPTEXT"] == "Python server sends 1 table rows"
+
+    def test_add_functions_snapshot_other_system(self, tmp_path):
+        path = tmp_path / "metadata.json"
+        client.save_metadata(str(path), functions=["STFC_STRUCTURE"])
+        snapshot = json.loads(path.read_text())
+        snapshot["sysid"] = "XXX"
+        path.write_text(json.dumps(snapshot))
+        server = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+            config={"sysid": client.get_connection_attributes()["sysId"]},
+        )
+        with pytest.raises(RFCError) as ex:
+            server.add_functions(
+                {"STFC_STRUCTURE": my_stfc_structure}, snapshot=str(path)
+            )
+        assert ex.value.args[0].startswith("Metadata snapshot of system 'XXX' release")
+        server.close()
+
+    def test_process_pool(self):
+        server = Server(
+            server_params={"dest": "MME_GATEWAY"},
+            client_params={"dest": "MME"},
+            config={"process_pool": 2},
+        )
+        with pytest.raises(RFCError) as ex:
+            server.add_function("STFC_STRUCTURE", lambda request_context: {})
+        assert ex.value.args[0].startswith(
+            "Server function 'STFC_STRUCTURE' callback can't be sent to process pool"
+        )
+        server.add_function("STFC_STRUCTURE", my_stfc_structure)
+        server.start()
+        client = Connection(dest="MME")
+        result = client.call("ZSERVER_TEST_STFC_STRUCTURE")
+        client.close()
+        server.close()
+        assert result["RESPTEXT"] == "Python server sends 1 table rows"
+
+    def test_async_callback_without_event_loop(self):
+        async def my_async_stfc_connection(request_context=None, REQUTEXT=""):
+            await asyncio.sleep(0)
+            return {"ECHOTEXT": REQUTEXT}
+
+        with pytest.raises(RFCError) as ex:
+            server.add_function("STFC_STRUCTURE", my_async_stfc_connection)
+        assert (
+            ex.value.args[0]
+            == "Server function 'STFC_STRUCTURE' is a coroutine function, server 'event_loop' required."  # noqa: E501
+        )
+
+    def test_dispatch_config_not_valid(self):
+        with pytest.raises(RFCError) as ex:
+            Server(
+                server_params={"dest": "MME_GATEWAY"},
+                client_params={"dest": "MME"},
+                config={"max_in_flight": 0},
+            )
+        assert (
+            ex.value.args[0]
+            == "Server max_in_flight must be a positive integer, received 0"
+        )
+        with pytest.raises(RFCError) as ex:
+            Server(
+                server_params={"dest": "MME_GATEWAY"},
+                client_params={"dest": "MME"},
+                config={"executor": 8},
+            )
+        assert ex.value.args[0].startswith(
+            "Server executor must be a concurrent.futures.Executor"
+        )
+
     def test_trfc(self):
         def stfc_write_to_tcpic(request_context=None, RESTART_QNAME="", TCPICDAT=[]):
             context = (
@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2013 SAP SE Srdjan Boskovic <srdjan.boskovic@sap.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime as dt
+
+import pytest
+from pyrfc import ConnectionPool, RFCError, TableReader
+
+from tests.config import CONNECTION_DEST as params
+
+
+class TestTableReader:
+    def setup_method(self):
+        self.pool = ConnectionPool(max_size=3, **params)
+
+    def teardown_method(self):
+        self.pool.close()
+
+    def test_pages_in_order(self):
+        reader = TableReader("T000", page_size=2, pool=self.pool)
+        pages = list(reader.read())
+        assert all(len(rows) <= 2 for rows in pages)
+        rows = [row for rows in pages for row in rows]
+        with self.pool.borrow() as conn:
+            data = conn.call("RFC_READ_TABLE", QUERY_TABLE="T000")["DATA"]
+        assert len(rows) == len(data)
+        assert [row["MANDT"] for row in rows] == sorted(row["MANDT"] for row in rows)
+        assert reader.checkpoint == {"partition": 1, "page": 0}
+
+    def test_typed_fields(self):
+        reader = TableReader(
+            "T000", fields=["MANDT", "MTEXT", "CHANGEDATE"], pool=self.pool
+        )
+        row = next(reader.rows())
+        assert list(row.keys()) == ["MANDT", "MTEXT", "CHANGEDATE"]
+        assert row["MTEXT"] == row["MTEXT"].rstrip()
+        assert row["CHANGEDATE"] is None or isinstance(row["CHANGEDATE"], dt.date)
+
+    def test_partitions_and_resume(self):
+        reader = TableReader(
+            "T000",
+            fields=["MANDT"],
+            partitions=["MANDT < '100'", "MANDT >= '100'"],
+            page_size=1,
+            pool=self.pool,
+        )
+        all_rows = list(reader.rows())
+        pages = reader.read()
+        next(pages)
+        checkpoint = reader.checkpoint
+        pages.close()
+        assert checkpoint == {"partition": 0, "page": 1}
+        resumed = list(reader.rows(checkpoint))
+        assert resumed == all_rows[1:]
+
+    def test_invalid_configuration(self):
+        with pytest.raises(RFCError) as ex:
+            TableReader("T000", page_size=0, pool=self.pool)
+        assert (
+            ex.value.args[0]
+            == "Table reader configuration not valid: page_size=0, max_workers=None"
+        )
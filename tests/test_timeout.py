@@ -2,6 +2,9 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from pyrfc import Connection, RFCError, ExternalRuntimeError
 
@@ -69,3 +72,40 @@ class TestTimeout:
         assert error.code == 20
         assert error.key == "RFC_INVALID_PARAMETER"
         assert error.message == "field 'undefined' not found"
+
+    def test_timeout_no_thread_per_call(self):
+        threads_before = threading.active_count()
+        for _ in range(50):
+            res = client.call(
+                "STFC_CONNECTION", options={"timeout": 30}, REQUTEXT="Hello SAP!"
+            )
+            assert res["ECHOTEXT"] == "Hello SAP!"
+        # single scheduler thread at most
+        assert threading.active_count() <= threads_before + 1
+
+    def test_timeout_concurrent_calls(self):
+        def call(timeout):
+            conn = Connection(**CONNECTION_DEST)
+            try:
+                conn.call("RFC_PING_AND_WAIT", options={"timeout": timeout}, SECONDS=5)
+                return "done"
+            except RFCError as ex:
+                return ex.key
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            result = list(executor.map(call, [2, 20, 1]))
+        assert result == ["RFC_CANCELED", "done", "RFC_CANCELED"]
+
+    def test_timeout_unit(self):
+        conn = Connection(**CONNECTION_DEST)
+        unit = conn.initialize_unit(background=False)
+        conn.fill_and_submit_unit(
+            unit,
+            [("STFC_CONNECTION", {"REQUTEXT": "Hello SAP!"})],
+            options={"timeout": 30},
+        )
+        conn.confirm_unit(unit)
+        assert conn.alive
+        conn.close()